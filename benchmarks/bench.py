@@ -0,0 +1,168 @@
+"""
+    Бенчмарк диспетчера на локальном синтетическом сайте.
+
+    Сервер (benchmarks/server.py) запускается в отдельном процессе, а
+    ExecuteRouter обходит lists страниц-списков по fanout товаров в каждой
+    через Dispatcher. В конце печатается: страниц в секунду, p50/p99 задержки
+    скачивания, пиковая память и время процессора на страницу (только
+    процесс краулера: сервер, браузер и пул процессов парсинга не считаются).
+
+    python benchmarks/bench.py --mode mpa --lists 20 --fanout 50
+    python benchmarks/bench.py --mode spa --lists 2 --fanout 20 --tabs 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.middleware import FETCH, Middleware, Stage
+from curcheck.resilience import Resilience
+
+from server import SyntheticSite, serve
+
+
+class LatencyRecorder(Middleware):
+    """ Точные задержки каждого скачивания для перцентилей """
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    async def after(self, stage: Stage) -> None:
+        if stage.name != FETCH:
+            return
+        if stage.error is None:
+            self.latencies.append(stage.elapsed)
+        else:
+            self.errors += 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def build_router(args, domain: str) -> ExecuteRouter:
+    is_spa = args.mode == "spa"
+    router = ExecuteRouter(
+        domain=domain,
+        is_spa=is_spa,
+        debug=True,
+    )
+    prefix = "spa" if is_spa else "mpa"
+
+    for n in range(args.lists):
+        @router.paginate_page(
+            url=f"/{prefix}/list/{n}",
+            pages_links_xpath="//a[@class='item']/@href",
+            count_in_approach=args.concurrency,
+        )
+        async def item(page_or_tree):
+            if is_spa:
+                await page_or_tree.xpath("//h1[@class='title']")
+            else:
+                page_or_tree.xpath("//h1[@class='title']/text()")
+
+    return router
+
+
+async def run(args, domain: str) -> dict:
+    recorder = LatencyRecorder()
+    dispatcher = Dispatcher(
+        browsers_count=args.browsers,
+        pages_per_browser=args.tabs,
+        concurrency=args.concurrency,
+        parse_mode=args.parse_mode,
+        resilience=Resilience(retries=args.retries, base_delay=0.05),
+    )
+    dispatcher.include_middleware(recorder)
+    router = build_router(args, domain)
+    dispatcher.include_router(router)
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await dispatcher.start({"headless": True})
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    pages = sum(
+        paginator.stats.done for paginator in router.paginators if paginator.stats
+    )
+    failed = sum(
+        paginator.stats.failed for paginator in router.paginators if paginator.stats
+    )
+    return {
+        "mode": args.mode,
+        "pages": pages,
+        "failed": failed,
+        "fetch_errors": recorder.errors,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(recorder.latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(recorder.latencies, 0.99) * 1000, 1),
+        # ru_maxrss в линуксе в килобайтах
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "cpu_ms_per_page": round(cpu / pages * 1000, 3) if pages else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк curcheck")
+    parser.add_argument("--mode", choices=("mpa", "spa"), default="mpa")
+    parser.add_argument("--lists", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--parse-mode", default="inline")
+    parser.add_argument("--browsers", type=int, default=1)
+    parser.add_argument("--tabs", type=int, default=5)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--json", action="store_true", help="результат одной строкой json")
+    args = parser.parse_args()
+
+    site = SyntheticSite(
+        fanout=args.fanout,
+        page_size=args.page_size,
+        latency=args.latency,
+        sigma=args.sigma,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, args=(site, "127.0.0.1", args.port, ready), daemon=True
+    )
+    server.start()
+    try:
+        if not ready.wait(10):
+            raise RuntimeError("Сервер бенчмарка не запустился")
+        result = asyncio.run(run(args, f"http://127.0.0.1:{args.port}"))
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+    Локальный сервер синтетических сайтов для бенчмарков.
+
+    /mpa/list/{n}  - страница-список с fanout ссылками на /mpa/item/{n}-{i}
+    /mpa/item/{id} - страница товара размером около page_size байт
+    /spa/list/{n}  - то же, но ссылки рисуются javascript'ом в браузере
+    /spa/item/{id} - страница товара, содержимое которой рисует javascript
+
+    Задержка ответа - логнормальная с медианой latency и разбросом sigma,
+    с вероятностью error_rate сервер отвечает 503. Случайность задается
+    seed, поэтому два запуска с одинаковыми параметрами одинаковы.
+"""
+
+import asyncio
+import json
+import math
+import random
+
+from aiohttp import web
+
+
+class SyntheticSite:
+    def __init__(
+        self,
+        fanout: int = 50,
+        page_size: int = 20 * 1024,
+        latency: float = 0.05,
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.fanout = fanout
+        self.page_size = page_size
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def _random(self, request: web.Request) -> random.Random:
+        # своя последовательность на каждую ссылку и попытку, чтобы
+        # результат не зависел от порядка запросов
+        attempt = request.app["attempts"][request.path] = (
+            request.app["attempts"].get(request.path, 0) + 1
+        )
+        return random.Random(f"{self.seed}:{request.path}:{attempt}")
+
+    async def _delay(self, request: web.Request) -> None:
+        rnd = self._random(request)
+        if self.latency > 0:
+            await asyncio.sleep(rnd.lognormvariate(math.log(self.latency), self.sigma))
+        if rnd.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable()
+
+    def _filler(self, item_id: str) -> str:
+        row = f"<p class='row'>Описание товара {item_id}. </p>\n"
+        return row * max(1, self.page_size // len(row.encode()))
+
+    async def mpa_list(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        n = request.match_info["n"]
+        links = "\n".join(
+            f"<a class='item' href='/mpa/item/{n}-{i}'>Товар {i}</a>"
+            for i in range(self.fanout)
+        )
+        return web.Response(
+            text=f"<html><body><div id='list'>{links}</div></body></html>",
+            content_type="text/html",
+        )
+
+    async def mpa_item(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        item_id = request.match_info["id"]
+        return web.Response(
+            text=(
+                f"<html><body><h1 class='title'>Товар {item_id}</h1>"
+                f"<span class='price'>{len(item_id) * 100}</span>"
+                f"<div class='description'>{self._filler(item_id)}</div>"
+                f"</body></html>"
+            ),
+            content_type="text/html",
+        )
+
+    async def spa_list(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        n = request.match_info["n"]
+        ids = json.dumps([f"{n}-{i}" for i in range(self.fanout)])
+        return web.Response(
+            text=(
+                "<html><body><div id='list'></div><script>"
+                f"for (const id of {ids}) {{"
+                "const a = document.createElement('a');"
+                "a.className = 'item'; a.href = '/spa/item/' + id;"
+                "a.textContent = 'Товар ' + id;"
+                "document.getElementById('list').appendChild(a);"
+                "}</script></body></html>"
+            ),
+            content_type="text/html",
+        )
+
+    async def spa_item(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        item_id = request.match_info["id"]
+        payload = json.dumps({"id": item_id, "description": self._filler(item_id)})
+        return web.Response(
+            text=(
+                "<html><body><div id='app'></div><script>"
+                f"const data = {payload};"
+                "document.getElementById('app').innerHTML ="
+                "'<h1 class=\"title\">Товар ' + data.id + '</h1>' +"
+                "'<div class=\"description\">' + data.description + '</div>';"
+                "</script></body></html>"
+            ),
+            content_type="text/html",
+        )
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app["attempts"] = {}
+        app.router.add_get("/mpa/list/{n}", self.mpa_list)
+        app.router.add_get("/mpa/item/{id}", self.mpa_item)
+        app.router.add_get("/spa/list/{n}", self.spa_list)
+        app.router.add_get("/spa/item/{id}", self.spa_item)
+        return app
+
+
+def serve(site: SyntheticSite, host: str, port: int, ready=None) -> None:
+    """ Запустить сервер в текущем процессе (блокирует до остановки) """
+    async def main() -> None:
+        runner = web.AppRunner(site.application(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        if ready is not None:
+            ready.set()
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сервер синтетических сайтов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fanout", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    serve(
+        SyntheticSite(
+            fanout=args.fanout,
+            page_size=args.page_size,
+            latency=args.latency,
+            sigma=args.sigma,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ),
+        args.host,
+        args.port,
+    )
@@ -0,0 +1,198 @@
+"""
+    Модуль http-кэша для условных запросов. Хранит ETag, Last-Modified и хэш
+    тела страницы, чтобы не парсить (и при желании не обрабатывать) страницы,
+    которые не поменялись с прошлого запроса.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from collections import OrderedDict
+from typing import Dict
+
+
+class CacheEntry:
+    __slots__ = ("etag", "last_modified", "encoding", "body", "digest")
+
+    def __init__(
+        self,
+        body: bytes,
+        etag: str|None = None,
+        last_modified: str|None = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encoding = encoding
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+    @classmethod
+    def from_response(cls, response, body: bytes) -> "CacheEntry":
+        """ Запись из ответа aiohttp и уже прочитанного тела """
+        try:
+            encoding = response.get_encoding()
+        except RuntimeError:
+            encoding = "utf-8"
+
+        return cls(
+            body=body,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            encoding=encoding,
+        )
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """
+    LRU-кэш в памяти, ограниченный суммарным размером тел страниц max_size
+    (в байтах). Если указан directory, записи дополнительно сохраняются на
+    диск и переживают перезапуск; на диске хранится не больше
+    max_disk_size байт, давно не читанные записи удаляются первыми.
+    """
+    def __init__(
+        self,
+        max_size: int = 64 * 1024 * 1024,
+        directory: str|None = None,
+        max_disk_size: int = 1024 * 1024 * 1024,
+    ) -> None:
+        self.max_size = max_size
+        self.directory = directory
+        self.max_disk_size = max_disk_size
+        self.size = 0
+        self.disk_size = 0
+
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        # имя файла -> размер на диске, от давно не читанных к свежим
+        self._files: OrderedDict[str, int] = OrderedDict()
+        self._files_lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        # пустой кэш - все равно кэш
+        return True
+
+    async def get(self, link: str) -> CacheEntry|None:
+        entry = self._entries.get(link)
+        if entry is not None:
+            self._entries.move_to_end(link)
+            return entry
+
+        if self.directory:
+            entry = await asyncio.get_event_loop().run_in_executor(
+                None, self._load, link
+            )
+            if entry is not None:
+                self._remember(link, entry)
+        return entry
+
+    async def put(self, link: str, entry: CacheEntry) -> None:
+        self._remember(link, entry)
+        if self.directory:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self._dump, link, entry
+            )
+
+    def _remember(self, link: str, entry: CacheEntry) -> None:
+        old = self._entries.pop(link, None)
+        if old is not None:
+            self.size -= old.size
+
+        if entry.size > self.max_size:
+            return
+
+        self._entries[link] = entry
+        self.size += entry.size
+
+        while self.size > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def _name(self, link: str) -> str:
+        return hashlib.blake2b(link.encode(), digest_size=16).hexdigest()
+
+    def _path(self, link: str) -> str:
+        return os.path.join(self.directory, self._name(link))
+
+    def _scan(self) -> None:
+        """ Учесть записи, оставшиеся на диске с прошлого запуска """
+        files = []
+        for item in os.scandir(self.directory):
+            name, ext = os.path.splitext(item.name)
+            if ext == ".html":
+                stat = item.stat()
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._files[name] = size
+            self.disk_size += size
+        self._evict_files()
+
+    def _evict_files(self) -> None:
+        while self.disk_size > self.max_disk_size and self._files:
+            name, size = self._files.popitem(last=False)
+            self.disk_size -= size
+            for ext in (".html", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name + ext))
+                except FileNotFoundError:
+                    pass
+
+    def _load(self, link: str) -> CacheEntry|None:
+        path = self._path(link)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            with open(path + ".html", "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+
+        with self._files_lock:
+            if self._name(link) in self._files:
+                self._files.move_to_end(self._name(link))
+        return CacheEntry(body=body, **meta)
+
+    def _dump(self, link: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_disk_size:
+            return
+
+        path = self._path(link)
+        with open(path + ".html", "wb") as f:
+            f.write(entry.body)
+        with open(path + ".json", "w") as f:
+            json.dump({
+                "etag": entry.etag,
+                "last_modified": entry.last_modified,
+                "encoding": entry.encoding,
+            }, f)
+
+        with self._files_lock:
+            name = self._name(link)
+            self.disk_size += entry.size - self._files.pop(name, 0)
+            self._files[name] = entry.size
+            self._evict_files()
@@ -0,0 +1,200 @@
+"""
+    Модуль сохранения прогресса обхода на диск. Ссылки пагинаторов хранятся в
+    sqlite (режим WAL) со статусом "найдена", "в работе" или "готова", поэтому
+    упавший обход можно продолжить с места остановки, а несколько процессов
+    могут разбирать ссылки из одного файла.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+
+DISCOVERED, IN_FLIGHT, DONE = 0, 1, 2
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CrawlStore:
+    """
+    Хранилище прогресса обхода.
+
+    Ссылки добавляются и забираются в работу сразу, а отметки о готовности
+    копятся в памяти и пишутся пачками раз в flush_interval секунд или по
+    batch_size штук. Все обращения к sqlite идут в отдельном потоке и не
+    блокируют цикл событий. Ссылка, взятая в работу, считается брошенной,
+    если ее процесс умер или прошло больше lease секунд.
+    """
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        lease: float = 300,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.lease = lease
+
+        self._connection: sqlite3.Connection|None = None
+        self._executor: ThreadPoolExecutor|None = None
+        self._flusher: asyncio.Task|None = None
+        self._pending: List[tuple] = []
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def open(self) -> None:
+        # одно соединение и один поток: sqlite не любит общие соединения
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        await self._run(self._open)
+        self._flusher = asyncio.ensure_future(self._flush_periodically())
+
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA busy_timeout=10000")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "key TEXT NOT NULL, url TEXT NOT NULL, state INTEGER NOT NULL, "
+            "owner INTEGER, updated REAL NOT NULL, PRIMARY KEY (key, url))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS urls_state ON urls (key, state)"
+        )
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
+
+    async def reset(self, keys: Iterable[str]|None = None) -> None:
+        """
+        Начать обход заново, забыв прогресс пагинаторов keys. Без keys
+        забывается весь прогресс, в том числе других процессов
+        """
+        if keys is None:
+            await self._run(self._connection.execute, "DELETE FROM urls")
+            return
+        await self._run(
+            self._connection.executemany,
+            "DELETE FROM urls WHERE key = ?",
+            [(key,) for key in keys]
+        )
+
+    async def recover(self) -> None:
+        """ Вернуть в очередь ссылки, брошенные умершими процессами """
+        await self._run(self._recover)
+
+    def _recover(self) -> None:
+        rows = self._connection.execute(
+            "SELECT DISTINCT owner FROM urls WHERE state = ?", (IN_FLIGHT,)
+        ).fetchall()
+        dead = [(owner,) for owner, in rows if owner is None or not _alive(owner)]
+        self._connection.executemany(
+            f"UPDATE urls SET state = {DISCOVERED}, owner = NULL "
+            f"WHERE state = {IN_FLIGHT} AND owner IS ?",
+            dead
+        )
+
+    async def discover(self, key: str, urls: Iterable[str]) -> None:
+        now = time.time()
+        await self._run(
+            self._connection.executemany,
+            "INSERT OR IGNORE INTO urls (key, url, state, updated) "
+            "VALUES (?, ?, ?, ?)",
+            [(key, url, DISCOVERED, now) for url in urls]
+        )
+
+    async def claim(self, key: str, limit: int) -> List[str]:
+        """ Забрать в работу до limit ссылок, которые еще никто не делает """
+        return await self._run(self._claim, key, limit)
+
+    def _claim(self, key: str, limit: int) -> List[str]:
+        now = time.time()
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            urls = [url for url, in connection.execute(
+                "SELECT url FROM urls WHERE key = ? AND "
+                "(state = ? OR (state = ? AND updated < ?)) LIMIT ?",
+                (key, DISCOVERED, IN_FLIGHT, now - self.lease, limit)
+            )]
+            connection.executemany(
+                "UPDATE urls SET state = ?, owner = ?, updated = ? "
+                "WHERE key = ? AND url = ?",
+                [(IN_FLIGHT, os.getpid(), now, key, url) for url in urls]
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return urls
+
+    async def is_done(self, key: str, url: str) -> bool:
+        row = await self._run(self._fetchone,
+            "SELECT state FROM urls WHERE key = ? AND url = ?", (key, url)
+        )
+        return row is not None and row[0] == DONE
+
+    def _fetchone(self, sql: str, params: tuple):
+        return self._connection.execute(sql, params).fetchone()
+
+    def done(self, key: str, url: str) -> None:
+        """ Отметить ссылку готовой, запись на диск произойдет пачкой """
+        self._pending.append((DONE, time.time(), key, url))
+        if len(self._pending) >= self.batch_size:
+            asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        await self._run(
+            self._connection.executemany,
+            "INSERT INTO urls (state, updated, key, url) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key, url) DO UPDATE SET "
+            "state = excluded.state, updated = excluded.updated, owner = NULL",
+            pending
+        )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def stats(self, key: str) -> Dict[str, int]:
+        rows = await self._run(
+            lambda: self._connection.execute(
+                "SELECT state, COUNT(*) FROM urls WHERE key = ? GROUP BY state",
+                (key,)
+            ).fetchall()
+        )
+        counts = dict(rows)
+        return {
+            "discovered": counts.get(DISCOVERED, 0),
+            "in_flight": counts.get(IN_FLIGHT, 0),
+            "done": counts.get(DONE, 0),
+        }
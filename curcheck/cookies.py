@@ -0,0 +1,113 @@
+"""
+    Модуль хранилища куки. Куки хранятся по домену и аккаунту в памяти и в
+    файлах, общие для всех роутеров одного домена. Одновременные запросы ждут
+    один общий вход, а куки с истекающим сроком обновляются новым входом.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+
+class CookieStore:
+    """
+    Хранилище куки.
+
+    Куки считаются устаревшими, если какая-то из постоянных куки истекает
+    раньше чем через refresh_margin секунд, или (при max_age) если они
+    получены больше max_age секунд назад. Файл <хост>.json (для аккаунта
+    "default") или <хост>.<аккаунт>.json лежит в directory
+    """
+    def __init__(
+        self,
+        directory: str = ".",
+        refresh_margin: float = 60,
+        max_age: float|None = None,
+    ) -> None:
+        self.directory = directory
+        self.refresh_margin = refresh_margin
+        self.max_age = max_age
+
+        # (домен, аккаунт) -> (куки, время получения)
+        self._cookies: Dict[Tuple[str, str], Tuple[List[dict], float]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def path(self, domain: str, account: str = "default") -> str:
+        host = urlsplit(domain).netloc or domain.split("/")[-1]
+        name = host if account == "default" else f"{host}.{account}"
+        return os.path.join(self.directory, f"{name}.json")
+
+    def is_fresh(self, cookies: List[dict], saved_at: float) -> bool:
+        now = time.time()
+        if self.max_age is not None and now - saved_at > self.max_age:
+            return False
+        expires = [
+            cookie["expires"] for cookie in cookies
+            if cookie.get("expires", -1) > 0
+        ]
+        return not expires or min(expires) - self.refresh_margin > now
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    def _read(self, path: str):
+        try:
+            with open(path) as f:
+                return json.load(f), os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: str, cookies: List[dict]) -> None:
+        # сначала во временный файл: недописанный файл не прочитается
+        with open(path + ".tmp", "w") as f:
+            json.dump(cookies, f)
+        os.replace(path + ".tmp", path)
+
+    async def get(
+        self,
+        domain: str,
+        login: Callable[[], Awaitable[List[dict]]],
+        account: str = "default",
+    ) -> List[dict]:
+        """
+        Свежие куки домена. Если их нет ни в памяти, ни в файле, вызывается
+        login(); одновременные вызовы ждут один и тот же вход
+        """
+        key = (domain, account)
+        cached = self._cookies.get(key)
+        if cached and self.is_fresh(*cached):
+            return cached[0]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # пока ждали, вход мог сделать кто-то другой
+            cached = self._cookies.get(key)
+            if cached and self.is_fresh(*cached):
+                return cached[0]
+
+            path = self.path(domain, account)
+            stored = await self._run(self._read, path)
+            if stored and self.is_fresh(*stored):
+                logger.debug(f"Вход в {domain} по файлу куки")
+                self._cookies[key] = stored
+                return stored[0]
+
+            logger.info(f"Куки {domain} ({account}) нет или устарели, вход")
+            cookies = await login()
+            self._cookies[key] = (cookies, time.time())
+            await self._run(self._write, path, cookies)
+            return cookies
+
+    def invalidate(self, domain: str, account: str = "default") -> None:
+        """ Забыть куки, следующий get войдет заново """
+        self._cookies.pop((domain, account), None)
+        try:
+            os.remove(self.path(domain, account))
+        except FileNotFoundError:
+            pass
@@ -4,12 +4,37 @@
 """
 
 import asyncio
+import importlib.util
 
-from typing import List
+from typing import Dict, List
 
-from pyppeteer import launch
+from aiohttp import ClientSession
+from loguru import logger
 
-from .router import AbstractRouter
+from .router import AbstractRouter, AuxRouter
+from .cache import HTTPCache
+from .checkpoint import CrawlStore
+from .cookies import CookieStore
+from .errors import ConfigurationError
+from .frontier import Frontier
+from .middleware import Middleware
+from .parser import Parser
+from .pool import PagePool
+from .resilience import Resilience
+from .scheduler import LongpollScheduler
+from .seen import SeenSet
+from .session import create_session
+from .supervisor import Supervisor
+from .watchdog import BrowserWatchdog
+
+
+def _require_pyppeteer(router: AbstractRouter) -> None:
+    """ pyppeteer нужен только spa-роутерам и грузится при запуске браузера """
+    if importlib.util.find_spec("pyppeteer") is None:
+        raise ConfigurationError(
+            f"Роутеру {router.domain} нужен браузер, а pyppeteer не установлен: "
+            "pip install curcheck[spa]"
+        )
 
 
 class Dispatcher:
@@ -17,25 +42,273 @@ class Dispatcher:
     Диспетчер роутеров. В зависимости от нагрузки, диспетчер будет принимать
     решения какая страницы работает на каком браузере в определенное кол-во потоков.  
     """
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        browsers_count: int = 1,
+        pages_per_browser: int = 5,
+        max_page_uses: int = 50,
+        concurrency: int = 100,
+        domain_rate: float|None = None,
+        domain_burst: int = 1,
+        domain_rates: Dict[str, float]|None = None,
+        connections_limit: int = 100,
+        connections_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: int|None = 300,
+        compress: bool = True,
+        cache_size: int = 0,
+        cache_dir: str|None = None,
+        cache_disk_size: int = 1024 * 1024 * 1024,
+        parse_mode: str = "inline",
+        parse_workers: int|None = None,
+        checkpoint: str|None = None,
+        seen: SeenSet|None = None,
+        resilience: Resilience|None = None,
+        longpoll_concurrency: int = 100,
+        longpoll_jitter: float = 0.1,
+        adaptive_longpolls: bool = False,
+        cookie_store: CookieStore|None = None,
+        watchdog: BrowserWatchdog|None = None,
+    ) -> None:
         self.spa_routers: List[AbstractRouter] = []
         self.mpa_routers: List[AbstractRouter] = []
 
+        # пул вкладок: browsers_count браузеров x pages_per_browser вкладок
+        self.browsers_count = browsers_count
+        self.pages_per_browser = pages_per_browser
+        self.max_page_uses = max_page_uses
+        self.pool: PagePool|None = None
+
+        # сторож памяти браузеров: плановая замена после N навигаций или
+        # порога памяти (упавшие браузеры пул перезапускает и без него)
+        self.watchdog = watchdog
+
+        # общая очередь запросов всех роутеров: не больше concurrency
+        # одновременных запросов и не больше domain_rate запросов в секунду
+        # на домен (domain_rates - лимиты для отдельных доменов)
+        self.frontier = Frontier(
+            concurrency=concurrency,
+            domain_rate=domain_rate,
+            domain_burst=domain_burst,
+            domain_rates=domain_rates,
+        )
+
+        # один пул соединений на все mpa-роутеры
+        self.session_options = dict(
+            limit=connections_limit,
+            limit_per_host=connections_per_host,
+            keepalive_timeout=keepalive_timeout,
+            dns_cache_ttl=dns_cache_ttl,
+            compress=compress,
+        )
+        self.session: ClientSession|None = None
+
+        # кэш условных запросов (ETag/Last-Modified/хэш тела) размером
+        # cache_size байт, cache_dir - дополнительно хранить на диске, но не
+        # больше cache_disk_size байт
+        self.cache = (
+            HTTPCache(
+                max_size=cache_size,
+                directory=cache_dir,
+                max_disk_size=cache_disk_size,
+            )
+            if cache_size else None
+        )
+
+        # где разбирать html и выполнять синхронные обработчики:
+        # "inline", "thread" или "process"
+        self.parser = Parser(mode=parse_mode, workers=parse_workers)
+
+        self.supervisor: Supervisor|None = None
+
+        # файл sqlite с прогрессом пагинаторов, чтобы продолжить обход после
+        # падения (start(resume=True)) или делить ссылки между процессами
+        self.store = CrawlStore(checkpoint) if checkpoint else None
+
+        # общее множество встреченных ссылок (HashSeenSet, BloomSeenSet),
+        # чтобы роутеры не качали одни и те же страницы
+        self.seen = seen
+
+        # таймауты, повторы с задержкой и предохранители доменов
+        self.resilience = resilience or Resilience()
+
+        # один планировщик на все лонгпулы: запуски с фиксированной частотой,
+        # разбросом longpoll_jitter и не больше longpoll_concurrency проверок
+        # одновременно; adaptive_longpolls - чаще проверять меняющиеся страницы
+        self.scheduler = LongpollScheduler(
+            concurrency=longpoll_concurrency,
+            jitter=longpoll_jitter,
+            adaptive=adaptive_longpolls,
+        )
+
+        # куки аккаунтов, общие для всех роутеров одного домена
+        self.cookie_store = cookie_store or CookieStore()
+
+        # обработчики стадий всех роутеров (например, MetricsMiddleware)
+        self.middlewares: List[Middleware] = []
+
+        # номер процесса-воркера в многопроцессном режиме
+        self.worker = 0
+
     def include_router(self, router: AbstractRouter):
+        router.frontier = self.frontier
+        router.cache = self.cache
+        router.store = self.store
+        router.seen = self.seen
+        router.resilience = self.resilience
+        router.scheduler = self.scheduler
+        router.cookie_store = self.cookie_store
+        router.shared_middlewares = self.middlewares
+        if router.parser is None:
+            router.parser = self.parser
         if router.is_spa:
+            _require_pyppeteer(router)
             self.spa_routers.append(router)
         else:
             self.mpa_routers.append(router)
 
+    def include_middleware(self, middleware: Middleware) -> None:
+        """ Подключить обработчик стадий ко всем роутерам диспетчера """
+        self.middlewares.append(middleware)
+
+    def _all_middlewares(self) -> List[Middleware]:
+        middlewares = []
+        for router in self.spa_routers + self.mpa_routers:
+            for middleware in router.all_middlewares:
+                if middleware not in middlewares:
+                    middlewares.append(middleware)
+        return middlewares
+
+    def _store_keys(self) -> List[str]:
+        """ Ключи прогресса всех пагинаторов диспетчера """
+        return [
+            paginator.store_key
+            for router in self.spa_routers + self.mpa_routers
+            for paginator in getattr(router, "paginators", [])
+            if paginator.func_path is not None
+        ]
+
+    def metrics(self) -> dict:
+        """ Текущее состояние диспетчера для надзирателя и логов """
+        return {
+            "routers": len(self.spa_routers) + len(self.mpa_routers),
+            "in_flight": self.frontier.in_flight,
+            "pending": self.frontier.pending,
+            "pages": self.pool.size if self.pool else 0,
+            "idle_pages": self.pool.idle if self.pool else 0,
+            "browser_relaunches": self.pool.relaunches if self.pool else 0,
+            "browser_recycles": self.pool.recycles if self.pool else 0,
+        }
+
     async def start(
-        self, options: dict = None, **kwargs
+        self, 
+        options: dict = None, 
+        workers: int = 1,
+        max_restarts: int = 3,
+        heartbeat_timeout: float|None = None,
+        resume: bool = False,
+        prewarm: bool = False,
+        start_method: str|None = None,
+        **kwargs
     ):
+        """
+        Запуск всех роутеров. При workers > 1 роутеры делятся между
+        процессами, у каждого свой цикл событий и браузер; упавшие воркеры
+        перезапускаются не больше max_restarts раз (и если не присылали
+        метрики дольше heartbeat_timeout секунд). start_method - способ
+        запуска процессов, по умолчанию принятый на платформе; если
+        роутеры нельзя передать процессам этим способом (spawn на windows
+        и macos сериализует их), все идет в одном процессе.
+
+        resume - продолжить обход из файла checkpoint, пропуская готовые
+        страницы, иначе прогресс обнуляется.
+
+        Браузеры запускаются при первой вкладке, которую попросит роутер;
+        prewarm - запустить их сразу, параллельно с mpa-роутерами
+        """
+        if workers > 1:
+            supervisor = Supervisor(
+                self,
+                workers=workers,
+                max_restarts=max_restarts,
+                heartbeat_timeout=heartbeat_timeout,
+                start_method=start_method,
+            )
+            if not supervisor.can_start():
+                logger.warning("Роутеры исполняются в одном процессе")
+                workers = 1
+
+        if self.store:
+            await self.store.open()
+            if resume:
+                await self.store.recover()
+            else:
+                # только свои пагинаторы: файл могут делить другие обходы
+                await self.store.reset(self._store_keys())
+            if workers > 1:
+                # у каждого воркера свое соединение с файлом
+                await self.store.close()
+
+        if workers > 1:
+            self.supervisor = supervisor
+            await self.supervisor.run(options, resume=True, prewarm=prewarm, **kwargs)
+            return
+
         if len(self.spa_routers) != 0:
-            browser = await launch(
-                options=options, **kwargs
+            self.pool = PagePool(
+                browsers_count=self.browsers_count,
+                pages_per_browser=self.pages_per_browser,
+                max_page_uses=self.max_page_uses,
+                launch_options=options,
+                **kwargs
             )
+            if self.watchdog:
+                await self.watchdog.start(self.pool)
 
-        await asyncio.gather(
-            *[router.executor(browser=browser) for router in self.spa_routers],
-            *[router.executor() for router in self.mpa_routers],
-        )
+        if len(self.mpa_routers) != 0 or any(
+            getattr(router, "handoff", None) for router in self.spa_routers
+        ):
+            # гибридным spa-роутерам тоже нужна http-сессия
+            self.session = create_session(**self.session_options)
+
+        await self.frontier.start()
+        for middleware in self._all_middlewares():
+            await middleware.start(self)
+
+        try:
+            await asyncio.gather(
+                *([self.pool.start()] if self.pool and prewarm else []),
+                *[
+                    router.executor(pool=self.pool, session=self.session) 
+                    for router in self.spa_routers
+                ],
+                *[router.executor(session=self.session) for router in self.mpa_routers],
+            )
+        finally:
+            # aux-роутеры вызываются извне уже после старта, им браузеры и
+            # очередь нужны до явного вызова close()
+            if not any(
+                isinstance(router, AuxRouter)
+                for router in self.spa_routers + self.mpa_routers
+            ):
+                await self.close()
+
+    async def close(self) -> None:
+        for router in self.spa_routers + self.mpa_routers:
+            if isinstance(router, AuxRouter):
+                await router.close()
+        for middleware in self._all_middlewares():
+            await middleware.close()
+        await self.scheduler.close()
+        if self.watchdog:
+            await self.watchdog.close()
+        await self.frontier.close()
+        if self.store:
+            await self.store.close()
+        self.parser.close()
+        if self.session:
+            await self.session.close()
+            self.session = None
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
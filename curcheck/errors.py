@@ -1,2 +1,27 @@
 class ConfigurationError(Exception):
     pass
+
+
+class HTTPStatusError(Exception):
+    """ Сервер ответил статусом, после которого запрос стоит повторить """
+    def __init__(self, link: str, status: int) -> None:
+        super().__init__(f"{link} ответил статусом {status}")
+        self.link = link
+        self.status = status
+
+
+class CircuitOpenError(Exception):
+    """ Домен слишком часто падает, запросы к нему временно не отправляются """
+    def __init__(self, domain: str) -> None:
+        super().__init__(f"Домен {domain} временно отключен после серии ошибок")
+        self.domain = domain
+
+
+class BrowserCrashError(Exception):
+    """ Браузер упал, пока событие работало с его вкладкой; событие повторяется """
+    def __init__(self) -> None:
+        super().__init__("Браузер отключился во время работы вкладки")
+
+
+class FrontierClosedError(RuntimeError):
+    """ Запрос отправлен в очередь, которая не запущена или уже закрыта """
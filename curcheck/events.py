@@ -4,19 +4,62 @@
 
 import functools
 import asyncio
+import hashlib
+import inspect
+import re
 
-from aiohttp import ClientSession
-from lxml import html
+from contextlib import asynccontextmanager
 
-from typing import List, Awaitable
+from aiohttp import ClientSession
 
-from pyppeteer.browser import Browser
+from typing import Callable, List, Awaitable, Tuple
+from urllib.parse import urljoin, urlsplit
 
+from .cache import CacheEntry, HTTPCache
+from .checkpoint import CrawlStore
 from .errors import ConfigurationError
+from .frontier import Frontier, Priority
+from .handoff import Handoff
+from .interception import InterceptionPolicy
+from .middleware import CALLBACK, FETCH, PARSE, Middleware, run_stage
+from .parser import Parser
+from .pool import PagePool
+from .stream import stream_tree
+from .resilience import Resilience
+from .schema import Schema
+from .scheduler import LongpollScheduler
+from .seen import HashSeenSet, SeenSet
+from .sinks import ResultPipeline
+from .urls import build_link, canonicalize
+from .utils import compile_xpath, XPATH_VALUES_JS
+from .watch import Watch
+from .workers import WorkerQueue, WorkerStats
 
 
 class AbstractEvent:
     task: Awaitable|None = None
+    frontier: Frontier|None = None # выставляется роутером из диспетчера
+    priority: Priority = Priority.PAGE
+    cache: HTTPCache|None = None # выставляется роутером из диспетчера
+    skip_unchanged: bool = False # не вызывать функцию, если страница не менялась
+    parser: Parser = Parser() # стадия парсинга, выставляется роутером
+    stream: bool = False # разбирать страницу по мере скачивания
+    stop_xpath: str|None = None # при потоковом разборе - где остановиться
+    interception: InterceptionPolicy|None = None # блокировка ресурсов в spa
+    handoff: Handoff|None = None # куки браузера для http в гибридном режиме
+    store: CrawlStore|None = None # прогресс обхода на диске, из диспетчера
+    seen: SeenSet|None = None # общее для всех роутеров множество ссылок
+    resilience: Resilience|None = None # таймауты и повторы, из диспетчера
+    middlewares: Tuple[Middleware, ...] = () # обработчики стадий, из роутера
+    name: str|None = None # имя функции события, для метрик
+    results: ResultPipeline|None = None # конвейер результатов роутера
+    scheduler: LongpollScheduler|None = None # планировщик лонгпулов, из диспетчера
+    changed: bool|None = None # поменялась ли страница при последнем скачивании
+    schema: Schema|None = None # функция получает записи вместо страницы
+    login: Callable[[], Awaitable]|None = None # обновление куки аккаунта, из роутера
+    keep_tree: bool = True # запоминать дерево, чтобы не парсить неизменную страницу
+    _last_tree: tuple|None = None
+    _last_digest: tuple|None = None
 
     def __init__(
         self, 
@@ -30,19 +73,317 @@ class AbstractEvent:
         self.is_browser = is_browser
         self.cookies = cookies
 
-        if "http://" in self.url and "." in self.url:
-            self.link: str = self.url
-        elif "//" in self.url and not "http:" in self.url:
-            self.link: str = "http:" + self.url
-        else:
-            self.link: str = self.domain + self.url
+        self.link: str = build_link(self.domain, self.url)
+        self._own_links = HashSeenSet() # ссылки, которые событие уже обходило
     
-    async def _get_page(self, browser: Browser):
-        page = await browser.newPage()
-        page.setDefaultNavigationTimeout(0)
-        if self.cookies:
-            await page.setCookie(*self.cookies)
-        await page.goto(url=self.link)
+    @asynccontextmanager
+    async def _borrow_page(self, pool: PagePool):
+        """ 
+        Взять вкладку из пула с политикой перехвата запросов события. Перед
+        каждой страницей проверяется срок куки: если он подходит к концу,
+        роутер входит заново
+        """
+        await self._login()
+        async with pool.page(
+            cookies_key=self.domain, cookies=self.cookies
+        ) as page:
+            if self.interception is None:
+                yield page
+                return
+
+            await self.interception.attach(page)
+            try:
+                yield page
+            finally:
+                await self.interception.detach(page)
+
+    @asynccontextmanager
+    async def _get_page(self, pool: PagePool, link: str|None = None):
+        """ Взять вкладку из пула и открыть в ней ссылку события """
+        async with self._borrow_page(pool) as page:
+            await self._navigate(functools.partial(page.goto, link or self.link))
+            yield page
+
+    async def _visit(
+        self,
+        pool: PagePool,
+        read: Callable|None = None,
+        use: Callable|None = None,
+        link: str|None = None,
+    ):
+        """
+        Открыть ссылку во вкладке через очередь и прочитать из нее
+        read(page). Повторяются только навигация и read, поэтому функцию
+        события лучше звать с прочитанным уже после. Если функции нужна сама
+        вкладка, она передается в use(page, прочитанное) и вызывается в той
+        же вкладке один раз: ее ошибка запрос не повторяет
+        """
+        failed = None
+
+        async def fetch():
+            nonlocal failed
+            async with self._get_page(pool, link) as page:
+                value = await read(page) if read is not None else None
+                if use is None:
+                    return value
+                try:
+                    return await use(page, value)
+                except Exception as exp:
+                    failed = exp
+
+        result = await self._schedule(fetch, link=link)
+        if failed is not None:
+            raise failed
+        return result
+
+    def _first_visit(self, run: SeenSet, key: str) -> bool:
+        """
+        Встретилась ли каноническая ссылка впервые. run - ссылки этого
+        запуска события, общее множество диспетчера отсекает ссылки других
+        событий, а свои ссылки прошлых запусков при повторном запуске
+        обходятся снова
+        """
+        if not run.add(key):
+            return False
+        if self.seen is None or self.seen.add(key):
+            self._own_links.add(key)
+            return True
+        return key in self._own_links
+
+    async def _navigate(self, navigate: Awaitable) -> None:
+        """ goto или reload вкладки с таймаутом навигации """
+        async with self._stage(FETCH):
+            await navigate(**self._navigation_options)
+
+    def _stage(self, name: str):
+        """ Стадия события внутри цепочки middleware роутера """
+        return run_stage(self.middlewares, self, name)
+
+    async def _fetch_text(
+        self, session: ClientSession, link: str|None = None
+    ) -> tuple:
+        """ 
+        Скачать страницу, вернуть ее текст и признак того, что она поменялась.
+        Ответ сразу освобождается, чтобы соединение вернулось в общий пул.
+
+        С кэшем запрос условный: на 304 тело берется из кэша. И с кэшем, и
+        без него страница считается неизменной, только если это событие в
+        прошлый раз получило то же тело: кэш общий для всех событий и
+        переживает перезапуск, а изменения у каждого события свои.
+        """
+        text, self.changed = await self._download(session, link)
+        return text, self.changed
+
+    async def _login(self) -> None:
+        if self.login is not None:
+            await self.login()
+
+    async def _download(self, session: ClientSession, link: str|None = None) -> tuple:
+        link = link or self.link
+        if self.handoff:
+            # куки браузера идут и в http-запросы гибридного режима
+            await self._login()
+        headers = self.handoff.headers(link) if self.handoff else {}
+
+        if self.cache is None:
+            async with self._stage(FETCH) as stage:
+                async with session.get(link, headers=headers, **self._request_options) as response:
+                    body = await response.read()
+                    text = body.decode(response.get_encoding(), errors="replace")
+                    status = response.status
+                stage.size = len(body)
+
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            text, challenged = await self._check_challenge(link, status, text)
+            if not challenged:
+                self._check_status(link, status)
+            return text, self._seen_digest(link, digest)
+
+        entry = await self.cache.get(link)
+        if entry is not None:
+            headers.update(entry.conditional_headers())
+
+        async with self._stage(FETCH) as stage:
+            async with session.get(link, headers=headers, **self._request_options) as response:
+                if response.status == 304 and entry is not None:
+                    # кэш общий, а поменялась ли страница - для этого события
+                    return entry.text, self._seen_digest(link, entry.digest)
+
+                fresh = CacheEntry.from_response(response, await response.read())
+                status = response.status
+            stage.size = fresh.size
+
+        text, challenged = await self._check_challenge(link, status, fresh.text)
+        if challenged:
+            # в кэш попадает только настоящая страница, а не проверка
+            return text, True
+        self._check_status(link, status)
+
+        if status == 200:
+            await self.cache.put(link, fresh)
+
+        return fresh.text, self._seen_digest(link, fresh.digest)
+
+    def _seen_digest(self, link: str, digest: str) -> bool:
+        """ Запомнить хэш тела и сказать, видело ли событие другое тело """
+        changed = self._last_digest != (link, digest)
+        self._last_digest = (link, digest)
+        return changed
+
+    async def _check_challenge(self, link: str, status: int, text: str) -> tuple:
+        """ 
+        В гибридном режиме страница проверки вместо нужной скачивается
+        заново через браузер. Возвращает текст и признак того, что это была
+        страница проверки. Проверка идет до статуса ответа: страницы
+        проверки часто приходят с 429 или 503, и повторять их через http
+        бесполезно
+        """
+        if self.handoff and self.handoff.is_challenge(status, text):
+            text = await self.handoff.browser_text(
+                link, cookies_key=self.domain, options=self._navigation_options
+            )
+            return text, True
+        return text, False
+
+    async def _fetch_tree(self, session: ClientSession, link: str|None = None):
+        """ 
+        Скачать и распарсить страницу. Неизменная страница заново не
+        парсится, а при skip_unchanged вместо дерева возвращается None.
+
+        При stream страница разбирается кусками прямо из ответа (если нет
+        кэша, которому нужно все тело), и чтение останавливается, как только
+        находится stop_xpath
+        """
+        link = link or self.link
+
+        if self.stream and self.cache is None and self.handoff is None:
+            self.changed = None
+            async with self._stage(FETCH):
+                async with session.get(link, **self._request_options) as response:
+                    self._check_status(link, response.status)
+                    return await stream_tree(response, stop_xpath=self.stop_xpath)
+
+        text, changed = await self._fetch_text(session, link)
+
+        if not changed:
+            if self.skip_unchanged:
+                return None
+            if self._last_tree and self._last_tree[0] == link:
+                return self._last_tree[1]
+
+        async with self._stage(PARSE):
+            tree = await self.parser.parse(text)
+        # при skip_unchanged неизменная страница не нужна, и дерево не держится
+        if self.keep_tree and not self.skip_unchanged:
+            self._last_tree = (link, tree)
+        return tree
+
+    async def _fetch_records(self, session: ClientSession, link: str|None = None):
+        """ 
+        Скачать страницу и собрать записи по схеме события. Записи
+        собираются на стадии парсинга вместе с разбором html
+        """
+        if self.stream and self.cache is None and self.handoff is None:
+            tree = await self._fetch_tree(session, link)
+            async with self._stage(PARSE):
+                return self.schema.extract(tree)
+
+        text, changed = await self._fetch_text(session, link)
+        if not changed and self.skip_unchanged:
+            return None
+        async with self._stage(PARSE):
+            return await self.parser.extract_schema(self.schema, text)
+
+    async def _page_records(self, page):
+        """ Записи по схеме из вкладки одним evaluate """
+        async with self._stage(PARSE):
+            return await self.schema.page_extract(page)
+
+    async def _handle(self, session: ClientSession, func: Awaitable, *args, **kwargs):
+        """
+        Скачать, распарсить и обработать одну страницу. Асинхронная функция
+        получает дерево в цикле событий, синхронная выполняется вместе с
+        разбором на стадии парсинга (в пуле потоков или процессов). Со
+        схемой любая функция получает готовые записи
+        """
+        if self.schema is not None:
+            records = await self._schedule(
+                functools.partial(self._fetch_records, session)
+            )
+            if records is not None:
+                return await self._callback(func, records, *args, **kwargs)
+        elif asyncio.iscoroutinefunction(func) or inspect.isasyncgenfunction(func):
+            tree = await self._schedule(
+                functools.partial(self._fetch_tree, session)
+            )
+            if tree is not None:
+                return await self._callback(func, tree, *args, **kwargs)
+        else:
+            text, changed = await self._schedule(
+                functools.partial(self._fetch_text, session)
+            )
+            if changed or not self.skip_unchanged:
+                async with self._stage(CALLBACK):
+                    result = await self.parser.extract(func, text, *args, **kwargs)
+                return await self._emit(result)
+
+    async def _callback(self, func: Awaitable, *args, **kwargs):
+        """ Вызвать функцию события в цикле событий и собрать ее yield """
+        async with self._stage(CALLBACK):
+            if inspect.isasyncgenfunction(func):
+                result = [item async for item in func(*args, **kwargs)]
+            else:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                elif inspect.isgenerator(result):
+                    result = list(result)
+        return await self._emit(result)
+
+    async def _emit(self, result):
+        """ 
+        Отдать результат функции в конвейер роутера: словарь или любой
+        объект - один результат, список или кортеж - несколько
+        """
+        if self.results is None or result is None:
+            return result
+
+        items = result if isinstance(result, (list, tuple)) else [result]
+        for item in items:
+            await self.results.put(item)
+        return result
+
+    @property
+    def _request_options(self) -> dict:
+        if self.resilience is None:
+            return {}
+        return {"timeout": self.resilience.timeout}
+
+    @property
+    def _navigation_options(self) -> dict:
+        if self.resilience is None:
+            return {}
+        return self.resilience.navigation_options
+
+    def _check_status(self, link: str, status: int) -> None:
+        if self.resilience is not None:
+            self.resilience.check_status(link, status)
+
+    async def _schedule(self, func: Awaitable, link: str|None = None):
+        """ 
+        Выполнить запрос func через общую очередь диспетчера, если она есть.
+        Упавший запрос повторяется, и каждая попытка заново встает в очередь
+        """
+        link = link or self.link
+
+        async def attempt():
+            if self.frontier is None:
+                return await func()
+            return await self.frontier.submit(link, func, priority=self.priority)
+
+        if self.resilience is None:
+            return await attempt()
+        return await self.resilience.call(link, attempt)
 
 
 class EventPage(AbstractEvent):
@@ -51,29 +392,42 @@ class EventPage(AbstractEvent):
         domain: str, 
         url: str, 
         is_browser: bool = False, 
-        cookies: dict|None = None
+        cookies: dict|None = None,
+        skip_unchanged: bool = False,
+        stream: bool = False,
     ):
         super().__init__(
             domain=domain, url=url, is_browser=is_browser, cookies=cookies
         )
 
+        self.skip_unchanged = skip_unchanged
+        self.stream = stream
+
     def __call__(self, func: Awaitable):
+        self.name = func.__name__
+
         @functools.wraps(func) 
-        async def spa_task(browser: Browser, *args, **kwargs):
-            page = await browser.newPage()
-            page.setDefaultNavigationTimeout(0)
-            if self.cookies:
-                await page.setCookie(*self.cookies)
-            await page.goto(url=self.link)
-            await func(page, *args, **kwargs)
-            await page.close()
+        async def spa_task(pool: PagePool, *args, **kwargs):
+            async def read(page):
+                records = await self._page_records(page)
+                if self.handoff:
+                    await self.handoff.capture(page)
+                return records
+
+            async def use(page, value):
+                await self._callback(func, page, *args, **kwargs)
+                if self.handoff:
+                    await self.handoff.capture(page)
+
+            if self.schema is not None:
+                records = await self._visit(pool, read)
+                await self._callback(func, records, *args, **kwargs)
+            else:
+                await self._visit(pool, use=use)
 
         @functools.wraps(func) 
         async def mpa_task(session: ClientSession, *args, **kwargs):
-            response = await session.request("GET", self.link)
-            tree = html.fromstring(await response.text())
-
-            await func(tree, *args, **kwargs)
+            return await self._handle(session, func, *args, **kwargs)
 
         if self.is_browser:
             self.task = spa_task
@@ -93,118 +447,339 @@ class EventPaginator(AbstractEvent):
         is_browser: bool = False,
         auxiliary_function: Awaitable|None = None,
         paginate_urls: list|None = None,
-        cookies: dict|None = None
+        cookies: dict|None = None,
+        stream: bool = False,
+        stop_xpath: str|None = None,
     ) -> None:
         super().__init__(
             domain=domain, url=url, is_browser=is_browser, cookies=cookies
         )
 
+        self.count_in_approach = count_in_approach # кол-во страниц в работе
+        self.paginate_urls = paginate_urls
+        self.stream = stream
+        self.stop_xpath = stop_xpath # только для страницы со ссылками
+
         if domain and url:
             self.pages_links_xpath = pages_links_xpath
-            self.count_in_approach = count_in_approach
             self.auxiliary_function = auxiliary_function
-        elif paginate_urls:
-            self.paginate_urls = paginate_urls
-        else:
+        elif not paginate_urls:
             raise ConfigurationError(
                 "Ошибка! Нельзя одновременно парсить пагинатор страницы и "\
                 "отправлять свои ссылки для пагинации!"
             )
 
+        # очередь у каждого запуска своя, здесь только статистика последнего
+        self.stats: WorkerStats|None = None
+        self.func_path: str|None = None # модуль и имя функции события
+
+    def _child_page(self, url: str, is_browser: bool) -> EventPage:
+        """ Страница пагинатора идет в общую очередь с низким приоритетом """
+        page = EventPage(
+            domain=self.domain, 
+            url=url,
+            is_browser=is_browser,
+            cookies=self.cookies,
+            stream=self.stream,
+        )
+        page.interception = self.interception
+        page.handoff = self.handoff
+        page.frontier = self.frontier
+        page.cache = self.cache
+        page.parser = self.parser
+        page.seen = self.seen
+        page.resilience = self.resilience
+        page.middlewares = self.middlewares
+        page.results = self.results
+        page.schema = self.schema
+        page.login = self.login
+        page.priority = Priority.PAGINATION
+        page.keep_tree = False # страница качается один раз за запуск
+        return page
+
+    @property
+    def store_key(self) -> str:
+        """
+        Ключ пагинатора в хранилище прогресса: функция события и ссылка
+        пагинатора или хэш его списка ссылок. Ключ не меняется между
+        запусками, но у разных пагинаторов одного домена он разный
+        """
+        if self.url:
+            source = self.domain + self.url
+        else:
+            source = hashlib.blake2b(
+                "\n".join(self.paginate_urls).encode(), digest_size=16
+            ).hexdigest()
+        return f"{self.func_path}:{source}"
+
+    async def _add_page(
+        self, workers: WorkerQueue, task: Awaitable, *args, **kwargs
+    ) -> None:
+        """ 
+        Страница сразу уходит в очередь воркеров, не дожидаясь остальных.
+        Готовые страницы не хранятся, их число есть в stats
+        """
+        await workers.submit(task, *args, **kwargs)
+
+    async def _tracked(self, url: str, task: Awaitable, *args, **kwargs) -> None:
+        await task(*args, **kwargs)
+        self.store.done(self.store_key, url)
+
+    async def _feed(
+        self, 
+        workers: WorkerQueue,
+        pages_links: List[str], 
+        func: Awaitable, 
+        resource: PagePool|ClientSession, 
+        *args, 
+        **kwargs
+    ) -> None:
+        """ 
+        Отдать страницы воркерам. С хранилищем прогресса ссылки сначала
+        записываются на диск, а потом забираются оттуда пачками: готовые
+        пропускаются, а несколько процессов делят ссылки между собой.
+
+        Повторы ссылок (и ссылки, уже встреченные другими событиями)
+        ищутся по каноническому виду, а качаются сами ссылки
+        """
+        run = HashSeenSet()
+        pages_links = [
+            link for link in pages_links
+            if self._first_visit(run, canonicalize(link))
+        ]
+
+        if self.store is None:
+            for url in pages_links:
+                await self._add_page(
+                    workers,
+                    self._child_page(url, self.is_browser)(func),
+                    resource, *args, **kwargs
+                )
+            return
+
+        await self.store.discover(self.store_key, pages_links)
+        while True:
+            batch = await self.store.claim(self.store_key, self.count_in_approach)
+            if not batch:
+                break
+            for url in batch:
+                await self._add_page(
+                    workers,
+                    functools.partial(
+                        self._tracked, url, self._child_page(url, self.is_browser)(func)
+                    ),
+                    resource, *args, **kwargs
+                )
+
+    def _absolute(self, hrefs: List[str]) -> List[str]:
+        """ Ссылки со страницы пагинатора относительно нее самой """
+        return [urljoin(self.link, href.strip()) for href in hrefs]
+
+    def _paginate_links(self) -> List[str]:
+        """ Свои ссылки пагинатора относительно домена роутера """
+        return [build_link(self.domain, url) for url in self.paginate_urls]
+
+    async def _spa_links(self, pool: PagePool) -> List[str]:
+        """ Собрать ссылки с базовой страницы """
+        async with self._get_page(pool) as base_page:
+            if self.auxiliary_function:
+                await self.auxiliary_function(base_page)
+
+            # все ссылки одним вызовом evaluate, а не запросом на каждую
+            return self._absolute(await base_page.evaluate(
+                XPATH_VALUES_JS, self.pages_links_xpath
+            ))
+
+    async def _mpa_links(self, session: ClientSession) -> List[str]:
+        """ Собрать ссылки с базовой страницы """
+        base_tree = await self._schedule(
+            functools.partial(self._fetch_tree, session)
+        )
+
+        if self.auxiliary_function:
+            await self.auxiliary_function(base_tree)
 
-        self.pages: List[EventPage] = []
+        return self._absolute(compile_xpath(self.pages_links_xpath)(base_tree))
+
+    def _workers(self) -> WorkerQueue:
+        """ 
+        Очередь одного запуска. Роутер может запустить событие несколько
+        раз одновременно, поэтому очередь не хранится в событии
+        """
+        # с хранилищем очередь ограничена, чтобы не забирать лишние ссылки
+        return WorkerQueue(
+            self.count_in_approach, 
+            maxsize=self.count_in_approach if self.store else 0
+        )
 
     def __call__(self, func: Awaitable):
+        self.name = func.__name__
+        self.func_path = f"{func.__module__}.{func.__qualname__}"
+
         @functools.wraps(func) 
-        async def spa_task(browser: Browser, *args, **kwargs):
-            if not self.paginate_urls:
-                base_page = await browser.newPage()
-                base_page.setDefaultNavigationTimeout(0)
-                if self.cookies:
-                    await base_page.setCookie(*self.cookies)
-                await base_page.goto(url=self.domain+self.url)
-
-                if self.auxiliary_function:
-                    await self.auxiliary_function(base_page)
-                
-                if self.pages_links_xpath.split("/")[-1][0] == "@":
-                    html_attr = f'.getAttribute("{self.pages_links_xpath.split("/")[-1][1:]}")'
-                elif self.pages_links_xpath.split("/")[-1] == "text()":
-                    html_attr = ".innerText"
-                else:
-                    html_attr = ".innerHTML"
-
-                xpath = "/".join(self.pages_links_xpath.split("/")[:-1])
-
-                pages_links = await base_page.xpath(xpath)
-
-                self.pages = [
-                    EventPage(
-                        domain=self.domain, 
-                        url=await base_page.evaluate(
-                            f"(link) => link{html_attr}", link
-                        ),
-                        is_browser=True,
-                        cookies=self.cookies
-                    )(func) for link in pages_links
-                ]
-            else:
-                self.pages = [
-                    EventPage(
-                        domain=self.domain, url=url, is_browser=True
-                    )(func) for url in self.paginate_urls
-                ]
-
-            approach_len = (
-                len(self.pages) // self.count_in_approach 
-                if len(self.pages) % self.count_in_approach == 0 
-                else (len(self.pages) // self.count_in_approach)+1
-            ) # кол-во подходов
-
-            for i in range(approach_len):
-                if i < approach_len - 1:
-                    await asyncio.gather(
-                        *[page_task(browser, *args, **kwargs) for page_task in self.pages[i: (i+1)*self.count_in_approach]]
+        async def spa_task(pool: PagePool, *args, **kwargs):
+            async with self._workers() as workers:
+                self.stats = workers.stats
+                if not self.paginate_urls:
+                    pages_links = await self._schedule(
+                        functools.partial(self._spa_links, pool)
                     )
                 else:
-                    await asyncio.gather(
-                        *[page_task(browser, *args, **kwargs) for page_task in self.pages[i: len(self.pages)-i*self.count_in_approach]]
-                    )
+                    pages_links = self._paginate_links()
+
+                await self._feed(workers, pages_links, func, pool, *args, **kwargs)
 
         @functools.wraps(func) 
         async def mpa_task(session: ClientSession, *args, **kwargs):
-            response = await session.request("GET", self.link)
+            async with self._workers() as workers:
+                self.stats = workers.stats
+                if not self.paginate_urls:
+                    pages_links = await self._mpa_links(session)
+                else:
+                    pages_links = self._paginate_links()
 
-            base_tree = html.fromstring(await response.text())
+                await self._feed(workers, pages_links, func, session, *args, **kwargs)
 
-            if self.auxiliary_function:
-                await self.auxiliary_function(base_tree)
-
-            pages_links_elements = base_tree.xpath(self.pages_links_xpath)
-
-            self.pages = [
-                EventPage(
-                    domain=self.domain, 
-                    url=link,
-                    is_browser=False
-                )(func) for link in pages_links_elements
-            ]
-
-            approach_len = (
-                len(self.pages) // self.count_in_approach 
-                if len(self.pages) % self.count_in_approach == 0 
-                else (len(self.pages) // self.count_in_approach)+1
-            ) # кол-во подходов
-
-            for i in range(approach_len):
-                if i < approach_len - 1:
-                    await asyncio.gather(
-                        *[page_task(session, *args, **kwargs) for page_task in self.pages[i: (i+1)*self.count_in_approach]]
-                    )
-                else:
-                    await asyncio.gather(
-                        *[page_task(session, *args, **kwargs) for page_task in self.pages[i: len(self.pages)-i*self.count_in_approach]]
-                    )
+        if self.is_browser:
+            self.task = spa_task
+        else:
+            self.task = mpa_task
+
+        return self.task
+
+
+class _CrawlRun:
+    """ Состояние одного обхода: у каждого вызова краулера свое """
+    def __init__(self, visit: Awaitable, concurrency: int, args, kwargs) -> None:
+        self.visit = visit
+        self.args = args
+        self.kwargs = kwargs
+        self.seen = HashSeenSet() # ссылки этого обхода
+        self.workers = WorkerQueue(concurrency, prioritized=True)
+
+
+class EventCrawler(AbstractEvent):
+    """
+    Рекурсивный обход сайта от страницы url не глубже max_depth и не больше
+    max_pages страниц. Все уровни качаются одной общей очередью воркеров,
+    без ожидания окончания предыдущего уровня.
+
+    links_xpath - xpath ссылок (или список по глубинам, последний действует
+    и глубже). Ссылки берутся только с доменов allow_domains (по умолчанию
+    домен роутера) и с путями, подходящими под allow_paths и не подходящими
+    под deny_paths (регулярные выражения). Страницы идут в ширину, а с
+    score(ссылка, глубина) - сначала с наибольшей оценкой.
+    """
+    def __init__(
+        self,
+        domain: str,
+        url: str,
+        links_xpath: str|List[str],
+        max_depth: int = 2,
+        max_pages: int = 1000,
+        allow_domains: List[str]|None = None,
+        allow_paths: List[str]|None = None,
+        deny_paths: List[str]|None = None,
+        concurrency: int = 10,
+        score: Callable[[str, int], float]|None = None,
+        is_browser: bool = False,
+        cookies: dict|None = None,
+    ) -> None:
+        super().__init__(
+            domain=domain, url=url, is_browser=is_browser, cookies=cookies
+        )
+
+        self.priority = Priority.PAGINATION
+        self.keep_tree = False # каждая ссылка обходится один раз
+        self.links_xpath = (
+            [links_xpath] if isinstance(links_xpath, str) else list(links_xpath)
+        )
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allow_domains = {
+            host.lower() for host in (allow_domains or [urlsplit(self.domain).netloc])
+        }
+        self.allow_paths = [re.compile(path) for path in allow_paths or []]
+        self.deny_paths = [re.compile(path) for path in deny_paths or []]
+        self.concurrency = concurrency
+        self.score = score
+
+        self.stats: WorkerStats|None = None # статистика последнего обхода
+
+    def _xpath(self, depth: int) -> str:
+        return self.links_xpath[min(depth, len(self.links_xpath) - 1)]
+
+    def _allowed(self, link: str) -> bool:
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https"):
+            return False
+        if parts.netloc not in self.allow_domains:
+            return False
+        if self.allow_paths and not any(p.search(parts.path) for p in self.allow_paths):
+            return False
+        return not any(p.search(parts.path) for p in self.deny_paths)
+
+    async def _enqueue(self, run: _CrawlRun, link: str, depth: int) -> None:
+        """ Поставить ссылку в очередь обхода, если она подходит и лимит не исчерпан """
+        if run.workers.stats.submitted >= self.max_pages:
+            return
+        if not self._first_visit(run.seen, canonicalize(link)):
+            return
+
+        priority = -self.score(link, depth) if self.score else depth
+        await run.workers.submit_prioritized(priority, run.visit, run, link, depth)
+
+    async def _follow(
+        self, run: _CrawlRun, base: str, hrefs: List[str], depth: int
+    ) -> None:
+        for href in hrefs:
+            link = urljoin(base, href.strip())
+            if self._allowed(canonicalize(link)):
+                await self._enqueue(run, link, depth + 1)
+
+    def __call__(self, func: Awaitable):
+        self.name = func.__name__
+
+        async def crawl(visit, *args, **kwargs):
+            # роутер может запустить обход несколько раз одновременно
+            run = _CrawlRun(visit, self.concurrency, args, kwargs)
+            async with run.workers:
+                self.stats = run.workers.stats
+                await self._enqueue(run, self.link, 0)
+
+        @functools.wraps(func)
+        async def spa_task(pool: PagePool, *args, **kwargs):
+            async def visit(run: _CrawlRun, link: str, depth: int):
+                async def read(page):
+                    if depth >= self.max_depth:
+                        return []
+                    return await page.evaluate(XPATH_VALUES_JS, self._xpath(depth))
+
+                async def use(page, hrefs):
+                    await self._callback(func, page, *run.args, **run.kwargs)
+                    return hrefs
+
+                hrefs = await self._visit(pool, read, use, link=link)
+                await self._follow(run, link, hrefs, depth)
+
+            await crawl(visit, *args, **kwargs)
+
+        @functools.wraps(func)
+        async def mpa_task(session: ClientSession, *args, **kwargs):
+            async def visit(run: _CrawlRun, link: str, depth: int):
+                tree = await self._schedule(
+                    functools.partial(self._fetch_tree, session, link), link=link
+                )
+                if tree is None:
+                    return
+
+                hrefs = []
+                if depth < self.max_depth:
+                    hrefs = compile_xpath(self._xpath(depth))(tree)
+                await self._callback(func, tree, *run.args, **run.kwargs)
+                await self._follow(run, link, hrefs, depth)
+
+            await crawl(visit, *args, **kwargs)
 
         if self.is_browser:
             self.task = spa_task
@@ -223,38 +798,95 @@ class EventLongpoll(AbstractEvent):
         count: int = None,
         is_browser: bool = False,
         cookies: dict|None = None,
+        skip_unchanged: bool = False,
+        watch: Watch|None = None,
     ) -> None:
         super().__init__(domain=domain, url=url, is_browser=is_browser, cookies=cookies)
 
+        self.priority = Priority.LONGPOLL
+        self.skip_unchanged = skip_unchanged
+        self.watch = watch # функция получает только изменения элементов
         self.count = count
         self.timeout = timeout
         self.i = 0
 
+    async def _run(self, poll: Awaitable) -> None:
+        """ 
+        Проверять страницу через планировщик диспетчера, а без него - через
+        свой собственный
+        """
+        scheduler = self.scheduler or LongpollScheduler()
+        try:
+            await scheduler.run(self.timeout, poll, self.count, name=self.link)
+        finally:
+            if scheduler is not self.scheduler:
+                await scheduler.close()
+
+    async def _page_changed(self, page) -> bool:
+        """ Поменялась ли открытая вкладка с прошлой проверки """
+        digest = hashlib.blake2b(
+            (await page.content()).encode(), digest_size=16
+        ).hexdigest()
+        changed = self._last_digest != (self.link, digest)
+        self._last_digest = (self.link, digest)
+        return changed
+
+    async def _watch_page(self, pool: PagePool, func: Awaitable, *args, **kwargs) -> bool:
+        diff = await self._visit(pool, self.watch.page_diff)
+        if diff:
+            await self._callback(func, diff, *args, **kwargs)
+        return bool(diff)
+
+    async def _watch_tree(
+        self, session: ClientSession, func: Awaitable, *args, **kwargs
+    ) -> bool:
+        tree = await self._schedule(functools.partial(self._fetch_tree, session))
+        # без запомненных элементов даже неизменная страница разбирается
+        if tree is None or (self.changed is False and self.watch.polled):
+            diff = self.watch.unchanged()
+        else:
+            diff = self.watch.diff(tree)
+
+        if diff:
+            await self._callback(func, diff, *args, **kwargs)
+        return bool(diff)
+
     def __call__(self, func: Awaitable):
+        self.name = func.__name__
+
         @functools.wraps(func)
-        async def spa_task(browser: Browser, *args, **kwargs):
-            self.browser = browser
-            page = await self.browser.newPage()
-            if self.cookies:
-                await page.setCookie(*self.cookies)
-            page.setDefaultNavigationTimeout(0)
-            await self.page.goto(self.link)
-            while self.i <= self.count or self.count == None:
+        async def spa_task(pool: PagePool, *args, **kwargs):
+            track = self.skip_unchanged or (
+                self.scheduler is not None and self.scheduler.adaptive
+            )
+
+            async def read(page):
+                return await self._page_changed(page) if track else None
+
+            async def use(page, changed):
+                if changed is not False or not self.skip_unchanged:
+                    await self._callback(func, page, *args, **kwargs)
+                return changed
+
+            async def poll():
+                # вкладка берется из пула только на время одной проверки
                 self.i += 1
-                await func(page, *args, **kwargs)
-                await page.reload()
-                await asyncio.sleep(self.timeout)
+                if self.watch:
+                    return await self._watch_page(pool, func, *args, **kwargs)
+                return await self._visit(pool, read, use)
+
+            await self._run(poll)
 
         @functools.wraps(func) 
         async def mpa_task(session: ClientSession, *args, **kwargs):
-            while self.i <= self.count or self.count == None:
-                response = await session.request("GET", self.link)
-                
-                tree = html.fromstring(await response.text())
-                await func(tree, *args, **kwargs)
-
-                await asyncio.sleep(self.timeout)
+            async def poll():
                 self.i += 1
+                if self.watch:
+                    return await self._watch_tree(session, func, *args, **kwargs)
+                await self._handle(session, func, *args, **kwargs)
+                return self.changed
+
+            await self._run(poll)
 
         if self.is_browser:
             self.task = spa_task
@@ -0,0 +1,220 @@
+"""
+    Модуль глобальной очереди запросов (frontier). Все события всех роутеров
+    отправляют сюда свои запросы, а очередь решает, когда их выполнить: с
+    учетом приоритета, общего лимита одновременных запросов и лимита
+    запросов в секунду на каждый домен.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List
+from urllib.parse import urlsplit
+
+from .errors import ConfigurationError, FrontierClosedError
+
+
+class Priority(IntEnum):
+    """ Чем меньше значение, тем раньше выполняется запрос """
+    LONGPOLL = 0
+    PAGE = 1
+    PAGINATION = 2
+
+
+class TokenBucket:
+    """
+    Ведро токенов: rate запросов в секунду в среднем и не больше burst
+    запросов подряд. rate=None отключает ограничение.
+    """
+    def __init__(self, rate: float|None = None, burst: int = 1) -> None:
+        if rate is not None and rate <= 0:
+            raise ConfigurationError(
+                f"Ошибка! Лимит запросов в секунду должен быть больше 0, а не {rate}"
+            )
+        if burst < 1:
+            raise ConfigurationError(
+                f"Ошибка! burst должен быть не меньше 1, а не {burst}"
+            )
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """ Сколько секунд ждать до появления токена """
+        if self.rate is None:
+            return 0.0
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        if self.rate is not None:
+            self.tokens -= 1
+
+
+class Frontier:
+    """
+    Глобальная очередь запросов диспетчера.
+
+    Для каждого домена своя очередь с приоритетами и свое ведро токенов.
+    Как только освобождается место (concurrency), запускается самый
+    приоритетный запрос среди доменов, у которых есть токен, поэтому
+    медленный или ограниченный домен не простаивает остальные.
+    """
+    def __init__(
+        self,
+        concurrency: int = 100,
+        domain_rate: float|None = None,
+        domain_burst: int = 1,
+        domain_rates: Dict[str, float]|None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ConfigurationError(
+                f"Ошибка! concurrency должен быть не меньше 1, а не {concurrency}"
+            )
+        # неверные лимиты видны сразу, а не на первом запросе к домену
+        for rate in (domain_rate, *(domain_rates or {}).values()):
+            TokenBucket(rate=rate, burst=domain_burst)
+
+        self.concurrency = concurrency
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.domain_rates = domain_rates or {}
+
+        self.in_flight = 0
+
+        self._queues: Dict[str, List[tuple]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event|None = None
+        self._runner: asyncio.Task|None = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def start(self) -> None:
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+        for queue in self._queues.values():
+            for *_, future in queue:
+                future.cancel()
+        self._queues.clear()
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        if domain not in self._buckets:
+            self._buckets[domain] = TokenBucket(
+                rate=self.domain_rates.get(domain, self.domain_rate),
+                burst=self.domain_burst,
+            )
+        return self._buckets[domain]
+
+    async def submit(
+        self,
+        link: str,
+        func: Callable[[], Awaitable],
+        priority: Priority = Priority.PAGE,
+    ):
+        """
+        Поставить запрос к link в очередь. func - корутинная функция без
+        аргументов, которая делает сам запрос. Возвращает ее результат.
+        """
+        if self._runner is None:
+            raise FrontierClosedError(
+                "Очередь запросов закрыта" if self._closed
+                else "Очередь запросов не запущена: сначала start()"
+            )
+
+        domain = urlsplit(link).netloc
+        future = asyncio.get_event_loop().create_future()
+
+        heapq.heappush(
+            self._queues.setdefault(domain, []),
+            (priority, next(self._seq), func, future)
+        )
+        self._bucket(domain)
+        self._wakeup.set()
+
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._dispatch()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> float|None:
+        """
+        Запустить все запросы, которые можно запустить сейчас. Возвращает
+        через сколько секунд появится токен у ждущего домена.
+        """
+        while self.in_flight < self.concurrency:
+            best = None
+            next_delay = None
+
+            for domain, queue in self._queues.items():
+                while queue and queue[0][-1].done():
+                    # вызывающий уже отменил ожидание
+                    heapq.heappop(queue)
+                if not queue:
+                    continue
+
+                wait = self._buckets[domain].wait_time()
+                if wait > 0:
+                    next_delay = wait if next_delay is None else min(next_delay, wait)
+                elif best is None or queue[0] < self._queues[best][0]:
+                    best = domain
+
+            if best is None:
+                return next_delay
+
+            self._buckets[best].consume()
+            self._start(*heapq.heappop(self._queues[best]))
+
+        return None
+
+    def _start(self, priority, seq, func, future: asyncio.Future) -> None:
+        self.in_flight += 1
+        task = asyncio.ensure_future(func())
+
+        def _on_done(task: asyncio.Task) -> None:
+            self.in_flight -= 1
+            self._wakeup.set()
+            if future.done():
+                return
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        task.add_done_callback(_on_done)
+        future.add_done_callback(
+            lambda future: task.cancel() if future.cancelled() else None
+        )
@@ -0,0 +1,94 @@
+"""
+    Модуль передачи сессии из браузера в http-клиент. Браузер нужен только
+    чтобы залогиниться или пройти js-проверку, дальше страницы качаются через
+    aiohttp с куки и user-agent браузера.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from pyppeteer.page import Page
+
+from .pool import PagePool
+
+
+CHALLENGE_MARKERS = (
+    "cf-chl",
+    "challenge-platform",
+    "Just a moment...",
+    "Checking your browser",
+    "ddos-guard",
+)
+
+
+class Handoff:
+    """
+    Учетные данные браузера для http-запросов роутера.
+
+    Куки и user-agent берутся из браузера после логина или после первой
+    spa-страницы. Если http-ответ похож на страницу проверки (статус из
+    challenge_statuses или маркер из challenge_markers в тексте), страница
+    скачивается браузером, а учетные данные обновляются. navigation_timeout -
+    таймаут загрузки такой страницы в секундах, если у события нет своего.
+    """
+    def __init__(
+        self,
+        challenge_statuses: Iterable[int] = (403, 429, 503),
+        challenge_markers: Iterable[str] = CHALLENGE_MARKERS,
+        navigation_timeout: float = 60,
+    ) -> None:
+        self.challenge_statuses = set(challenge_statuses)
+        self.challenge_markers = tuple(challenge_markers)
+        # миллисекунды для goto, если событие не передало свои настройки
+        self.navigation_timeout = int(navigation_timeout * 1000)
+
+        self.pool: PagePool|None = None
+        self.cookies: List[dict] = []
+        self.user_agent: str|None = None
+        self.fallbacks = 0 # сколько раз пришлось идти через браузер
+
+    async def capture(self, page: Page) -> None:
+        """ Забрать куки и user-agent из вкладки браузера """
+        self.cookies = await page.cookies()
+        self.user_agent = await page.evaluate("() => navigator.userAgent")
+
+    def headers(self, link: str) -> Dict[str, str]:
+        """ Заголовки http-запроса к link с куки браузера для этого домена """
+        host = urlsplit(link).hostname or ""
+        cookies = [
+            f"{cookie['name']}={cookie['value']}" for cookie in self.cookies
+            if host == cookie.get("domain", "").lstrip(".")
+            or host.endswith("." + cookie.get("domain", "").lstrip("."))
+        ]
+
+        headers = {}
+        if cookies:
+            headers["Cookie"] = "; ".join(cookies)
+        if self.user_agent:
+            headers["User-Agent"] = self.user_agent
+        return headers
+
+    def is_challenge(self, status: int, text: str) -> bool:
+        if status in self.challenge_statuses:
+            return True
+        return any(marker in text for marker in self.challenge_markers)
+
+    async def browser_text(
+        self, link: str, cookies_key: str|None = None, options: dict|None = None
+    ) -> str:
+        """
+        Скачать страницу браузером и обновить учетные данные. options -
+        параметры goto с таймаутом навигации: у вкладок пула своего
+        таймаута нет, и без него зависшая страница держала бы вкладку вечно
+        """
+        self.fallbacks += 1
+        async with self.pool.page(
+            cookies_key=cookies_key, cookies=self.cookies
+        ) as page:
+            await page.goto(link, **(options or {"timeout": self.navigation_timeout}))
+            text = await page.content()
+            await self.capture(page)
+        return text
@@ -0,0 +1,121 @@
+"""
+    Модуль перехвата запросов браузера. Позволяет не скачивать картинки,
+    шрифты, стили, видео и трекеры на spa-страницах.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from collections import Counter
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Callable, Dict, Iterable
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from pyppeteer.network_manager import Request, Response
+    from pyppeteer.page import Page
+
+
+def _match_domain(host: str, domains: Iterable[str]) -> bool:
+    """ Домен или любой его поддомен """
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class InterceptionPolicy:
+    """
+    Политика блокировки запросов вкладки.
+
+    resource_types - типы ресурсов chromium (image, media, font, stylesheet,
+    script, xhr, ...), url_patterns - маски ссылок в стиле fnmatch
+    ("*.png", "*analytics*"), block_domains - запрещенные домены,
+    allow_domains - если задан, разрешены только эти домены. Документ
+    страницы не блокируется никогда.
+
+    blocked - сколько запросов заблокировано по типам ресурсов, loaded_bytes -
+    сколько байт реально скачано (по Content-Length разрешенных ответов).
+    Размер заблокированных ответов неизвестен, они не скачиваются вовсе.
+    """
+    def __init__(
+        self,
+        resource_types: Iterable[str] = ("image", "media", "font", "stylesheet"),
+        url_patterns: Iterable[str] = (),
+        block_domains: Iterable[str] = (),
+        allow_domains: Iterable[str]|None = None,
+    ) -> None:
+        self.resource_types = set(resource_types)
+        self.url_patterns = list(url_patterns)
+        self.block_domains = set(block_domains)
+        self.allow_domains = set(allow_domains) if allow_domains is not None else None
+
+        self.blocked: Counter = Counter()
+        self.loaded_bytes = 0
+
+        self._handlers: Dict[Page, tuple] = {}
+
+    @property
+    def blocked_count(self) -> int:
+        return sum(self.blocked.values())
+
+    def should_block(self, request: Request) -> bool:
+        if request.resourceType == "document":
+            return False
+        if request.resourceType in self.resource_types:
+            return True
+
+        host = urlsplit(request.url).hostname or ""
+        if self.allow_domains is not None and not _match_domain(host, self.allow_domains):
+            return True
+        if _match_domain(host, self.block_domains):
+            return True
+
+        return any(fnmatch(request.url, pattern) for pattern in self.url_patterns)
+
+    async def _on_request(self, request: Request) -> None:
+        if self.should_block(request):
+            self.blocked[request.resourceType] += 1
+            await request.abort()
+        else:
+            await request.continue_()
+
+    def _on_response(self, response: Response) -> None:
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.loaded_bytes += int(length)
+
+    async def attach(self, page: Page) -> None:
+        """ Включить политику на вкладке (на время, пока вкладка занята) """
+        on_request: Callable = lambda request: asyncio.ensure_future(
+            self._on_request(request)
+        )
+        on_response: Callable = self._on_response
+
+        await page.setRequestInterception(True)
+        page.on("request", on_request)
+        page.on("response", on_response)
+        self._handlers[page] = (on_request, on_response)
+
+    async def detach(self, page: Page) -> None:
+        """ 
+        Вернуть вкладку в обычный режим перед возвратом в пул. Вызывается в
+        finally, поэтому не бросает ошибок, чтобы не скрыть исходную (например,
+        падение браузера): вкладка, которую не удалось вернуть в обычный
+        режим, закрывается, и пул заменит ее новой
+        """
+        handlers = self._handlers.pop(page, None)
+        if handlers is not None:
+            page.remove_listener("request", handlers[0])
+            page.remove_listener("response", handlers[1])
+        if page.isClosed():
+            return
+
+        try:
+            await page.setRequestInterception(False)
+        except Exception as exp:
+            logger.warning(f"Перехват запросов не снялся с вкладки: {exp!r}")
+            try:
+                await page.close()
+            except Exception:
+                pass
@@ -0,0 +1,257 @@
+"""
+    Модуль метрик. MetricsMiddleware замеряет каждую стадию событий
+    (гистограммы задержек по роутерам и событиям, скачанные байты, страницы,
+    ошибки, стадии в работе), а экспортер отдает их наружу: текстом
+    Prometheus по http или строкой в лог раз в несколько секунд.
+"""
+
+import asyncio
+import bisect
+import time
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+from .middleware import FETCH, Middleware, Stage
+
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """ Гистограмма задержек с фиксированными границами корзин (секунды) """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1) # последняя - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """ Накопленные счетчики корзин в формате Prometheus """
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """ Приблизительный квантиль: верхняя граница нужной корзины """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsMiddleware(Middleware):
+    """
+    Сбор метрик событий. Страницей считается успешное скачивание, ошибки
+    считаются по стадиям. exporter - LogExporter, PrometheusExporter или
+    свой объект с методами start(metrics) и close()
+    """
+    def __init__(self, exporter=None, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.exporter = exporter
+        self.buckets = tuple(buckets)
+
+        self.latency: Dict[tuple, Histogram] = {}
+        self.in_flight: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.pages: Counter = Counter()
+        self.bytes: Counter = Counter()
+
+        self.dispatcher = None
+        self.started_at = time.monotonic()
+
+    async def start(self, dispatcher) -> None:
+        self.dispatcher = dispatcher
+        self.started_at = time.monotonic()
+        if self.exporter:
+            await self.exporter.start(self)
+
+    async def close(self) -> None:
+        if self.exporter:
+            await self.exporter.close()
+
+    async def before(self, stage: Stage) -> None:
+        self.in_flight[(stage.router, stage.name)] += 1
+
+    async def after(self, stage: Stage) -> None:
+        self.in_flight[(stage.router, stage.name)] -= 1
+
+        key = (stage.router, stage.event_name, stage.name)
+        if key not in self.latency:
+            self.latency[key] = Histogram(self.buckets)
+        self.latency[key].observe(stage.elapsed)
+
+        if stage.error is not None:
+            self.errors[key] += 1
+        elif stage.name == FETCH:
+            self.pages[stage.router] += 1
+            self.bytes[stage.router] += stage.size
+
+    @property
+    def tabs(self) -> Tuple[int, int]:
+        """ Открытые и свободные вкладки пула диспетчера """
+        pool = self.dispatcher.pool if self.dispatcher else None
+        if pool is None:
+            return 0, 0
+        return pool.size, pool.idle
+
+    def pages_per_second(self, router: str) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.pages[router] / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        """ Сводка по роутерам для лога и надзирателя """
+        routers = {router for router, _, _ in self.latency}
+        tabs, idle = self.tabs
+        return {
+            "tabs": tabs,
+            "idle_tabs": idle,
+            "routers": {
+                router: {
+                    "pages": self.pages[router],
+                    "pages_per_second": self.pages_per_second(router),
+                    "bytes": self.bytes[router],
+                    "errors": sum(
+                        count for (name, _, _), count in self.errors.items()
+                        if name == router
+                    ),
+                    "in_flight": sum(
+                        count for (name, _), count in self.in_flight.items()
+                        if name == router
+                    ),
+                    "fetch_p95": max(
+                        (
+                            histogram.quantile(0.95)
+                            for (name, _, stage), histogram in self.latency.items()
+                            if name == router and stage == FETCH
+                        ),
+                        default=0.0,
+                    ),
+                }
+                for router in sorted(routers)
+            },
+        }
+
+    def render(self) -> str:
+        """ Все метрики в текстовом формате Prometheus """
+        lines = [
+            "# TYPE curcheck_stage_seconds histogram",
+        ]
+        for (router, event, stage), histogram in sorted(self.latency.items()):
+            labels = f'router="{router}",event="{event}",stage="{stage}"'
+            for bound, count in histogram.cumulative():
+                lines.append(
+                    f'curcheck_stage_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(f"curcheck_stage_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"curcheck_stage_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# TYPE curcheck_stage_errors_total counter")
+        for (router, event, stage), count in sorted(self.errors.items()):
+            lines.append(
+                f'curcheck_stage_errors_total{{router="{router}",event="{event}",'
+                f'stage="{stage}"}} {count}'
+            )
+
+        lines.append("# TYPE curcheck_stage_in_flight gauge")
+        for (router, stage), count in sorted(self.in_flight.items()):
+            lines.append(
+                f'curcheck_stage_in_flight{{router="{router}",stage="{stage}"}} {count}'
+            )
+
+        lines.append("# TYPE curcheck_pages_total counter")
+        for router, count in sorted(self.pages.items()):
+            lines.append(f'curcheck_pages_total{{router="{router}"}} {count}')
+
+        lines.append("# TYPE curcheck_bytes_total counter")
+        for router, count in sorted(self.bytes.items()):
+            lines.append(f'curcheck_bytes_total{{router="{router}"}} {count}')
+
+        tabs, idle = self.tabs
+        lines.append("# TYPE curcheck_tabs gauge")
+        lines.append(f"curcheck_tabs {tabs}")
+        lines.append("# TYPE curcheck_idle_tabs gauge")
+        lines.append(f"curcheck_idle_tabs {idle}")
+
+        return "\n".join(lines) + "\n"
+
+
+class LogExporter:
+    """ Раз в interval секунд пишет сводку метрик в лог одной строкой на роутер """
+    def __init__(self, interval: float = 30) -> None:
+        self.interval = interval
+        self._task: asyncio.Task|None = None
+
+    async def start(self, metrics: MetricsMiddleware) -> None:
+        self._task = asyncio.ensure_future(self._report(metrics))
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _report(self, metrics: MetricsMiddleware) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            snapshot = metrics.snapshot()
+            for router, stats in snapshot["routers"].items():
+                logger.info(
+                    f"{router}: {stats['pages']} стр. "
+                    f"({stats['pages_per_second']:.2f}/с), "
+                    f"{stats['bytes'] / 1024:.0f} КБ, "
+                    f"в работе {stats['in_flight']}, ошибок {stats['errors']}, "
+                    f"p95 скачивания {stats['fetch_p95']}с"
+                )
+            if snapshot["tabs"]:
+                logger.info(
+                    f"Вкладок {snapshot['tabs']}, свободно {snapshot['idle_tabs']}"
+                )
+
+
+class PrometheusExporter:
+    """
+    Отдает метрики по http://host:port/metrics в формате Prometheus. В
+    многопроцессном режиме воркер i слушает порт port + i
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner|None = None
+
+    async def start(self, metrics: MetricsMiddleware) -> None:
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(
+                text=metrics.render(),
+                content_type="text/plain",
+                charset="utf-8",
+            )
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+
+        port = self.port + getattr(metrics.dispatcher, "worker", 0)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, port).start()
+        logger.info(f"Метрики: http://{self.host}:{port}/metrics")
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,76 @@
+"""
+    Модуль промежуточных обработчиков (middleware). Каждая стадия события -
+    скачивание, парсинг и вызов функции - оборачивается цепочкой
+    обработчиков: before вызывается по порядку подключения, after - в
+    обратном порядке, даже если стадия упала.
+"""
+
+import time
+
+from contextlib import asynccontextmanager
+from typing import List
+
+
+FETCH, PARSE, CALLBACK = "fetch", "parse", "callback"
+
+
+class Stage:
+    """ Одна стадия события: что выполняется, сколько заняло и чем кончилось """
+    def __init__(self, event, name: str) -> None:
+        self.event = event
+        self.name = name
+
+        self.started = time.perf_counter()
+        self.elapsed: float = 0.0
+        self.error: BaseException|None = None
+        self.size = 0 # скачано байт, для стадии скачивания
+
+    @property
+    def router(self) -> str:
+        return self.event.domain or ""
+
+    @property
+    def event_name(self) -> str:
+        return self.event.name or type(self.event).__name__
+
+    def __repr__(self) -> str:
+        return (
+            f"<Stage {self.router} {self.event_name}.{self.name} "
+            f"{self.elapsed:.3f}s error={self.error!r}>"
+        )
+
+
+class Middleware:
+    """
+    Базовый промежуточный обработчик. Подключается к роутеру или сразу ко
+    всем роутерам диспетчера через include_middleware. start и close
+    вызываются диспетчером при запуске и остановке
+    """
+    async def start(self, dispatcher) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def before(self, stage: Stage) -> None:
+        pass
+
+    async def after(self, stage: Stage) -> None:
+        pass
+
+
+@asynccontextmanager
+async def run_stage(middlewares: List[Middleware], event, name: str):
+    """ Выполнить стадию name события внутри цепочки обработчиков """
+    stage = Stage(event, name)
+    for middleware in middlewares:
+        await middleware.before(stage)
+    try:
+        yield stage
+    except Exception as exp:
+        stage.error = exp
+        raise
+    finally:
+        stage.elapsed = time.perf_counter() - stage.started
+        for middleware in reversed(middlewares):
+            await middleware.after(stage)
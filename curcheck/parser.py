@@ -0,0 +1,129 @@
+"""
+    Модуль стадии парсинга. Разбор html и тяжелые синхронные функции-обработчики
+    можно вынести из цикла событий в пул потоков или процессов, чтобы большие
+    страницы не останавливали остальные запросы.
+"""
+
+import asyncio
+import functools
+import importlib
+import inspect
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+from lxml import html
+
+from .errors import ConfigurationError
+
+
+def _resolve(module: str, qualname: str) -> Callable:
+    """
+    Найти функцию-обработчик по имени внутри процесса-воркера. Декораторы
+    событий подменяют функцию в модуле, поэтому берется исходная функция
+    """
+    obj = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return inspect.unwrap(obj)
+
+
+def _extract(func: Callable, text: str, *args, **kwargs):
+    result = func(html.fromstring(text), *args, **kwargs)
+    if inspect.isgenerator(result):
+        # генератор не передать из процесса, результаты собираются здесь
+        return list(result)
+    return result
+
+
+def _extract_schema(schema, text: str):
+    return schema.extract(html.fromstring(text))
+
+
+def _extract_by_name(module: str, qualname: str, text: str, *args, **kwargs):
+    return _extract(_resolve(module, qualname), text, *args, **kwargs)
+
+
+class Parser:
+    """
+    Стадия парсинга и обработки страниц.
+
+    mode="inline" - все в цикле событий (как раньше), "thread" - разбор и
+    синхронные обработчики в пуле потоков, "process" - синхронные обработчики
+    вместе с разбором в пуле процессов: туда уходит только текст страницы, а
+    обратно только результат обработчика. Асинхронные обработчики всегда
+    выполняются в цикле событий, в режиме "process" для них страница
+    разбирается в пуле потоков. workers - размер пула.
+    """
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, mode: str = "inline", workers: int|None = None) -> None:
+        if mode not in self.MODES:
+            raise ConfigurationError(
+                f"Ошибка! Неизвестный режим парсинга {mode!r}, "
+                f"доступны: {', '.join(self.MODES)}"
+            )
+
+        self.mode = mode
+        self.workers = workers
+
+        self._threads: ThreadPoolExecutor|None = None
+        self._processes: ProcessPoolExecutor|None = None
+
+    def _thread_pool(self) -> Executor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers)
+        return self._threads
+
+    def _process_pool(self) -> Executor:
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.workers)
+        return self._processes
+
+    async def parse(self, text: str) -> html.HtmlElement:
+        if self.mode == "inline":
+            return html.fromstring(text)
+
+        return await asyncio.get_event_loop().run_in_executor(
+            self._thread_pool(), html.fromstring, text
+        )
+
+    async def extract(self, func: Callable, text: str, *args, **kwargs):
+        """ Разобрать страницу и вызвать синхронный обработчик func(tree) """
+        loop = asyncio.get_event_loop()
+
+        if self.mode == "inline":
+            return _extract(func, text, *args, **kwargs)
+        elif self.mode == "thread":
+            return await loop.run_in_executor(
+                self._thread_pool(),
+                functools.partial(_extract, func, text, *args, **kwargs)
+            )
+        else:
+            return await loop.run_in_executor(
+                self._process_pool(),
+                functools.partial(
+                    _extract_by_name,
+                    func.__module__, func.__qualname__, text, *args, **kwargs
+                )
+            )
+
+    async def extract_schema(self, schema, text: str):
+        """ Разобрать страницу и собрать записи по схеме (curcheck.schema) """
+        if self.mode == "inline":
+            return _extract_schema(schema, text)
+
+        # в процесс схема уходит без скомпилированных xpath
+        executor = self._thread_pool() if self.mode == "thread" else self._process_pool()
+        return await asyncio.get_event_loop().run_in_executor(
+            executor, _extract_schema, schema, text
+        )
+
+    def close(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+            self._processes = None
+
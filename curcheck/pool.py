@@ -0,0 +1,391 @@
+"""
+    Модуль пула вкладок браузера. Вместо создания и закрытия вкладки на каждую
+    страницу, события берут уже открытые вкладки из пула и возвращают их обратно.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, List
+
+from loguru import logger
+
+from .errors import BrowserCrashError
+
+if TYPE_CHECKING:
+    from pyppeteer.browser import Browser
+    from pyppeteer.page import Page
+
+
+class BrowserState:
+    """ Учет одного браузера пула """
+    def __init__(self, browser: Browser) -> None:
+        self.browser = browser
+        self.primed: Dict[str, list] = {} # куки, уже выставленные в браузер
+        self.navigations = 0 # сколько раз выдавались его вкладки
+        self.busy = 0 # вкладки на руках у событий
+        self.alive = True
+        self.retiring = False
+        self.launched_at = time.monotonic()
+        self.drained = asyncio.Event()
+
+
+class PagePool:
+    """
+    Пул вкладок: browsers_count браузеров по pages_per_browser вкладок в
+    каждом. Вкладка переиспользуется не более max_page_uses раз, после чего
+    закрывается и заменяется новой. Куки роутера выставляются в браузер один
+    раз, а не на каждую страницу.
+
+    Браузеры запускаются при первой просьбе вкладки или заранее через
+    start(); одновременные вызовы ждут один общий запуск. Упавший браузер
+    пул запускает заново, а события, у которых была его вкладка, получают
+    BrowserCrashError и повторяются с новой вкладкой.
+    """
+    def __init__(
+        self,
+        browsers_count: int = 1,
+        pages_per_browser: int = 5,
+        max_page_uses: int = 50,
+        launch_options: dict|None = None,
+        **launch_kwargs
+    ) -> None:
+        self.browsers_count = browsers_count
+        self.pages_per_browser = pages_per_browser
+        self.max_page_uses = max_page_uses
+        self.launch_options = launch_options
+        self.launch_kwargs = launch_kwargs
+
+        self.browsers: List[Browser] = []
+        self.states: Dict[Browser, BrowserState] = {}
+        self.relaunches = 0 # браузеры, запущенные заново после падения
+        self.recycles = 0 # браузеры, плановно замененные новыми
+
+        self._idle: asyncio.Queue|None = None
+        self._owners: Dict[Page, BrowserState] = {}
+        self._dedicated: Dict[Page, BrowserState] = {} # вкладки вне пула
+        self._uses: Dict[Page, int] = {}
+        self._own_browsers = True
+        self._starting: asyncio.Lock|None = None
+        self._closing = False
+        self._tasks: set = set()
+        self.started = False
+
+    @property
+    def size(self) -> int:
+        return len(self.browsers) * self.pages_per_browser
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize() if self._idle else 0
+
+    async def start(self, browsers: List[Browser]|None = None) -> None:
+        """
+        Запуск браузеров и открытие вкладок. Если переданы уже запущенные
+        браузеры, пул работает поверх них и не закрывает их при остановке.
+        Повторный вызов ничего не делает.
+        """
+        if self._starting is None:
+            self._starting = asyncio.Lock()
+        async with self._starting:
+            if self.started:
+                return
+            await self._start(browsers)
+            self.started = True
+
+    async def _start(self, browsers: List[Browser]|None) -> None:
+        self._idle = asyncio.Queue()
+        self._closing = False
+
+        if browsers:
+            self._own_browsers = False
+        else:
+            browsers = await asyncio.gather(*[
+                self._launch() for _ in range(self.browsers_count)
+            ])
+
+        for browser in browsers:
+            await self._add_browser(browser)
+
+    async def _launch(self) -> Browser:
+        from pyppeteer import launch
+
+        return await launch(options=self.launch_options, **self.launch_kwargs)
+
+    async def _add_browser(self, browser: Browser) -> None:
+        """ Открыть вкладки браузера и следить за его падением """
+        state = BrowserState(browser)
+        browser.on("disconnected", lambda: self._disconnected(state))
+        pages = await asyncio.gather(*[
+            self._new_page(state) for _ in range(self.pages_per_browser)
+        ])
+
+        self.browsers.append(browser)
+        self.states[browser] = state
+        for page in pages:
+            self._idle.put_nowait(page)
+
+    def _remove_browser(self, state: BrowserState) -> None:
+        """ Убрать браузер из пула вместе с его свободными вкладками """
+        if state.browser in self.states:
+            self.browsers.remove(state.browser)
+            del self.states[state.browser]
+
+        keep = []
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            if self._owners.get(page) is state:
+                del self._owners[page]
+                del self._uses[page]
+            else:
+                keep.append(page)
+        for page in keep:
+            self._idle.put_nowait(page)
+
+    async def _new_page(self, state: BrowserState) -> Page:
+        page = await state.browser.newPage()
+        page.setDefaultNavigationTimeout(0)
+        self._owners[page] = state
+        self._uses[page] = 0
+        return page
+
+    def _disconnected(self, state: BrowserState) -> None:
+        if not state.alive:
+            return
+        state.alive = False
+        if state.busy == 0:
+            state.drained.set()
+        if self._closing or state.retiring:
+            return
+
+        logger.warning(f"Браузер упал, вкладок в работе: {state.busy}")
+        self._remove_browser(state)
+        if self._own_browsers:
+            self.relaunches += 1
+            self._spawn(self._relaunch())
+
+    async def _relaunch(self) -> None:
+        delay = 1.0
+        while not self._closing:
+            try:
+                await self._add_browser(await self._launch())
+                return
+            except Exception as exp:
+                logger.error(f"Браузер не запустился заново: {exp!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def recycle(self, browser: Browser, drain_timeout: float|None = 60) -> None:
+        """
+        Заменить браузер новым: сначала запускается замена, затем старый
+        дорабатывает вкладки на руках (не дольше drain_timeout) и закрывается
+        """
+        state = self.states.get(browser)
+        if state is None or state.retiring or not self._own_browsers:
+            return
+
+        # пока запускается замена, старый браузер продолжает работать
+        replacement = await self._launch()
+        if self.states.get(browser) is not state or state.retiring:
+            await replacement.close()
+            return
+
+        state.retiring = True
+        self.recycles += 1
+        await self._add_browser(replacement)
+        self._remove_browser(state)
+        if state.busy:
+            try:
+                await asyncio.wait_for(state.drained.wait(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Браузер закрывается с {state.busy} вкладками в работе"
+                )
+
+        state.alive = False
+        try:
+            await browser.close()
+        except Exception as exp:
+            logger.debug(f"Браузер закрылся с ошибкой: {exp!r}")
+
+    def healthy(self, page: Page) -> bool:
+        """ Браузер вкладки жив и не ждет замены """
+        state = self._owners.get(page) or self._dedicated.get(page)
+        return state is not None and state.alive and not state.retiring
+
+    async def open_page(
+        self, cookies_key: str|None = None, cookies: list|None = None
+    ) -> Page:
+        """
+        Открыть отдельную вкладку вне пула (например, для прогретых
+        вкладок). Она открывается сверх pages_per_browser в браузере с
+        наименьшим числом таких вкладок, не занимает места свободных вкладок
+        и не задерживает замену браузера: когда ее браузер упал или
+        заменяется, healthy() ее больше не пропускает. Закрывается через
+        close_page()
+        """
+        if not self.started:
+            await self.start()
+
+        states = [
+            state for state in self.states.values()
+            if state.alive and not state.retiring
+        ]
+        if not states:
+            # браузеры запускаются заново, событие повторится
+            raise BrowserCrashError()
+        dedicated = list(self._dedicated.values())
+        state = min(states, key=dedicated.count)
+
+        page = await state.browser.newPage()
+        page.setDefaultNavigationTimeout(0)
+        self._dedicated[page] = state
+        if cookies:
+            try:
+                await page.setCookie(*cookies)
+            except BaseException:
+                await self.close_page(page)
+                raise
+            state.primed[cookies_key] = cookies
+        return page
+
+    async def close_page(self, page: Page) -> None:
+        """ Закрыть вкладку из open_page() """
+        state = self._dedicated.pop(page, None)
+        if state is None or not state.alive:
+            return
+        try:
+            if not page.isClosed():
+                await page.close()
+        except Exception as exp:
+            logger.debug(f"Вкладка закрылась с ошибкой: {exp!r}")
+
+    async def checkout(
+        self, cookies_key: str|None = None, cookies: list|None = None
+    ) -> Page:
+        """
+        Взять свободную вкладку из пула. Куки с ключом cookies_key (обычно
+        домен роутера) выставляются в браузер только при первом использовании
+        или если сам список куки поменялся.
+        """
+        if not self.started:
+            await self.start()
+
+        page = await self._idle.get()
+        state = self._owners[page]
+
+        self._uses[page] += 1
+        state.navigations += 1
+        state.busy += 1
+
+        if cookies and state.primed.get(cookies_key) is not cookies:
+            try:
+                await page.setCookie(*cookies)
+            except BaseException:
+                # вкладка уже числится выданной, ее место не должно пропасть
+                await self.checkin(page, discard=True)
+                raise
+            state.primed[cookies_key] = cookies
+
+        return page
+
+    async def checkin(self, page: Page, discard: bool = False) -> None:
+        """ Вернуть вкладку в пул. Изношенная вкладка заменяется новой. """
+        state = self._owners.pop(page, None)
+        if state is None:
+            # пул уже закрыт, вкладка закрылась вместе с ним
+            return
+        uses = self._uses.pop(page)
+        state.busy -= 1
+
+        if not state.alive or state.retiring:
+            # вкладки упавшего или уходящего браузера в пул не возвращаются
+            if state.busy == 0:
+                state.drained.set()
+            return
+
+        if not (discard or uses >= self.max_page_uses or page.isClosed()):
+            self._owners[page] = state
+            self._uses[page] = uses
+            self._idle.put_nowait(page)
+            return
+
+        try:
+            if not page.isClosed():
+                await page.close()
+        except Exception as exp:
+            logger.debug(f"Вкладка закрылась с ошибкой: {exp!r}")
+
+        try:
+            page = await self._new_page(state)
+        except BaseException as exp:
+            # место вкладки не пропадает: новая откроется в фоне
+            logger.warning(f"Вкладка на замену не открылась: {exp!r}")
+            self._spawn(self._reopen(state))
+            if not isinstance(exp, Exception):
+                raise
+            return
+
+        self._idle.put_nowait(page)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reopen(self, state: BrowserState) -> None:
+        """ Открывать вкладку на место пропавшей, пока браузер жив """
+        delay = 0.1
+        while not self._closing and state.alive and not state.retiring:
+            try:
+                self._idle.put_nowait(await self._new_page(state))
+                return
+            except Exception as exp:
+                logger.warning(f"Вкладка на замену не открылась: {exp!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    @asynccontextmanager
+    async def page(
+        self, cookies_key: str|None = None, cookies: list|None = None
+    ):
+        page = await self.checkout(cookies_key=cookies_key, cookies=cookies)
+        state = self._owners[page]
+        try:
+            yield page
+        except Exception as exp:
+            await self.checkin(page, discard=True)
+            if not state.alive:
+                raise BrowserCrashError() from exp
+            raise
+        except BaseException:
+            await self.checkin(page, discard=True)
+            raise
+        else:
+            await self.checkin(page)
+
+    async def close(self) -> None:
+        self._closing = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._own_browsers:
+            await asyncio.gather(
+                *[browser.close() for browser in self.browsers]
+            )
+        else:
+            await asyncio.gather(*[
+                page.close() for page in [*self._owners, *self._dedicated]
+                if not page.isClosed()
+            ])
+
+        self.browsers = []
+        self.states.clear()
+        self._owners.clear()
+        self._dedicated.clear()
+        self._uses.clear()
+        self.started = False
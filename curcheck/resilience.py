@@ -0,0 +1,182 @@
+"""
+    Модуль устойчивости запросов: таймауты, повторы с экспоненциальной
+    задержкой и предохранители (circuit breaker) для каждого домена.
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from typing import Awaitable, Callable, Dict, Iterable
+from urllib.parse import urlsplit
+
+from aiohttp import ClientError, ClientTimeout
+
+from .errors import BrowserCrashError, CircuitOpenError, HTTPStatusError
+
+
+class CircuitBreaker:
+    """
+    Предохранитель домена. После failure_threshold ошибок подряд запросы к
+    домену не отправляются reset_timeout секунд, затем пропускается один
+    пробный: если он успешен, домен снова открыт. allow() выдает пропуск,
+    и закончить пробу может только запрос с пропуском пробы.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at: float|None = None
+        self._probe: object|None = None # пропуск пробного запроса
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> object|None:
+        """ Пропуск запроса: None - домен закрыт, иначе его нужно вернуть """
+        if self.opened_at is None:
+            return True
+        if self._probe is not None or time.monotonic() - self.opened_at < self.reset_timeout:
+            return None
+        # полуоткрыт: пропускаем один пробный запрос
+        self._probe = object()
+        return self._probe
+
+    def record_success(self, ticket: object|None = None) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.release(ticket)
+
+    def record_failure(self, ticket: object|None = None) -> None:
+        self.failures += 1
+        probe = ticket is not None and ticket is self._probe
+        if probe or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.release(ticket)
+
+    def release(self, ticket: object|None = None) -> None:
+        """
+        Пробный запрос закончился без итога (отменен, упал браузер или
+        ошибка не сети): следующий запрос снова может стать пробным.
+        Обычные запросы, начатые до пробы, ее не снимают
+        """
+        if ticket is not None and ticket is self._probe:
+            self._probe = None
+
+
+class Resilience:
+    """
+    Настройки устойчивости запросов диспетчера.
+
+    connect_timeout и read_timeout - таймауты соединения и чтения http
+    (секунды), total_timeout - предел на весь http-запрос вместе с телом
+    (медленная отдача по байту не держит воркер), navigation_timeout - таймаут загрузки страницы в браузере.
+    Сетевые ошибки, таймауты и статусы из retry_statuses повторяются до
+    retries раз с задержкой base_delay * 2^попытка (не больше max_delay) и
+    случайным разбросом. Домен, на котором запросы падают подряд,
+    отключается предохранителем.
+    """
+    def __init__(
+        self,
+        connect_timeout: float|None = 10,
+        read_timeout: float|None = 30,
+        total_timeout: float|None = 120,
+        navigation_timeout: float|None = 60,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30,
+        retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.navigation_timeout = navigation_timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = set(retry_statuses)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def timeout(self) -> ClientTimeout:
+        return ClientTimeout(
+            total=self.total_timeout,
+            sock_connect=self.connect_timeout, 
+            sock_read=self.read_timeout,
+        )
+
+    @property
+    def navigation_options(self) -> dict:
+        """ Параметры goto/reload для pyppeteer (таймаут в миллисекундах) """
+        if self.navigation_timeout is None:
+            return {"timeout": 0}
+        return {"timeout": int(self.navigation_timeout * 1000)}
+
+    def check_status(self, link: str, status: int) -> None:
+        if status in self.retry_statuses:
+            raise HTTPStatusError(link, status)
+
+    def breaker(self, link: str) -> CircuitBreaker:
+        domain = urlsplit(link).netloc
+        if domain not in self.breakers:
+            self.breakers[domain] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        return self.breakers[domain]
+
+    @staticmethod
+    def is_retryable(exp: BaseException) -> bool:
+        if isinstance(exp, (
+            asyncio.TimeoutError, ClientError, HTTPStatusError, BrowserCrashError,
+        )):
+            return True
+
+        # ошибки браузера бывают, только если pyppeteer уже загружен
+        errors = sys.modules.get("pyppeteer.errors")
+        return errors is not None and isinstance(exp, (
+            errors.TimeoutError, errors.NetworkError, errors.PageError,
+        ))
+
+    def delay(self, attempt: int) -> float:
+        """ Экспоненциальная задержка с полным случайным разбросом """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, link: str, func: Callable[[], Awaitable]):
+        """
+        Выполнить запрос func с повторами. func вызывается заново на каждую
+        попытку, чтобы каждая шла через общую очередь отдельно
+        """
+        breaker = self.breaker(link)
+        attempt = 0
+        while True:
+            ticket = breaker.allow()
+            if ticket is None:
+                raise CircuitOpenError(urlsplit(link).netloc)
+
+            try:
+                result = await func()
+            except Exception as exp:
+                if not self.is_retryable(exp):
+                    raise
+                # падение браузера - не вина домена
+                if not isinstance(exp, BrowserCrashError):
+                    breaker.record_failure(ticket)
+                if attempt >= self.retries:
+                    raise
+            else:
+                breaker.record_success(ticket)
+                return result
+            finally:
+                # иначе домен после такой пробы закрыт навсегда
+                breaker.release(ticket)
+
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
@@ -5,21 +5,41 @@
     отдельном сайте для наиболее эффективного парсинга.
 """
 
+from __future__ import annotations
+
 import asyncio
-import json
 import functools
 
 from loguru import logger
 
 from abc import ABC, abstractmethod
 
-from typing import List, Awaitable
+from typing import TYPE_CHECKING, Callable, Dict, List, Awaitable, Tuple
 from aiohttp import ClientSession
 
-from pyppeteer import launch
-from pyppeteer.browser import Browser
-
-from .events import AbstractEvent, EventPage, EventPaginator, EventLongpoll
+from .cache import HTTPCache
+from .checkpoint import CrawlStore
+from .cookies import CookieStore
+from .events import (
+    AbstractEvent, EventPage, EventPaginator, EventCrawler, EventLongpoll
+)
+from .frontier import Frontier
+from .handoff import Handoff
+from .interception import InterceptionPolicy
+from .middleware import Middleware
+from .parser import Parser
+from .pool import PagePool
+from .resilience import Resilience
+from .schema import Schema
+from .scheduler import LongpollScheduler
+from .seen import SeenSet
+from .sinks import ResultPipeline, Sink
+from .watch import Watch
+from .serving import SingleFlight, TTLCache, WarmTabs, call_key
+from .session import create_session
+
+if TYPE_CHECKING:
+    from pyppeteer.browser import Browser
 
 
 class AbstractRouter(ABC):
@@ -30,18 +50,35 @@ class AbstractRouter(ABC):
         is_login: bool = False, 
         login_wait: int = 60,
         login_aux: Awaitable|None = None,
-        debug: bool = True
+        debug: bool = True,
+        interception: InterceptionPolicy|None = None,
+        account: str = "default",
     ) -> None:
         self.domain = domain
         self.is_spa = is_spa
         self.is_login = is_login
         self.login_wait = login_wait # Сколько надо ждать чтобы залогиниться
         self.login_aux = login_aux
+        self.account = account # аккаунт домена в хранилище куки
         self.debug = debug
+        self.interception = interception # блокировка ресурсов для spa
 
         self.browser: Browser|None = None
+        self.pool: PagePool|None = None
+        self.session: ClientSession|None = None
+        self.frontier: Frontier|None = None # выставляется диспетчером
+        self.cache: HTTPCache|None = None # выставляется диспетчером
+        self.store: CrawlStore|None = None # выставляется диспетчером
+        self.seen: SeenSet|None = None # выставляется диспетчером
+        self.resilience: Resilience|None = None # выставляется диспетчером
+        self.scheduler: LongpollScheduler|None = None # выставляется диспетчером
+        self.middlewares: List[Middleware] = []
+        self.shared_middlewares: List[Middleware] = [] # выставляется диспетчером
+        self.parser: Parser|None = None
 
         self.cookie: list|None = None
+        # общее хранилище куки, диспетчер заменяет его своим
+        self.cookie_store = CookieStore()
 
     @abstractmethod
     def paginate_page(
@@ -50,9 +87,19 @@ class AbstractRouter(ABC):
         pages_links_xpath: str, 
         count_in_approach: int = 10,
         auxiliary_function: Awaitable|None = None, 
-        paginate_urls: List[str]|None = None
+        paginate_urls: List[str]|None = None,
+        stream: bool = False,
+        stop_xpath: str|None = None,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
     ) -> EventPaginator:
-        """ Выполнения сразу несколько страниц в несолько потоков. """
+        """ 
+        Выполнения сразу несколько страниц в несолько потоков. stream - для
+        mpa разбирать страницы по мере скачивания, stop_xpath - прекратить
+        скачивание страницы со ссылками, как только он найден, interception -
+        своя политика блокировки ресурсов вместо политики роутера, schema -
+        функция получает записи по схеме (curcheck.schema) вместо страницы
+        """
         paginator = EventPaginator(
             domain=self.domain, 
             url=url,
@@ -61,71 +108,118 @@ class AbstractRouter(ABC):
             is_browser=self.is_spa,
             auxiliary_function=auxiliary_function,
             paginate_urls=paginate_urls,
+            stream=stream,
+            stop_xpath=stop_xpath,
         )
+        paginator.interception = interception or self.interception
+        paginator.schema = schema
 
         return paginator
 
     @abstractmethod
-    def page(self, url: str) -> EventPage:
-        """ Исполнение 1 страницы """
+    def page(
+        self, 
+        url: str, 
+        skip_unchanged: bool = False, 
+        stream: bool = False,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
+    ) -> EventPage:
+        """ 
+        Исполнение 1 страницы. skip_unchanged - не вызывать функцию, если
+        страница не поменялась с прошлого запроса этого события (кэш
+        диспетчера не обязателен, с ним запрос условный), stream - для mpa разбирать страницу по мере скачивания, schema -
+        функция получает записи по схеме вместо страницы
+        """
         page = EventPage(
             domain=self.domain, 
             url=url,
             is_browser=self.is_spa,
+            skip_unchanged=skip_unchanged,
+            stream=stream,
         )
+        page.interception = interception or self.interception
+        page.schema = schema
 
         return page
 
     @abstractmethod
     def longpoll(
-        self, url: str, timeout: int = 60, count: int|None = None
+        self, 
+        url: str, 
+        timeout: int = 60, 
+        count: int|None = None,
+        skip_unchanged: bool = False,
+        interception: InterceptionPolicy|None = None,
+        watch: Watch|None = None,
     ) -> EventLongpoll:
         """ 
         Постоянно выполнение 1 страницы раз в опредленное время определенное
-        кол-во раз(можно бесконечно). """
+        кол-во раз(можно бесконечно). watch - вызывать функцию только с
+        изменениями элементов страницы (Diff) вместо всей страницы
+        """
         longpoll = EventLongpoll(
             domain=self.domain,
             url=url,
             timeout=timeout,
             count=count,
             is_browser=self.is_spa,
+            skip_unchanged=skip_unchanged,
+            watch=watch,
         )
+        longpoll.interception = interception or self.interception
 
         return longpoll
 
+    @abstractmethod
+    def crawl(
+        self,
+        url: str,
+        links_xpath: str|List[str],
+        max_depth: int = 2,
+        max_pages: int = 1000,
+        allow_domains: List[str]|None = None,
+        allow_paths: List[str]|None = None,
+        deny_paths: List[str]|None = None,
+        concurrency: int = 10,
+        score: Callable[[str, int], float]|None = None,
+        interception: InterceptionPolicy|None = None,
+    ) -> EventCrawler:
+        """ 
+        Рекурсивный обход сайта от url: ссылки links_xpath (или список по
+        глубинам) не глубже max_depth и не больше max_pages страниц, только
+        на allow_domains и путях allow_paths/deny_paths (регулярные
+        выражения). score(ссылка, глубина) - сначала лучшие страницы
+        """
+        crawler = EventCrawler(
+            domain=self.domain,
+            url=url,
+            links_xpath=links_xpath,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            allow_domains=allow_domains,
+            allow_paths=allow_paths,
+            deny_paths=deny_paths,
+            concurrency=concurrency,
+            score=score,
+            is_browser=self.is_spa,
+        )
+        crawler.interception = interception or self.interception
+
+        return crawler
+
     @abstractmethod
     def _set_cookies_in_pages(self, cookie) -> None:
         pass
 
-    async def _login_aux_func(self) -> None:
-        try:
-            with open(f"{self.domain.split('/')[-1]}.json") as f:
-                self._set_cookies_in_pages(json.load(f))
-        except FileNotFoundError:
-            browser = await launch(headless=False)
-            page = await browser.newPage()
-            page.setDefaultNavigationTimeout(0)
-            await page.goto(self.domain)
-            await page.evaluate(
-                f"() => alert('Привет, это окно для логина. "
-                f"Обязательно нажми ок и залогинься в течении {self.login_wait} секунд.')"
-            )
-            await asyncio.sleep(self.login_wait)
+    async def _login(self) -> list:
+        """ Войти в аккаунт в отдельном видимом браузере и вернуть куки """
+        from pyppeteer import launch
 
-            with open(f"{self.domain.split('/')[-1]}.json", 'w+') as f:
-                json.dump(await page.cookies(), f)
-                self._set_cookies_in_pages(await page.cookies())
-    
-    async def _aux_login(self) -> None:
+        browser = await launch(headless=False)
         try:
-            with open(f"{self.domain.split('/')[-1]}.json") as f:
-                self._set_cookies_in_pages(json.load(f))
-                logger.debug("Вход в акк по файлу куки")
-        except FileNotFoundError:
-            browser = await launch(headless=False)
             page = await browser.newPage()
             page.setDefaultNavigationTimeout(0)
-            logger.warning("Файл куки не найден")
             if self.login_aux:
                 logger.debug("Создаем куки с помощью вспомогательной функции")
                 await self.login_aux(page)
@@ -137,17 +231,39 @@ class AbstractRouter(ABC):
                     f"Обязательно нажми ок и залогинься в течении {self.login_wait} секунд.')"
                 )
                 await asyncio.sleep(self.login_wait)
+            return await page.cookies()
+        finally:
+            await browser.close()
 
-            with open(f"{self.domain.split('/')[-1]}.json", 'w+') as f:
-                json.dump(await page.cookies(), f)
-                self._set_cookies_in_pages(await page.cookies())
+    async def _aux_login(self) -> None:
+        """ 
+        Взять куки аккаунта из общего хранилища: браузер для входа
+        запускается, только если свежих куки нет, и один на всех
+        """
+        cookies = await self.cookie_store.get(
+            self.domain, self._login, account=self.account
+        )
+        if cookies is not self.cookie:
+            self._set_cookies_in_pages(cookies)
 
     @abstractmethod
-    async def executor(self, browser: Browser|None = None) -> None:
+    async def executor(
+        self, 
+        pool: PagePool|None = None, 
+        session: ClientSession|None = None
+    ) -> None:
         pass
 
-    def include_middleware(self):
-        pass
+    def include_middleware(self, middleware: Middleware) -> None:
+        """ 
+        Подключить обработчик стадий (скачивание, парсинг, вызов функции)
+        ко всем событиям роутера. Обработчики диспетчера идут раньше
+        """
+        self.middlewares.append(middleware)
+
+    @property
+    def all_middlewares(self) -> Tuple[Middleware, ...]:
+        return (*self.shared_middlewares, *self.middlewares)
 
 
 class AuxRouter(AbstractRouter):
@@ -159,6 +275,11 @@ class AuxRouter(AbstractRouter):
     архитектуры. Нужна для интеграции в ботов, приложений и т.п.
 
     При инициализации роутера, браузер запускается сам по себе.
+
+    Для быстрого ответа: результаты вызовов с одинаковыми аргументами
+    хранятся cache_ttl секунд, одинаковые одновременные вызовы ждут один
+    общий, а одновременно выполняется не больше max_concurrency вызовов
+    (остальные ждут в очереди)
     """
     def __init__(
         self, 
@@ -166,76 +287,192 @@ class AuxRouter(AbstractRouter):
         is_spa: bool = False, 
         is_login: bool = False, 
         login_wait: int = 60,
-        # login_aux: Awaitable|None = None,
+        login_aux: Awaitable|None = None,
         debug: bool = True,
+        interception: InterceptionPolicy|None = None,
+        account: str = "default",
+        cache_ttl: float = 0,
+        cache_size: int = 1024,
+        max_concurrency: int|None = None,
     ) -> None:
         super().__init__(
             domain=domain,
             is_spa=is_spa,
             is_login=is_login,
             login_wait=login_wait,
-            debug=debug
+            login_aux=login_aux,
+            debug=debug,
+            interception=interception,
+            account=account,
         )
 
-    def page(self, url: str) -> EventPage:
-        super_page = super().page(url=url)
+        self.cache_ttl = cache_ttl
+        self.results_cache = TTLCache(cache_ttl, max_size=cache_size)
+        self.flights = SingleFlight()
+        self.max_concurrency = max_concurrency
+        self._limit: asyncio.Semaphore|None = None
+
+        self.warm_tabs: Dict[AbstractEvent, WarmTabs] = {}
+
+    def _decorate(self, event: AbstractEvent, cache_ttl: float|None = None):
         def wrapper(func: Awaitable):
             @functools.wraps(func)
             async def _wrapper(*args, **kwargs):
-                return await self.execute(
-                    executable_event=super_page,
-                    func=func,
-                    *args, 
-                    **kwargs,
-                )
+                return await self.call(event, func, args, kwargs, cache_ttl)
             return _wrapper
         return wrapper
 
-    async def longpoll(
-        self, url: str, timeout: int = 60, count: int|None = None
+    def page(
+        self, 
+        url: str, 
+        skip_unchanged: bool = False, 
+        stream: bool = False,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
+        warm: int = 0,
+        refresh: float|None = 30,
+        cache_ttl: float|None = None,
+    ) -> EventPage:
+        """ 
+        warm - сколько вкладок держать открытыми на этой ссылке (только spa),
+        refresh - раз во сколько секунд их перезагружать, cache_ttl - свое
+        время жизни результатов вместо роутерного
+        """
+        super_page = super().page(
+            url=url, 
+            skip_unchanged=skip_unchanged, 
+            stream=stream, 
+            interception=interception,
+            schema=schema,
+        )
+        if warm and self.is_spa:
+            self.warm_tabs[super_page] = WarmTabs(
+                super_page, count=warm, refresh=refresh
+            )
+        return self._decorate(super_page, cache_ttl)
+
+    def longpoll(
+        self, 
+        url: str, 
+        timeout: int = 60, 
+        count: int|None = None,
+        skip_unchanged: bool = False,
+        interception: InterceptionPolicy|None = None,
+        watch: Watch|None = None,
     ):
         super_longpoll = super().longpoll(
-            url=url, timeout=timeout, count=count
+            url=url, 
+            timeout=timeout, 
+            count=count, 
+            skip_unchanged=skip_unchanged,
+            interception=interception,
+            watch=watch,
         )
-        def wrapper(func: Awaitable):
-            @functools.wraps(func)
-            async def _wrapper(*args, **kwargs):
-                return await self.execute(
-                    executable_event=super_longpoll,
-                    func=func,
-                    *args,
-                    **kwargs
-                )
-            return _wrapper
-        return wrapper
-                
+        # результаты лонгпула не кэшируются
+        return self._decorate(super_longpoll, cache_ttl=0)
 
-    async def paginate_page(
+    def paginate_page(
         self, 
         url: str, 
         pages_links_xpath: str, 
         count_in_approach: int = 10,
         auxiliary_function: Awaitable|None = None, 
-        paginate_urls: List[str]|None = None
+        paginate_urls: List[str]|None = None,
+        stream: bool = False,
+        stop_xpath: str|None = None,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
     ):
-        def wrapper(func: Awaitable):
-            paginator_event = EventPaginator(
-                url=url,
-                pages_links_xpath=pages_links_xpath,
-                count_in_approach=count_in_approach,
-                auxiliary_function=auxiliary_function,
-                paginate_urls=paginate_urls
-            )
-            @functools.wraps(func)
-            async def _wrapper(*args, **kwargs):
-                return await self.execute(
-                    executable_event=paginator_event,
-                    func=func,
-                    *args,
-                    **kwargs
-                )
-            return _wrapper
-        return wrapper
+        paginator_event = super().paginate_page(
+            url=url,
+            pages_links_xpath=pages_links_xpath,
+            count_in_approach=count_in_approach,
+            auxiliary_function=auxiliary_function,
+            paginate_urls=paginate_urls,
+            stream=stream,
+            stop_xpath=stop_xpath,
+            interception=interception,
+            schema=schema,
+        )
+        return self._decorate(paginator_event)
+
+    def crawl(
+        self,
+        url: str,
+        links_xpath: str|List[str],
+        max_depth: int = 2,
+        max_pages: int = 1000,
+        allow_domains: List[str]|None = None,
+        allow_paths: List[str]|None = None,
+        deny_paths: List[str]|None = None,
+        concurrency: int = 10,
+        score: Callable[[str, int], float]|None = None,
+        interception: InterceptionPolicy|None = None,
+    ):
+        crawler = super().crawl(
+            url=url,
+            links_xpath=links_xpath,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            allow_domains=allow_domains,
+            allow_paths=allow_paths,
+            deny_paths=deny_paths,
+            concurrency=concurrency,
+            score=score,
+            interception=interception,
+        )
+        return self._decorate(crawler)
+
+    async def call(
+        self,
+        event: AbstractEvent,
+        func: Awaitable,
+        args: tuple,
+        kwargs: dict,
+        cache_ttl: float|None = None,
+    ):
+        """ Вызов функции события через кэш результатов и склейку вызовов """
+        ttl = self.cache_ttl if cache_ttl is None else cache_ttl
+        key = call_key(event, func, args, kwargs)
+        if key is None:
+            return await self._limited(event, func, *args, **kwargs)
+
+        if ttl:
+            found, result = self.results_cache.get(key)
+            if found:
+                return result
+
+        async def run():
+            result = await self._limited(event, func, *args, **kwargs)
+            if ttl:
+                self.results_cache.put(key, result, ttl)
+            return result
+
+        return await self.flights.do(key, run)
+
+    async def _limited(self, event: AbstractEvent, func: Awaitable, *args, **kwargs):
+        if self.max_concurrency is None:
+            return await self.execute(event, func, *args, **kwargs)
+
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        async with self._limit:
+            return await self.execute(event, func, *args, **kwargs)
+
+    def _prepare(self, event: AbstractEvent) -> None:
+        """ Куки и общие объекты диспетчера в событие """
+        if self.cookie:
+            event.cookies = self.cookie
+
+        event.frontier = self.frontier
+        event.cache = self.cache
+        event.store = self.store
+        event.seen = self.seen
+        event.resilience = self.resilience
+        event.scheduler = self.scheduler
+        event.middlewares = self.all_middlewares
+        if self.parser:
+            event.parser = self.parser
     
     async def execute(
             self, 
@@ -246,29 +483,60 @@ class AuxRouter(AbstractRouter):
         ):
         """ Здесь будет регистрация, логин, добавление хуки и всякая боль """
 
-        if self.is_login and not self.cookie:
-            # если нет куки для регистрации
+        if self.is_login:
+            # куки из хранилища: вход один на все одновременные вызовы и
+            # повторяется, когда срок куки подходит к концу
             await self._aux_login()
 
-        if self.cookie:
-            executable_event.cookies = self.cookie
+        self._prepare(executable_event)
+
+        warm = self.warm_tabs.get(executable_event)
+        if warm is not None:
+            # вкладка уже открыта на нужной ссылке: без навигации
+            await warm.start(self.pool)
+            executable_event.name = func.__name__
+            async with warm.page() as page:
+                if executable_event.schema is not None:
+                    page = await executable_event._page_records(page)
+                return await executable_event._callback(func, page, *args, **kwargs)
 
         return await executable_event(func)(
-            browser=self.browser, *args, **kwargs
+            self.pool if self.is_spa else self.session, *args, **kwargs
         )
 
     def _set_cookies_in_pages(self, cookie) -> None:
         self.cookie = cookie
 
-    async def executor(self, browser: Browser) -> None:
+    async def executor(
+        self, 
+        pool: PagePool|None = None, 
+        session: ClientSession|None = None
+    ) -> None:
         """ 
         Чтобы корректно влючился браузер во все корутины роутера, экзеутор
-        должен быть включен до вызова нужных функций 
+        должен быть включен до вызова нужных функций. Здесь же открываются
+        заранее прогретые вкладки
         """
-        if not browser:
-            browser = await launch(headless=False)
+        if self.is_spa and not pool:
+            # браузер запустится при первом вызове или прогреве вкладок
+            pool = PagePool(headless=False)
+        elif not self.is_spa and not session:
+            session = create_session()
 
-        self.browser = browser
+        self.pool = pool
+        self.session = session
+
+        if self.warm_tabs:
+            if self.is_login:
+                await self._aux_login()
+            for event, warm in self.warm_tabs.items():
+                self._prepare(event)
+                await warm.start(pool)
+
+    async def close(self) -> None:
+        """ Остановить обновление прогретых вкладок и вернуть их в пул """
+        for warm in self.warm_tabs.values():
+            await warm.close()
 
 
 class ExecuteRouter(AbstractRouter):
@@ -276,10 +544,16 @@ class ExecuteRouter(AbstractRouter):
     execute-исполнять. Самовключающийся роутер.
 
     Роутер, с декораторами, которые не требуют(!) вызова функций из вне, 
-    а запускают все сами экзекутором и управляются автоматически. Функции не
-    возвращают никаких данных, они требуются для занесения в базу данных или в 
-    для хранения в другой форме. Являются локальной зоной архитектуры и никак не
-    общаются с остальными частями архитектуру. Только через бд.
+    а запускают все сами экзекутором и управляются автоматически. Являются
+    локальной зоной архитектуры и никак не общаются с остальными частями
+    архитектуры. Только через бд или через приемники результатов.
+
+    Функция события может вернуть (return) или выдать (yield) результаты:
+    словарь или объект - один результат, список или кортеж - несколько. С
+    sinks они копятся в очереди конвейера (не больше max_pending, дальше
+    функции ждут) и пишутся в приемники пачками по batch_size или раз в
+    flush_interval секунд, а при конце исполнения дописываются. Без sinks
+    результаты функций никуда не идут.
     """
 
     def __init__(
@@ -290,24 +564,72 @@ class ExecuteRouter(AbstractRouter):
         login_wait=60,
         login_aux: Awaitable|None = None,
         debug: bool = True,
+        parse_mode: str|None = None,
+        parse_workers: int|None = None,
+        interception: InterceptionPolicy|None = None,
+        hybrid: bool = False,
+        sinks: List[Sink]|None = None,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        account: str = "default",
     ) -> None:
         self.domain = domain
         self.is_spa = is_spa
         self.is_login = is_login
         self.login_wait = login_wait # Сколько надо ждать чтобы залогиниться
         self.login_aux = login_aux
+        self.account = account # аккаунт домена в хранилище куки
         self.debug = debug
+        self.interception = interception # блокировка ресурсов для spa
 
         self.browser: Browser = None
+        self.pool: PagePool|None = None
+        self.session: ClientSession|None = None
+        self.frontier: Frontier|None = None # выставляется диспетчером
+        self.cache: HTTPCache|None = None # выставляется диспетчером
+        self.store: CrawlStore|None = None # выставляется диспетчером
+        self.seen: SeenSet|None = None # выставляется диспетчером
+        self.resilience: Resilience|None = None # выставляется диспетчером
+        self.scheduler: LongpollScheduler|None = None # выставляется диспетчером
+        self.middlewares: List[Middleware] = []
+        self.shared_middlewares: List[Middleware] = [] # выставляется диспетчером
+        # своя стадия парсинга роутера, иначе берется общая из диспетчера
+        self.parser: Parser|None = (
+            Parser(mode=parse_mode, workers=parse_workers) 
+            if parse_mode else None
+        )
+
+        # гибридный режим spa-роутера: браузер логинится и открывает страницы,
+        # а пагинаторы и лонгпулы качаются через http с его куки
+        self.handoff: Handoff|None = Handoff() if is_spa and hybrid else None
+
+        self.cookie: list|None = None
+        # общее хранилище куки, диспетчер заменяет его своим
+        self.cookie_store = CookieStore()
+
+        # результаты функций (return/yield) пачками пишутся в sinks; если
+        # в очереди больше max_pending результатов, функции ждут
+        self.results: ResultPipeline|None = (
+            ResultPipeline(
+                sinks, 
+                batch_size=batch_size, 
+                flush_interval=flush_interval, 
+                maxsize=max_pending,
+            )
+            if sinks else None
+        )
 
         self.pages: List[EventPage] = []
         self.paginators: List[EventPaginator] = []
+        self.crawlers: List[EventCrawler] = []
         self.longpolls: List[EventLongpoll] = []
 
     def paginator(
         self,
         paginate_urls: List[str],
         count_in_approach: int = 10,
+        schema: Schema|None = None,
     ) -> EventPaginator:
         paginator = EventPaginator(
             domain=self.domain, 
@@ -315,6 +637,10 @@ class ExecuteRouter(AbstractRouter):
             is_browser=self.is_spa,
             paginate_urls=paginate_urls,
         )
+        paginator.interception = self.interception
+        paginator.schema = schema
+        if self.handoff:
+            paginator.is_browser = False
         self.paginators.append(paginator)
 
         return paginator
@@ -325,7 +651,11 @@ class ExecuteRouter(AbstractRouter):
         pages_links_xpath: str, 
         count_in_approach: int = 10,
         auxiliary_function: Awaitable|None = None, 
-        paginate_urls: List[str]|None = None
+        paginate_urls: List[str]|None = None,
+        stream: bool = False,
+        stop_xpath: str|None = None,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
     ) -> EventPaginator:
         paginator = super().paginate_page(
             url=url,
@@ -333,70 +663,209 @@ class ExecuteRouter(AbstractRouter):
             count_in_approach=count_in_approach,
             auxiliary_function=auxiliary_function,
             paginate_urls=paginate_urls,
+            stream=stream,
+            stop_xpath=stop_xpath,
+            interception=interception,
+            schema=schema,
         )
+        if self.handoff:
+            paginator.is_browser = False
         self.paginators.append(paginator)
 
         return paginator
 
-    def page(self, url: str) -> EventPage:
-        page = super().page(url=url)
+    def page(
+        self, 
+        url: str, 
+        skip_unchanged: bool = False, 
+        stream: bool = False,
+        interception: InterceptionPolicy|None = None,
+        schema: Schema|None = None,
+    ) -> EventPage:
+        page = super().page(
+            url=url, 
+            skip_unchanged=skip_unchanged, 
+            stream=stream, 
+            interception=interception,
+            schema=schema,
+        )
         self.pages.append(page)
 
         return page
 
     def longpoll(
-        self, url: str, timeout: int = 60, count: int|None = None
+        self, 
+        url: str, 
+        timeout: int = 60, 
+        count: int|None = None,
+        skip_unchanged: bool = False,
+        interception: InterceptionPolicy|None = None,
+        watch: Watch|None = None,
     ) -> EventLongpoll:
         longpoll = super().longpoll(
             url=url,
             timeout=timeout,
             count=count,
+            skip_unchanged=skip_unchanged,
+            interception=interception,
+            watch=watch,
         )
+        if self.handoff:
+            longpoll.is_browser = False
         self.longpolls.append(longpoll)
 
         return longpoll
     
-    def _set_cookies_in_pages(self, cookie) -> None:
-        for page in self.pages:
-            page.cookies = cookie
+    def crawl(
+        self,
+        url: str,
+        links_xpath: str|List[str],
+        max_depth: int = 2,
+        max_pages: int = 1000,
+        allow_domains: List[str]|None = None,
+        allow_paths: List[str]|None = None,
+        deny_paths: List[str]|None = None,
+        concurrency: int = 10,
+        score: Callable[[str, int], float]|None = None,
+        interception: InterceptionPolicy|None = None,
+    ) -> EventCrawler:
+        crawler = super().crawl(
+            url=url,
+            links_xpath=links_xpath,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            allow_domains=allow_domains,
+            allow_paths=allow_paths,
+            deny_paths=deny_paths,
+            concurrency=concurrency,
+            score=score,
+            interception=interception,
+        )
+        if self.handoff:
+            crawler.is_browser = False
+        self.crawlers.append(crawler)
+
+        return crawler
 
-        for paginator in self.paginators:
-            paginator.cookies = cookie
+    @property
+    def events(self) -> List[AbstractEvent]:
+        return [*self.pages, *self.paginators, *self.crawlers, *self.longpolls]
 
-        for longpoll in self.longpolls:
-            longpoll.cookies = cookie
+    def _set_cookies_in_pages(self, cookie) -> None:
+        self.cookie = cookie
+        for event in self.events:
+            event.cookies = cookie
+
+        if self.handoff:
+            self.handoff.cookies = cookie
+
+    def _set_dispatcher_in_pages(self) -> None:
+        """ Общие очередь и кэш диспетчера во все события роутера """
+        for event in self.events:
+            event.handoff = self.handoff
+            event.frontier = self.frontier
+            event.cache = self.cache
+            event.store = self.store
+            event.seen = self.seen
+            event.resilience = self.resilience
+            event.scheduler = self.scheduler
+            event.middlewares = self.all_middlewares
+            event.results = self.results
+            if self.is_spa and self.is_login:
+                # куки проверяются перед каждой страницей и проверкой лонгпула
+                event.login = self._aux_login
+            if self.parser:
+                event.parser = self.parser
     
+    async def _gather(self, *tasks) -> None:
+        """
+        Ошибка одного события не останавливает остальные. В режиме debug
+        она только логируется, иначе, когда события закончатся, первая
+        ошибка поднимается из executor, как и раньше, а остальные логируются
+        """
+        errors = [
+            result for result in await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(result, Exception)
+        ]
+        for error in errors[0 if self.debug else 1:]:
+            logger.error(f"{self.domain}: {error!r}")
+        if errors and not self.debug:
+            raise errors[0]
+
+    def _resource(self, event: AbstractEvent) -> PagePool|ClientSession:
+        """ Браузерным событиям - пул вкладок, остальным - http-сессия """
+        return self.pool if event.is_browser else self.session
+
     async def _execute_spa(self) -> None:
-        if not browser:
-            browser = await launch(headless=True)
+        own_pool = self.pool is None
+        if own_pool:
+            self.pool = PagePool(headless=True)
 
-        await asyncio.gather(
-            *[page.task(browser) for page in self.pages]
-        )
+        own_session = self.handoff is not None and self.session is None
+        if own_session:
+            self.session = create_session()
 
-        await asyncio.gather(
-            *[paginator.task(browser) for paginator in self.paginators]
-        )
+        if self.handoff:
+            self.handoff.pool = self.pool
+            if not self.handoff.user_agent:
+                # гибридному роутеру user-agent браузера нужен с первого запроса
+                await self.pool.start()
+                self.handoff.user_agent = await self.pool.browsers[0].userAgent()
 
-        await asyncio.gather(
-            *[longpoll.task(browser) for longpoll in self.longpolls]
-        )
+        try:
+            await self._gather(
+                *[page.task(self._resource(page)) for page in self.pages]
+            )
+
+            await self._gather(
+                *[paginator.task(self._resource(paginator)) for paginator in self.paginators]
+            )
+
+            await self._gather(
+                *[crawler.task(self._resource(crawler)) for crawler in self.crawlers]
+            )
+
+            await self._gather(
+                *[longpoll.task(self._resource(longpoll)) for longpoll in self.longpolls]
+            )
+        finally:
+            if own_pool:
+                await self.pool.close()
+                self.pool = None
+            if own_session:
+                await self.session.close()
+                self.session = None
     
     async def _execute_mpa(self) -> None:
-        async with ClientSession() as session:
-            await asyncio.gather(
-                *[page.task(session) for page in self.pages]
+        own_session = self.session is None
+        if own_session:
+            self.session = create_session()
+
+        try:
+            await self._gather(
+                *[page.task(self.session) for page in self.pages]
             )
 
-            await asyncio.gather(
-                *[paginator.task(session) for paginator in self.paginators]
+            await self._gather(
+                *[paginator.task(self.session) for paginator in self.paginators]
             )
 
-            await asyncio.gather(
-                *[longpoll.task(session) for longpoll in self.longpolls]
+            await self._gather(
+                *[crawler.task(self.session) for crawler in self.crawlers]
             )
 
-    async def debug_executor(self, browser: Browser|None = None) -> None:
+            await self._gather(
+                *[longpoll.task(self.session) for longpoll in self.longpolls]
+            )
+        finally:
+            if own_session:
+                await self.session.close()
+                self.session = None
+
+    async def _execute(self) -> None:
+        """ Исполнить все события, дописав результаты в приемники в конце """
+        if self.results:
+            await self.results.open()
         try:
             if self.is_spa:
                 if self.is_login:
@@ -404,20 +873,40 @@ class ExecuteRouter(AbstractRouter):
                 await self._execute_spa()
             else:
                 await self._execute_mpa()
+        finally:
+            if self.results:
+                await self.results.close()
+
+    async def debug_executor(
+        self, 
+        pool: PagePool|None = None, 
+        session: ClientSession|None = None
+    ) -> None:
+        self.pool = pool
+        self.session = session
+        self._set_dispatcher_in_pages()
+        try:
+            await self._execute()
         except Exception as exp:
             logger.error(exp)
     
-    async def deploy_executor(self, browser: Browser|None = None) -> None:
-        if self.is_spa:
-            if self.is_login:
-                await self._aux_login()
-            await self._execute_spa()
-        else:
-            await self._execute_mpa()
+    async def deploy_executor(
+        self, 
+        pool: PagePool|None = None, 
+        session: ClientSession|None = None
+    ) -> None:
+        self.pool = pool
+        self.session = session
+        self._set_dispatcher_in_pages()
+        await self._execute()
     
-    async def executor(self, browser: Browser|None = None) -> None:
+    async def executor(
+        self, 
+        pool: PagePool|None = None, 
+        session: ClientSession|None = None
+    ) -> None:
         logger.info("Начинаем исполнение парсерных функций... ")
         if self.debug:
-            await self.debug_executor(browser=browser)
+            await self.debug_executor(pool=pool, session=session)
         else:
-            await self.deploy_executor(browser=browser)
+            await self.deploy_executor(pool=pool, session=session)
@@ -0,0 +1,198 @@
+"""
+    Модуль планировщика лонгпулов. Один цикл держит все лонгпулы в куче,
+    упорядоченной по времени следующего запуска, вместо отдельной корутины со
+    sleep на каждую страницу.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+
+from typing import Awaitable, Callable, List
+
+from loguru import logger
+
+
+class LongpollJob:
+    """ Один лонгпул в планировщике """
+    def __init__(
+        self,
+        interval: float,
+        poll: Callable[[], Awaitable],
+        count: int|None,
+        name: str = "",
+    ) -> None:
+        self.name = name
+        self.base_interval = interval
+        self.interval = interval
+        self.poll = poll
+        self.remaining = count
+
+        self.due = 0.0 # время запуска по сетке, без разброса
+        self.running = False
+        self.runs = 0
+        self.overruns = 0 # пропущенные запуски: прошлый еще не закончился
+        self.done: asyncio.Future = asyncio.get_event_loop().create_future()
+
+    @property
+    def finished(self) -> bool:
+        return self.remaining is not None and self.remaining <= 0
+
+
+class LongpollScheduler:
+    """
+    Планировщик лонгпулов.
+
+    Запуски идут с фиксированной частотой: следующий через interval после
+    прошлого запуска по сетке, а не после окончания проверки. К каждому
+    запуску добавляется случайный разброс до jitter * interval, чтобы
+    страницы не проверялись все одновременно, и одновременно выполняется не
+    больше concurrency проверок.
+
+    adaptive - менять интервал по результату проверки: если страница
+    поменялась, интервал уменьшается вдвое (не меньше min_factor * timeout),
+    если нет - растет в backoff раз (не больше max_factor * timeout)
+    """
+    def __init__(
+        self,
+        concurrency: int = 100,
+        jitter: float = 0.1,
+        adaptive: bool = False,
+        min_factor: float = 0.25,
+        max_factor: float = 4.0,
+        backoff: float = 1.5,
+    ) -> None:
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.adaptive = adaptive
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.backoff = backoff
+
+        self.jobs: List[LongpollJob] = []
+
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._semaphore: asyncio.Semaphore|None = None
+        self._wakeup: asyncio.Event|None = None
+        self._loop_task: asyncio.Task|None = None
+        self._running: set = set()
+
+    def _start(self) -> None:
+        if self._loop_task is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.ensure_future(self._loop())
+
+    async def run(
+        self,
+        interval: float,
+        poll: Callable[[], Awaitable],
+        count: int|None = None,
+        name: str = "",
+    ) -> None:
+        """
+        Проверять poll() каждые interval секунд count раз (None - бесконечно)
+        и дождаться последней проверки. poll может вернуть True/False -
+        поменялась ли страница, для адаптивного интервала
+        """
+        if count is not None and count <= 0:
+            return
+
+        self._start()
+        job = LongpollJob(interval, poll, count, name)
+        self.jobs.append(job)
+
+        # первый запуск сразу, но со случайным сдвигом внутри разброса
+        now = asyncio.get_event_loop().time()
+        job.due = now
+        self._push(job, now + random.uniform(0, self.jitter * interval))
+
+        try:
+            await job.done
+        finally:
+            self.jobs.remove(job)
+
+    def _push(self, job: LongpollJob, when: float) -> None:
+        heapq.heappush(self._heap, (when, next(self._counter), job))
+        self._wakeup.set()
+
+    def _reschedule(self, job: LongpollJob, now: float) -> None:
+        job.due += job.interval
+        if job.due <= now:
+            # не успели: пропущенные запуски не догоняются пачкой
+            job.due = now + job.interval
+        spread = self.jitter * job.interval
+        self._push(job, job.due + random.uniform(-spread, spread))
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            when, _, job = self._heap[0]
+            delay = when - loop.time()
+            if delay > 0:
+                try:
+                    # новый лонгпул может оказаться раньше текущего первого
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if job.done.done():
+                continue
+
+            if job.running:
+                job.overruns += 1
+            else:
+                job.running = True
+                if job.remaining is not None:
+                    job.remaining -= 1
+                task = asyncio.ensure_future(self._fire(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if not job.finished:
+                self._reschedule(job, loop.time())
+
+    async def _fire(self, job: LongpollJob) -> None:
+        try:
+            async with self._semaphore:
+                changed = await job.poll()
+            if self.adaptive and changed is not None:
+                self._adapt(job, changed)
+        except Exception as exp:
+            # одна неудачная проверка не останавливает лонгпул
+            logger.warning(f"Лонгпул {job.name}: {exp!r}")
+        finally:
+            job.running = False
+            job.runs += 1
+            if job.finished and not job.done.done():
+                job.done.set_result(None)
+
+    def _adapt(self, job: LongpollJob, changed: bool) -> None:
+        if changed:
+            job.interval = max(job.base_interval * self.min_factor, job.interval / 2)
+        else:
+            job.interval = min(
+                job.base_interval * self.max_factor, job.interval * self.backoff
+            )
+
+    async def close(self) -> None:
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(self._loop_task, *self._running, return_exceptions=True)
+        for job in self.jobs:
+            if not job.done.done():
+                job.done.cancel()
+        self._loop_task = None
+        self._heap = []
@@ -0,0 +1,340 @@
+"""
+    Модуль декларативной схемы извлечения. Поля страницы описываются один
+    раз через xpath или css с типом, а функция события получает готовые
+    записи вместо дерева или вкладки. Схема компилируется один раз: для mpa -
+    в etree.XPath, для spa - в описание, по которому одна функция в браузере
+    собирает все поля и возвращает их одним json.
+"""
+
+from __future__ import annotations
+
+import re
+
+from typing import Any, Callable, Dict
+
+from lxml import etree
+
+from .errors import ConfigurationError
+from .utils import compile_xpath
+
+
+# выполняется в браузере: для каждого поля - список значений найденных
+# узлов (текст элемента, значение атрибута или text()) или вложенных записей
+SCHEMA_JS = """
+(spec) => {
+    const select = (node, kind, selector) => {
+        if (kind === "css") {
+            return Array.from(node.querySelectorAll(selector));
+        }
+        const result = document.evaluate(
+            selector, node, null, XPathResult.ANY_TYPE, null
+        );
+        switch (result.resultType) {
+            case XPathResult.NUMBER_TYPE: return [result.numberValue];
+            case XPathResult.STRING_TYPE: return [result.stringValue];
+            case XPathResult.BOOLEAN_TYPE: return [result.booleanValue];
+        }
+        const nodes = [];
+        for (let found = result.iterateNext(); found; found = result.iterateNext()) {
+            nodes.push(found);
+        }
+        return nodes;
+    };
+    const value = (node, attr) => {
+        if (typeof node !== "object") return node;
+        if (attr) {
+            return node.nodeType === Node.ELEMENT_NODE ? node.getAttribute(attr) : null;
+        }
+        return node.textContent.trim();
+    };
+    const record = (node, spec) => {
+        const result = {};
+        for (const [name, kind, selector, attr, nested] of spec.fields) {
+            result[name] = select(node, kind, selector).map(
+                (found) => nested ? extract(found, nested) : value(found, attr)
+            );
+        }
+        return result;
+    };
+    const extract = (node, spec) => spec.items
+        ? select(node, ...spec.items).map((item) => record(item, spec))
+        : record(node, spec);
+    return extract(document, spec);
+}
+"""
+
+# число с разделителями внутри: "1 299,90", "$1,299.90", "1'299"
+NUMBER = re.compile(r"[-\u2212]?\d+(?:[ \u00a0\u202f\u2009'\u2019.,]\d+)*")
+# неразрывные и тонкие пробелы и апострофы разделяют только разряды
+GROUPS = "\u00a0\u202f\u2009'\u2019"
+INTEGER = re.compile(r"-?(?:\d{1,3}(?:[.,]\d{3})+|\d+)")
+
+
+def _number(
+    value: str,
+    type: Callable,
+    decimal: str|None = None,
+    thousands: str|None = None,
+):
+    """
+    Первое число в строке: "1 299,90 ₽" (с неразрывным пробелом, как
+    пишут цены) -> 1299.9, "$1,299.90" -> 1299.9.
+    Без decimal и thousands десятичный знак угадывается: из точки и
+    запятой - последний, повторяющийся - разделитель разрядов. Один знак
+    перед тремя цифрами - дробь, если целая часть 0 ("0,250 кг": перед
+    разрядами нуля не бывает) или цифры нулевые ("2.000 кг" - вес с
+    точностью до грамма; разряды так пишут с thousands). Если угадать
+    нельзя - "1,299", "1.299" или "100 200" (обычный пробел: одно число
+    или два) - ValueError
+    """
+    match = NUMBER.search(value)
+    if match is None:
+        raise ValueError(value)
+
+    number = match.group().replace("\u2212", "-")
+    for separator in GROUPS + (thousands or ""):
+        number = number.replace(separator, "")
+    if " " in number:
+        raise ValueError(f"Неясно, одно ли это число: {value!r}")
+
+    if decimal is None:
+        marks = [char for char in number if char in ".,"]
+        if len(set(marks)) == 2:
+            decimal = marks[-1]
+        elif len(marks) == 1:
+            integer, _, fraction = number.partition(marks[0])
+            if (
+                len(fraction) == 3 
+                and integer.lstrip("-") != "0" 
+                and fraction != "000"
+            ):
+                raise ValueError(f"Неясно, разряды или дробь: {value!r}")
+            decimal = marks[0]
+
+    integer, _, fraction = number.partition(decimal) if decimal else (number, "", "")
+    if not INTEGER.fullmatch(integer) or (fraction and not fraction.isdigit()):
+        raise ValueError(value)
+    number = float(f"{re.sub('[.,]', '', integer)}.{fraction or 0}")
+    return type(number)
+
+
+def _require_cssselect() -> None:
+    try:
+        import cssselect # noqa: F401
+    except ImportError:
+        raise ConfigurationError(
+            "Ошибка! Для css в схеме нужен cssselect: pip install curcheck[css]"
+        )
+
+
+def _css(selector: str) -> etree.XPath:
+    from lxml.cssselect import CSSSelector
+
+    return CSSSelector(selector)
+
+
+class Field:
+    """
+    Поле записи. xpath или css - путь от корня записи (страницы или
+    элемента items). Значение узла - его текст, у атрибутов и text() - само
+    значение, attr - взять атрибут найденного элемента.
+
+    type - во что превратить строку: str, int, float (число ищется в строке,
+    "$1,299.90" -> 1299.9), bool или своя функция. У чисел decimal и
+    thousands - десятичный знак и разделитель разрядов страницы, без них
+    знаки угадываются, а неоднозначное число ("1,299") не превращается.
+    many - список всех найденных значений вместо первого, schema -
+    вложенная запись для каждого найденного элемента. default - если
+    ничего не найдено или значение не превратилось в type.
+
+    Для css нужен cssselect (pip install curcheck[css]), он проверяется
+    при создании поля
+    """
+    def __init__(
+        self,
+        xpath: str|None = None,
+        css: str|None = None,
+        type: Callable = str,
+        many: bool = False,
+        attr: str|None = None,
+        schema: Schema|None = None,
+        default: Any = None,
+        decimal: str|None = None,
+        thousands: str|None = None,
+    ) -> None:
+        if (xpath is None) == (css is None):
+            raise ConfigurationError(
+                "Ошибка! У поля схемы должен быть либо xpath, либо css!"
+            )
+        if css is not None:
+            _require_cssselect()
+
+        self.xpath = xpath
+        self.css = css
+        self.type = type
+        self.many = many
+        self.attr = attr
+        self.schema = schema
+        self.default = default
+        self.decimal = decimal
+        self.thousands = thousands
+
+    @property
+    def kind(self) -> str:
+        return "css" if self.css is not None else "xpath"
+
+    @property
+    def selector(self) -> str:
+        return self.css if self.css is not None else self.xpath
+
+    def compile(self) -> etree.XPath:
+        return _css(self.css) if self.css is not None else compile_xpath(self.xpath)
+
+    def coerce(self, value: Any) -> Any:
+        if value is None:
+            return self.default
+        try:
+            if isinstance(value, str):
+                if self.type in (int, float):
+                    return _number(value, self.type, self.decimal, self.thousands)
+                if self.type is bool:
+                    return value.strip().lower() not in ("", "0", "false", "no", "нет")
+            return self.type(value)
+        except (TypeError, ValueError):
+            return self.default
+
+
+class Schema:
+    """
+    Схема записи: поля по именам.
+
+    items (xpath) или items_css - путь к повторяющимся элементам, например
+    карточкам товаров: тогда функция получает список записей, по одной на
+    элемент, иначе - одну запись со страницы. record - класс записи
+    (например, dataclass), вызывается с полями как именованными
+    аргументами; без него запись - словарь
+
+        Schema(
+            items="//div[@class='product']",
+            title=Field(".//h2"),
+            price=Field(css=".price", type=float),
+            tags=Field(".//a[@class='tag']", many=True),
+        )
+    """
+    def __init__(
+        self,
+        items: str|None = None,
+        items_css: str|None = None,
+        record: Callable|None = None,
+        **fields: Field,
+    ) -> None:
+        if items is not None and items_css is not None:
+            raise ConfigurationError(
+                "Ошибка! У схемы может быть либо items, либо items_css!"
+            )
+
+        self.items = (
+            Field(xpath=items) if items is not None
+            else Field(css=items_css) if items_css is not None
+            else None
+        )
+        self.record = record
+        self.fields: Dict[str, Field] = fields
+
+        # описание для браузера собирается сразу, xpath - при первом разборе
+        self.spec = self._spec()
+        self._selectors: Dict[str, etree.XPath]|None = None
+        self._items: etree.XPath|None = None
+
+    def _spec(self) -> dict:
+        return {
+            "items": [self.items.kind, self.items.selector] if self.items else None,
+            "fields": [
+                [
+                    name, field.kind, field.selector, field.attr,
+                    field.schema.spec if field.schema else None,
+                ]
+                for name, field in self.fields.items()
+            ],
+        }
+
+    def _compile(self) -> None:
+        self._selectors = {
+            name: field.compile() for name, field in self.fields.items()
+        }
+        if self.items:
+            self._items = self.items.compile()
+
+    def __getstate__(self) -> dict:
+        # скомпилированные xpath не передать в процесс, там они соберутся заново
+        state = self.__dict__.copy()
+        state["_selectors"] = None
+        state["_items"] = None
+        return state
+
+    @staticmethod
+    def _select(selector: etree.XPath, node) -> list:
+        result = selector(node)
+        return result if isinstance(result, list) else [result]
+
+    @staticmethod
+    def _value(node, attr: str|None):
+        if isinstance(node, etree._Element):
+            if attr:
+                return node.get(attr)
+            return "".join(node.itertext()).strip()
+        if attr:
+            return None
+        if isinstance(node, str):
+            return str(node).strip()
+        return node
+
+    def _raw_record(self, node) -> dict:
+        raw = {}
+        for name, field in self.fields.items():
+            found = self._select(self._selectors[name], node)
+            if field.schema is not None:
+                raw[name] = [
+                    field.schema._raw(item) for item in found
+                    if isinstance(item, etree._Element)
+                ]
+            else:
+                raw[name] = [self._value(item, field.attr) for item in found]
+        return raw
+
+    def _raw(self, node):
+        """ Сырые значения полей в том же виде, что возвращает SCHEMA_JS """
+        if self._selectors is None:
+            self._compile()
+        if self._items is not None:
+            return [self._raw_record(item) for item in self._select(self._items, node)]
+        return self._raw_record(node)
+
+    def _record(self, raw: dict):
+        values = {}
+        for name, field in self.fields.items():
+            found = raw.get(name) or []
+            if field.schema is not None:
+                converted = [field.schema.build(item) for item in found]
+            else:
+                converted = [field.coerce(item) for item in found]
+
+            if field.many:
+                values[name] = converted
+            else:
+                values[name] = converted[0] if converted else field.default
+        return self.record(**values) if self.record else values
+
+    def build(self, raw):
+        """ Записи из сырых значений: типы полей и класс записи """
+        if self.items is not None:
+            return [self._record(item) for item in raw]
+        return self._record(raw)
+
+    def extract(self, tree: etree._Element):
+        """ Записи из разобранной страницы """
+        return self.build(self._raw(tree))
+
+    async def page_extract(self, page):
+        """ Записи из открытой вкладки одним вызовом evaluate """
+        return self.build(await page.evaluate(SCHEMA_JS, self.spec))
@@ -0,0 +1,94 @@
+"""
+    Модуль множеств уже встреченных ссылок. Общее множество подключается ко
+    всем роутерам диспетчера, чтобы одна и та же страница не качалась дважды.
+"""
+
+import hashlib
+import math
+
+from abc import ABC, abstractmethod
+
+
+def _digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode(), digest_size=16).digest()
+
+
+class SeenSet(ABC):
+    @abstractmethod
+    def add(self, url: str) -> bool:
+        """ Добавить ссылку, вернуть True если ее еще не было """
+
+    @abstractmethod
+    def __contains__(self, url: str) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class HashSeenSet(SeenSet):
+    """
+    Точное множество. Хранит не ссылки, а их 8-байтные хэши, что в несколько
+    раз компактнее строк.
+    """
+    def __init__(self) -> None:
+        self._hashes: set = set()
+
+    def add(self, url: str) -> bool:
+        key = int.from_bytes(_digest(url)[:8], "little")
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return int.from_bytes(_digest(url)[:8], "little") in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class BloomSeenSet(SeenSet):
+    """
+    Фильтр Блума на capacity ссылок с долей ложных срабатываний error_rate.
+    Память фиксирована (около 1.2 байта на ссылку при error_rate=0.01), но
+    новая ссылка изредка может считаться уже встреченной.
+    """
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str):
+        digest = _digest(url)
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, url: str) -> bool:
+        new = False
+        for position in self._positions(url):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def __contains__(self, url: str) -> bool:
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(url)
+        )
+
+    def __len__(self) -> int:
+        """ Примерное число добавленных ссылок """
+        return self._count
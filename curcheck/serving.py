@@ -0,0 +1,208 @@
+"""
+    Модуль быстрого ответа для AuxRouter: заранее открытые вкладки, кэш
+    результатов с временем жизни и склейка одинаковых одновременных вызовов.
+"""
+
+import asyncio
+import functools
+import time
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from loguru import logger
+
+
+def call_key(
+    event, func: Callable, args: tuple, kwargs: dict
+) -> Hashable|None:
+    """
+    Ключ вызова функции события с аргументами, None - если аргументы
+    нехэшируемые. Одна функция может быть подключена к нескольким
+    событиям (ссылкам), и результаты у них разные
+    """
+    key = (
+        event, event.link, func.__module__, func.__qualname__,
+        args, tuple(sorted(kwargs.items())),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class TTLCache:
+    """ Результаты вызовов на ttl секунд, не больше max_size штук (LRU) """
+    def __init__(self, ttl: float, max_size: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        """ Вернуть (True, результат) или (False, None), если его нет """
+        item = self._items.get(key)
+        if item is None:
+            return False, None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._items[key]
+            return False, None
+        self._items.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any, ttl: float|None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+class SingleFlight:
+    """ Одинаковые одновременные вызовы ждут один общий результат """
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        if key in self._calls:
+            return await asyncio.shield(self._calls[key])
+
+        future = asyncio.get_event_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except BaseException as exp:
+            if isinstance(exp, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exp)
+                # ошибку получают ожидающие, а не сборщик мусора
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+class WarmTabs:
+    """
+    Заранее открытые на ссылке события вкладки. Вызов получает уже
+    загруженную вкладку, а фоновая задача раз в refresh секунд по очереди
+    перезагружает свободные вкладки.
+
+    Вкладки открываются сверх пула (PagePool.open_page), поэтому не
+    уменьшают его и не задерживают плановую замену браузера: вкладка
+    упавшего или заменяемого браузера открывается заново при следующем
+    вызове
+    """
+    def __init__(self, event, count: int = 1, refresh: float|None = 30) -> None:
+        self.event = event
+        self.count = count
+        self.refresh = refresh
+
+        self.pool = None
+        self._pages: List = []
+        self._idle: asyncio.Queue|None = None
+        self._refresher: asyncio.Task|None = None
+        self._starting: asyncio.Lock|None = None
+
+    @property
+    def started(self) -> bool:
+        return self.pool is not None
+
+    async def start(self, pool) -> None:
+        if self._starting is None:
+            self._starting = asyncio.Lock()
+        async with self._starting:
+            if self.started:
+                return
+
+            self._idle = asyncio.Queue()
+            try:
+                for _ in range(self.count):
+                    self._idle.put_nowait(await self._open(pool))
+            except BaseException:
+                # уже открытые вкладки не должны остаться висеть в браузере
+                for page in self._pages:
+                    await self._close(pool, page)
+                self._pages = []
+                raise
+
+            self.pool = pool
+            if self.refresh:
+                self._refresher = asyncio.ensure_future(self._refresh())
+
+    async def _open(self, pool):
+        page = await pool.open_page(
+            cookies_key=self.event.domain, cookies=self.event.cookies
+        )
+        try:
+            if self.event.interception:
+                await self.event.interception.attach(page)
+            await self._navigate(functools.partial(page.goto, self.event.link))
+        except BaseException:
+            await self._close(pool, page)
+            raise
+        self._pages.append(page)
+        return page
+
+    async def _close(self, pool, page) -> None:
+        if self.event.interception:
+            await self.event.interception.detach(page)
+        await pool.close_page(page)
+
+    async def _replace(self, page):
+        """
+        Вкладка упавшего или заменяемого браузера меняется на новую. Старая
+        закрывается только после того, как открылась новая: если замена не
+        удалась, старая остается на своем месте и заменится в следующий раз
+        """
+        fresh = await self._open(self.pool)
+        self._pages.remove(page)
+        await self._close(self.pool, page)
+        return fresh
+
+    async def _navigate(self, navigate: Callable) -> None:
+        """ goto или reload через общую очередь и повторы события """
+        await self.event._schedule(functools.partial(self.event._navigate, navigate))
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self._idle.get()
+        try:
+            if not self.pool.healthy(page):
+                page = await self._replace(page)
+        except BaseException:
+            self._idle.put_nowait(page)
+            raise
+        try:
+            yield page
+        finally:
+            self._idle.put_nowait(page)
+
+    async def _refresh(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh)
+            for _ in range(self.count):
+                # и ошибка замены вкладки не должна остановить обновление
+                try:
+                    async with self.page() as page:
+                        await self._navigate(page.reload)
+                except Exception as exp:
+                    logger.warning(f"Вкладка {self.event.link} не обновилась: {exp!r}")
+
+    async def close(self) -> None:
+        if not self.started:
+            return
+        if self._refresher:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+        for page in self._pages:
+            await self._close(self.pool, page)
+        self._pages = []
+        self.pool = None
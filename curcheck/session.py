@@ -0,0 +1,49 @@
+"""
+    Модуль общей http-сессии для mpa-роутеров. Один пул соединений на всех,
+    чтобы соединения и tls-рукопожатия переиспользовались между роутерами.
+"""
+
+from aiohttp import ClientSession, TCPConnector
+
+try:
+    import brotli # noqa: F401
+    BROTLI = True
+except ImportError:
+    BROTLI = False
+
+
+def create_session(
+    limit: int = 100,
+    limit_per_host: int = 0,
+    keepalive_timeout: float = 30,
+    dns_cache_ttl: int|None = 300,
+    compress: bool = True,
+) -> ClientSession:
+    """
+    Создать сессию с настроенным пулом соединений.
+
+    limit и limit_per_host - сколько соединений всего и на один хост (0 - без
+    ограничения), keepalive_timeout - сколько секунд держать простаивающее
+    соединение, dns_cache_ttl - время жизни dns-кэша (None - навсегда).
+    compress включает gzip/deflate, и brotli если он установлен.
+    """
+    connector = TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+        enable_cleanup_closed=True,
+    )
+
+    if not compress:
+        accept_encoding = "identity"
+    elif BROTLI:
+        accept_encoding = "gzip, deflate, br"
+    else:
+        accept_encoding = "gzip, deflate"
+
+    return ClientSession(
+        connector=connector,
+        headers={"Accept-Encoding": accept_encoding},
+    )
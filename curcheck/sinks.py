@@ -0,0 +1,290 @@
+"""
+    Модуль выгрузки результатов. Функции событий ExecuteRouter могут
+    вернуть (return) или выдать (yield) данные, а конвейер роутера копит их
+    в ограниченной очереди и пачками пишет в приемники: jsonl, csv, sqlite или
+    свою корутину. Если приемник не успевает, очередь заполняется и функции
+    событий ждут, а с ними и скачивание новых страниц.
+"""
+
+import asyncio
+import csv
+import json
+import sqlite3
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Sequence
+
+from loguru import logger
+
+
+class Sink(ABC):
+    """ Приемник результатов: получает их пачками """
+    async def open(self) -> None:
+        pass
+
+    @abstractmethod
+    async def write(self, items: List[Any]) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class _ThreadSink(Sink):
+    """ Приемник, который пишет на диск в своем потоке, не блокируя цикл """
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor|None = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def open(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        await self._run(self._open)
+
+    async def write(self, items: List[Any]) -> None:
+        await self._run(self._write, items)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _open(self) -> None:
+        pass
+
+    @abstractmethod
+    def _write(self, items: List[Any]) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+
+class JSONLSink(_ThreadSink):
+    """ Каждый результат - строка json, файл дописывается """
+    def __init__(self, path: str, encoding: str = "utf-8") -> None:
+        super().__init__()
+        self.path = path
+        self.encoding = encoding
+        self._file = None
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding=self.encoding)
+
+    def _write(self, items: List[Any]) -> None:
+        self._file.write("".join(
+            json.dumps(item, ensure_ascii=False, default=str) + "\n"
+            for item in items
+        ))
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class CSVSink(_ThreadSink):
+    """
+    Результаты-словари строками csv. fieldnames - колонки, по умолчанию
+    ключи первого результата; заголовок пишется только в новый файл
+    """
+    def __init__(
+        self,
+        path: str,
+        fieldnames: Sequence[str]|None = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.fieldnames = fieldnames
+        self.encoding = encoding
+        self._file = None
+        self._writer: csv.DictWriter|None = None
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding=self.encoding, newline="")
+
+    def _write(self, items: List[Any]) -> None:
+        if self._writer is None:
+            self.fieldnames = self.fieldnames or list(items[0])
+            self._writer = csv.DictWriter(
+                self._file, fieldnames=self.fieldnames, extrasaction="ignore"
+            )
+            if self._file.tell() == 0:
+                self._writer.writeheader()
+        self._writer.writerows(items)
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteSink(_ThreadSink):
+    """
+    Результаты-словари в таблицу sqlite одной транзакцией на пачку.
+    Таблица создается по колонкам columns (по умолчанию - ключи первого
+    результата), если ее еще нет
+    """
+    def __init__(
+        self,
+        path: str,
+        table: str = "results",
+        columns: Sequence[str]|None = None,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.table = table
+        self.columns = columns
+        self._connection: sqlite3.Connection|None = None
+        self._insert: str|None = None
+
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA busy_timeout=10000")
+
+    def _write(self, items: List[Any]) -> None:
+        if self._insert is None:
+            self.columns = self.columns or list(items[0])
+            columns = ", ".join(_quote(column) for column in self.columns)
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote(self.table)} ({columns})"
+            )
+            self._insert = (
+                f"INSERT INTO {_quote(self.table)} ({columns}) "
+                f"VALUES ({', '.join('?' * len(self.columns))})"
+            )
+        with self._connection:
+            self._connection.executemany(
+                self._insert,
+                [[item.get(column) for column in self.columns] for item in items]
+            )
+
+    def _close(self) -> None:
+        self._connection.close()
+
+
+class CallbackSink(Sink):
+    """ Своя корутина func(items), например с executemany в свою базу """
+    def __init__(self, func: Callable[[List[Any]], Awaitable]) -> None:
+        self.func = func
+
+    async def write(self, items: List[Any]) -> None:
+        await self.func(items)
+
+
+class ChannelSink(Sink):
+    """
+    Приемник процесса-воркера: пачки результатов уходят через канал
+    надзирателю, и в настоящие приемники роутера их пишет родительский
+    процесс. Результаты должны сериализоваться pickle
+    """
+    def __init__(self, channel, worker: int, router: int) -> None:
+        self.channel = channel
+        self.worker = worker
+        self.router = router # номер роутера в диспетчере
+
+    async def write(self, items: List[Any]) -> None:
+        self.channel.put(("results", self.worker, (self.router, items)))
+
+
+class ResultPipeline:
+    """
+    Конвейер результатов роутера.
+
+    Результаты копятся в очереди не больше maxsize штук и пишутся во все
+    приемники пачками по batch_size или раз в flush_interval секунд. При
+    закрытии очередь дописывается до конца. Ошибка приемника логируется и
+    не останавливает обход. written и failed считают записи по каждому
+    приемнику: с двумя приемниками результат считается дважды
+    """
+    def __init__(
+        self,
+        sinks: Sequence[Sink],
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        maxsize: int = 10000,
+    ) -> None:
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+
+        self.written = 0
+        self.failed = 0
+
+        self._queue: asyncio.Queue|None = None
+        self._writer: asyncio.Task|None = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def open(self) -> None:
+        for sink in self.sinks:
+            await sink.open()
+        self._queue = asyncio.Queue(self.maxsize)
+        self._writer = asyncio.ensure_future(self._write_batches())
+
+    async def put(self, item: Any) -> None:
+        """ Добавить результат, подождав, если очередь полна """
+        await self._queue.put(item)
+
+    async def _batch(self) -> List[Any]:
+        loop = asyncio.get_event_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write_batches(self) -> None:
+        while True:
+            batch = await self._batch()
+            results = await asyncio.gather(
+                *[sink.write(batch) for sink in self.sinks],
+                return_exceptions=True
+            )
+            for sink, result in zip(self.sinks, results):
+                if isinstance(result, Exception):
+                    self.failed += len(batch)
+                    logger.error(
+                        f"{type(sink).__name__} не записал {len(batch)} результатов: "
+                        f"{result!r}"
+                    )
+                else:
+                    self.written += len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def close(self) -> None:
+        """ Дописать все результаты и закрыть приемники """
+        if self._queue is None:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        for sink in self.sinks:
+            await sink.close()
+        self._queue = None
+        self._writer = None
@@ -0,0 +1,42 @@
+"""
+    Модуль потокового разбора html. Куски ответа aiohttp сразу скармливаются
+    инкрементальному парсеру lxml, поэтому страница не копируется целиком в
+    строку, а разбор можно остановить, как только нужный xpath найден.
+"""
+
+from aiohttp import ClientResponse
+from lxml import etree, html
+
+from .utils import compile_xpath
+
+
+async def stream_tree(
+    response: ClientResponse,
+    stop_xpath: str|None = None,
+    chunk_size: int = 64 * 1024,
+) -> html.HtmlElement:
+    """
+    Разобрать ответ по мере его получения. Если задан stop_xpath, чтение
+    прекращается, как только он что-то находит в уже разобранной части
+    страницы, остаток ответа не скачивается.
+    """
+    parser = etree.HTMLPullParser(
+        events=("start",), encoding=response.charset
+    )
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+
+    root = None
+    stop = compile_xpath(stop_xpath) if stop_xpath else None
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        parser.feed(chunk)
+
+        for _, element in parser.read_events():
+            if root is None:
+                root = element # первый открытый тег - корень страницы
+
+        if stop is not None and root is not None and stop(root):
+            break
+
+    tree = parser.close()
+    return tree if tree is not None else root
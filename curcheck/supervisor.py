@@ -0,0 +1,239 @@
+"""
+    Модуль многопроцессного режима диспетчера. Роутеры делятся между
+    процессами-воркерами, у каждого свой цикл событий и свой браузер, а
+    родительский процесс следит за ними и перезапускает упавшие.
+"""
+
+import asyncio
+import multiprocessing
+import pickle
+import queue
+import time
+
+from typing import Dict, List
+
+from loguru import logger
+
+from .sinks import ChannelSink, ResultPipeline
+
+
+def _worker_main(
+    dispatcher,
+    index: int,
+    workers: int,
+    channel,
+    options: dict|None,
+    kwargs: dict,
+    report_interval: float,
+) -> None:
+    """
+    Точка входа процесса-воркера: исполняет только свою долю роутеров.
+    Результаты роутеров уходят через канал родителю, чтобы в общие файлы и
+    базы писал один процесс
+    """
+    dispatcher.worker = index
+    routers = dispatcher.spa_routers + dispatcher.mpa_routers
+    dispatcher.spa_routers = []
+    dispatcher.mpa_routers = []
+    for i, router in enumerate(routers):
+        if i % workers == index:
+            pipeline = getattr(router, "results", None)
+            if pipeline is not None:
+                router.results = ResultPipeline(
+                    [ChannelSink(channel, index, i)],
+                    batch_size=pipeline.batch_size,
+                    flush_interval=pipeline.flush_interval,
+                    maxsize=pipeline.maxsize,
+                )
+            dispatcher.include_router(router)
+
+    async def report() -> None:
+        while True:
+            channel.put(("metrics", index, dispatcher.metrics()))
+            await asyncio.sleep(report_interval)
+
+    async def main() -> None:
+        reporter = asyncio.ensure_future(report())
+        try:
+            await dispatcher.start(options, **kwargs)
+        finally:
+            reporter.cancel()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main())
+    except Exception as exp:
+        channel.put(("error", index, repr(exp)))
+        raise
+    else:
+        channel.put(("done", index, dispatcher.metrics()))
+    finally:
+        loop.close()
+
+
+class Supervisor:
+    """
+    Надзиратель воркеров диспетчера.
+
+    Запускает workers процессов, собирает от них метрики, статусы и
+    результаты через общий канал и перезапускает воркер (не больше
+    max_restarts раз), если процесс упал или не присылал метрики дольше
+    heartbeat_timeout секунд. Результаты воркеров пишет в приемники
+    роутеров родительский процесс.
+
+    start_method - способ запуска процессов multiprocessing, по умолчанию
+    принятый на платформе. fork (linux до python 3.14) наследует роутеры
+    целиком, а spawn (windows, macos) и forkserver передают диспетчер через
+    pickle: роутеры с функциями-замыканиями так не передаются, и тогда
+    can_start() говорит диспетчеру остаться в одном процессе.
+    """
+    def __init__(
+        self,
+        dispatcher,
+        workers: int,
+        max_restarts: int = 3,
+        report_interval: float = 5,
+        heartbeat_timeout: float|None = None,
+        start_method: str|None = None,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.report_interval = report_interval
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self._context = multiprocessing.get_context(start_method)
+        self._channel = self._context.Queue()
+
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.restarts: Dict[int, int] = {}
+        self.metrics: Dict[int, dict] = {}
+        self.errors: Dict[int, List[str]] = {}
+        self.done: set = set()
+
+        self._heartbeats: Dict[int, float] = {}
+        # конвейеры результатов роутеров по их номеру в диспетчере
+        self._pipelines: Dict[int, ResultPipeline] = {
+            i: router.results
+            for i, router in enumerate(dispatcher.spa_routers + dispatcher.mpa_routers)
+            if getattr(router, "results", None) is not None
+        }
+
+    def can_start(self) -> bool:
+        """ Можно ли передать диспетчер процессам выбранным способом """
+        method = self._context.get_start_method()
+        if method == "fork":
+            return True
+        try:
+            pickle.dumps(self.dispatcher)
+        except Exception as exp:
+            logger.warning(
+                f"Диспетчер не передается процессам через {method}: {exp!r}"
+            )
+            return False
+        return True
+
+    def _spawn(self, index: int, options: dict|None, kwargs: dict) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                self.dispatcher, index, self.workers, self._channel,
+                options, kwargs, self.report_interval,
+            ),
+            name=f"curcheck-worker-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+        self._heartbeats[index] = time.monotonic()
+        logger.info(f"Воркер {index} запущен (pid {process.pid})")
+
+    async def _drain(self) -> None:
+        """ Разобрать все сообщения, пришедшие от воркеров """
+        while True:
+            try:
+                kind, index, payload = self._channel.get_nowait()
+            except queue.Empty:
+                return
+
+            self._heartbeats[index] = time.monotonic()
+            if kind == "results":
+                router, items = payload
+                for item in items:
+                    await self._pipelines[router].put(item)
+            elif kind == "metrics":
+                self.metrics[index] = payload
+            elif kind == "done":
+                self.metrics[index] = payload
+                self.done.add(index)
+            elif kind == "error":
+                self.errors.setdefault(index, []).append(payload)
+                logger.error(f"Воркер {index}: {payload}")
+
+    @property
+    def totals(self) -> dict:
+        """ Метрики всех воркеров, сложенные вместе """
+        totals: dict = {}
+        for metrics in self.metrics.values():
+            for key, value in metrics.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _check(self, index: int, options: dict|None, kwargs: dict) -> bool:
+        """ Проверить воркер, вернуть True если он еще нужен """
+        process = self.processes[index]
+
+        if not process.is_alive() and process.exitcode == 0:
+            self.done.add(index)
+            return False
+
+        hung = (
+            self.heartbeat_timeout is not None and process.is_alive()
+            and time.monotonic() - self._heartbeats[index] > self.heartbeat_timeout
+        )
+        if hung:
+            logger.warning(f"Воркер {index} не отвечает, перезапуск")
+            process.kill()
+            process.join()
+        elif process.is_alive():
+            return True
+
+        if self.restarts.get(index, 0) >= self.max_restarts:
+            logger.error(
+                f"Воркер {index} упал с кодом {process.exitcode}, "
+                f"лимит перезапусков исчерпан"
+            )
+            return False
+
+        self.restarts[index] = self.restarts.get(index, 0) + 1
+        logger.warning(
+            f"Воркер {index} упал с кодом {process.exitcode}, "
+            f"перезапуск {self.restarts[index]}/{self.max_restarts}"
+        )
+        self._spawn(index, options, kwargs)
+        return True
+
+    async def run(self, options: dict|None = None, **kwargs) -> None:
+        for index in range(self.workers):
+            self._spawn(index, options, kwargs)
+        # воркеры пишут в канал и родительские приемники не трогают
+        for pipeline in self._pipelines.values():
+            await pipeline.open()
+
+        active = set(self.processes)
+        try:
+            while active:
+                await asyncio.sleep(0.5)
+                await self._drain()
+                active = {
+                    index for index in active
+                    if self._check(index, options, kwargs)
+                }
+            await self._drain()
+        finally:
+            for process in self.processes.values():
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for pipeline in self._pipelines.values():
+                await pipeline.close()
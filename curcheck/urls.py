@@ -0,0 +1,66 @@
+"""
+    Модуль работы со ссылками: сборка полной ссылки события и приведение
+    ссылок к одному виду, чтобы одинаковые страницы не качались дважды.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def build_link(domain: str|None, url: str|None) -> str:
+    """
+    Полная ссылка события. url может быть абсолютным (http и https), без
+    схемы (//host/path, схема берется из домена) или относительным домена
+    роутера (/path, path, ?query).
+    """
+    if not url:
+        return domain
+    url = url.strip()
+
+    if urlsplit(url).scheme in DEFAULT_PORTS:
+        return url
+
+    if url.startswith("//"):
+        scheme = (urlsplit(domain).scheme if domain else "") or "http"
+        return f"{scheme}:{url}"
+
+    if not domain:
+        return url
+    if url.startswith("?"):
+        return domain + url
+    return domain.rstrip("/") + "/" + url.lstrip("/")
+
+
+def canonicalize(url: str) -> str:
+    """
+    Привести ссылку к каноническому виду: схема и хост в нижнем регистре,
+    без порта по умолчанию, без фрагмента (#...), параметры запроса
+    отсортированы по имени, пустой путь заменен на "/". Параметры не
+    перекодируются, а повторы одного параметра сохраняют свой порядок:
+    ?flag, ?a=%20 и ?a=1&a=2 - разные страницы, и смысл их не меняется.
+
+    Каноническая ссылка - только ключ для поиска повторов, качать надо
+    исходную ссылку
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    netloc = f"[{host}]" if ":" in host else host # ipv6
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    # сортировка устойчивая: одноименные параметры остаются в своем порядке
+    query = "&".join(sorted(
+        (param for param in parts.query.split("&") if param),
+        key=lambda param: param.split("=", 1)[0]
+    ))
+
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
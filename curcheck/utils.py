@@ -1,3 +1,33 @@
 """
     Модуль полезных функций-утилит
 """
+
+import functools
+
+from lxml import etree
+
+
+@functools.lru_cache(maxsize=256)
+def compile_xpath(expression: str) -> etree.XPath:
+    """ Скомпилированный xpath, одно и то же выражение компилируется один раз """
+    return etree.XPath(expression)
+
+
+# Вычисляет xpath внутри страницы и одним массивом возвращает значения всех
+# найденных узлов: для атрибутов (@href) и текста (text()) - их значение,
+# для элементов - innerHTML
+XPATH_VALUES_JS = """
+(xpath) => {
+    const result = document.evaluate(
+        xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const values = [];
+    for (let i = 0; i < result.snapshotLength; i++) {
+        const node = result.snapshotItem(i);
+        values.push(
+            node.nodeType === Node.ELEMENT_NODE ? node.innerHTML : node.textContent
+        );
+    }
+    return values;
+}
+"""
@@ -0,0 +1,191 @@
+"""
+    Модуль слежения за элементами страницы. Лонгпул с watch вызывает функцию
+    не с целой страницей, а только с изменениями между проверками:
+    добавленными, удаленными и поменявшимися элементами.
+"""
+
+import hashlib
+import json
+
+from typing import Dict, List
+
+from lxml import html
+
+from .utils import compile_xpath
+
+
+# в браузере отпечатки считаются прямо на странице, а через CDP обратно
+# приходят только изменения
+WATCH_DIFF_JS = """
+(itemsXpath, keyXpath, fields, previous) => {
+    const hash = (str) => {
+        let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+        for (let i = 0; i < str.length; i++) {
+            const ch = str.charCodeAt(i);
+            h1 = Math.imul(h1 ^ ch, 2654435761);
+            h2 = Math.imul(h2 ^ ch, 1597334677);
+        }
+        h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+        h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+        return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+    };
+    const value = (node, xpath) => document.evaluate(
+        xpath, node, null, XPathResult.STRING_TYPE, null
+    ).stringValue.trim();
+
+    const snapshot = document.evaluate(
+        itemsXpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    // Map, а не объект: ключи вроде "constructor" или "__proto__" есть у
+    // любого объекта
+    const known = new Map(Object.entries(previous));
+    const added = [], modified = [], seen = new Map();
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        const node = snapshot.snapshotItem(i);
+        const item = {key: value(node, keyXpath)};
+        if (seen.has(item.key)) continue;
+        if (fields) {
+            for (const [name, xpath] of Object.entries(fields)) {
+                item[name] = value(node, xpath);
+            }
+        } else {
+            item.text = node.textContent.trim();
+        }
+        const fingerprint = hash(JSON.stringify(item));
+        seen.set(item.key, fingerprint);
+        if (!known.has(item.key)) {
+            added.push([item, fingerprint]);
+        } else if (known.get(item.key) !== fingerprint) {
+            modified.push([item, fingerprint]);
+        }
+    }
+    const removed = [...known.keys()].filter((key) => !seen.has(key));
+    return {added, modified, removed};
+}
+"""
+
+
+class Diff:
+    """
+    Изменения между двумя проверками. added и modified - элементы-словари
+    (key и поля), removed - ключи пропавших элементов
+    """
+    def __init__(
+        self,
+        added: List[dict],
+        removed: List[str],
+        modified: List[dict],
+    ) -> None:
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def __repr__(self) -> str:
+        return (
+            f"<Diff added={len(self.added)} removed={len(self.removed)} "
+            f"modified={len(self.modified)}>"
+        )
+
+
+class Watch:
+    """
+    Слежение за элементами items_xpath. key_xpath - путь от элемента к его
+    ключу, fields - поля элемента {имя: путь от элемента}, по которым
+    определяется изменение (без них - по всему тексту элемента). Между
+    проверками хранится только отпечаток каждого элемента.
+
+    initial - сообщить на первой проверке обо всех элементах как о
+    добавленных. У каждого лонгпула должен быть свой Watch
+    """
+    def __init__(
+        self,
+        items_xpath: str,
+        key_xpath: str,
+        fields: Dict[str, str]|None = None,
+        initial: bool = True,
+    ) -> None:
+        self.items_xpath = items_xpath
+        self.key_xpath = key_xpath
+        self.fields = fields
+        self.initial = initial
+
+        self.fingerprints: Dict[str, str] = {}
+        self._polled = False
+
+    @property
+    def polled(self) -> bool:
+        """ Запомнены ли уже элементы страницы """
+        return self._polled
+
+    def _value(self, node: html.HtmlElement, xpath: str) -> str:
+        return compile_xpath(f"string({xpath})")(node).strip()
+
+    def _item(self, node: html.HtmlElement) -> dict:
+        item = {"key": self._value(node, self.key_xpath)}
+        if self.fields:
+            for name, xpath in self.fields.items():
+                item[name] = self._value(node, xpath)
+        else:
+            item["text"] = node.text_content().strip()
+        return item
+
+    @staticmethod
+    def _fingerprint(item: dict) -> str:
+        return hashlib.blake2b(
+            json.dumps(item, ensure_ascii=False).encode(), digest_size=8
+        ).hexdigest()
+
+    def _apply(self, added: list, removed: List[str], modified: list) -> Diff:
+        """ Запомнить новые отпечатки и собрать изменения """
+        for key in removed:
+            del self.fingerprints[key]
+        for item, fingerprint in (*added, *modified):
+            self.fingerprints[item["key"]] = fingerprint
+
+        diff = Diff(
+            added=[item for item, _ in added],
+            removed=removed,
+            modified=[item for item, _ in modified],
+        )
+        if not self._polled:
+            self._polled = True
+            if not self.initial:
+                return Diff([], [], [])
+        return diff
+
+    def diff(self, tree: html.HtmlElement) -> Diff:
+        """ Изменения по разобранной странице """
+        added, modified, current = [], [], {}
+        for node in compile_xpath(self.items_xpath)(tree):
+            item = self._item(node)
+            if item["key"] in current:
+                continue
+            fingerprint = self._fingerprint(item)
+            current[item["key"]] = fingerprint
+
+            previous = self.fingerprints.get(item["key"])
+            if previous is None:
+                added.append((item, fingerprint))
+            elif previous != fingerprint:
+                modified.append((item, fingerprint))
+
+        removed = [key for key in self.fingerprints if key not in current]
+        return self._apply(added, removed, modified)
+
+    async def page_diff(self, page) -> Diff:
+        """ Изменения по открытой вкладке, отпечатки считаются в браузере """
+        result = await page.evaluate(
+            WATCH_DIFF_JS,
+            self.items_xpath, self.key_xpath, self.fields, self.fingerprints,
+        )
+        return self._apply(result["added"], result["removed"], result["modified"])
+
+    def unchanged(self) -> Diff:
+        """
+        Страница не менялась - и элементы тоже. Пока элементы не запомнены,
+        первой проверкой останется следующая разобранная страница
+        """
+        return Diff([], [], [])
@@ -0,0 +1,188 @@
+"""
+    Модуль сторожа браузеров. За многодневный обход память Chromium растет
+    без предела, поэтому сторож следит за каждым браузером пула и плановно
+    заменяет разросшиеся браузеры новыми, не обрывая вкладки в работе.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+from typing import TYPE_CHECKING, Dict
+
+from loguru import logger
+
+from .pool import BrowserState, PagePool
+
+if TYPE_CHECKING:
+    from pyppeteer.browser import Browser
+
+
+MB = 1024 * 1024
+
+
+def process_rss(pid: int) -> int|None:
+    """
+    Память процесса и всех его потомков в байтах (только linux). Общая
+    память процессов считается несколько раз, так что это оценка сверху
+    """
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        with open(f"/proc/{pid}/statm") as f:
+            total = int(f.read().split()[1]) * page_size
+    except (OSError, ValueError):
+        return None
+
+    children = []
+    stack = [pid]
+    while stack:
+        parent = stack.pop()
+        try:
+            for task in os.listdir(f"/proc/{parent}/task"):
+                with open(f"/proc/{parent}/task/{task}/children") as f:
+                    found = [int(child) for child in f.read().split()]
+                children.extend(found)
+                stack.extend(found)
+        except OSError:
+            continue
+
+    for child in children:
+        try:
+            with open(f"/proc/{child}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError):
+            # процесс вкладки успел завершиться
+            continue
+    return total
+
+
+class BrowserHealth:
+    """ Последний замер одного браузера """
+    def __init__(
+        self,
+        navigations: int,
+        busy: int,
+        rss: int|None,
+        js_heap: int|None,
+        age: float,
+    ) -> None:
+        self.navigations = navigations
+        self.busy = busy
+        self.rss = rss # байт, None - если не удалось узнать
+        self.js_heap = js_heap
+        self.age = age
+
+    def __repr__(self) -> str:
+        rss = f"{self.rss / MB:.0f}MB" if self.rss is not None else "?"
+        heap = f"{self.js_heap / MB:.0f}MB" if self.js_heap is not None else "?"
+        return (
+            f"<BrowserHealth navigations={self.navigations} busy={self.busy} "
+            f"rss={rss} js_heap={heap}>"
+        )
+
+
+class BrowserWatchdog:
+    """
+    Сторож браузеров пула.
+
+    Раз в interval секунд снимает с каждого браузера число навигаций,
+    вкладки в работе, память его процессов (RSS) и кучу JS всех вкладок
+    (метрики CDP). Браузер, сделавший больше max_navigations навигаций или
+    занявший больше max_rss / max_js_heap мегабайт, заменяется новым:
+    замена запускается сразу, а старый браузер дорабатывает вкладки на
+    руках (не дольше drain_timeout секунд). Заменяется не больше одного
+    браузера за раз. Упавшие браузеры пул запускает заново сам, и со
+    сторожем, и без
+    """
+    def __init__(
+        self,
+        interval: float = 30,
+        max_navigations: int|None = None,
+        max_rss: float|None = None,
+        max_js_heap: float|None = None,
+        drain_timeout: float|None = 60,
+    ) -> None:
+        self.interval = interval
+        self.max_navigations = max_navigations
+        self.max_rss = max_rss
+        self.max_js_heap = max_js_heap
+        self.drain_timeout = drain_timeout
+
+        self.pool: PagePool|None = None
+        self.health: Dict[Browser, BrowserHealth] = {}
+
+        self._task: asyncio.Task|None = None
+        self._recycling: asyncio.Task|None = None
+
+    async def start(self, pool: PagePool) -> None:
+        self.pool = pool
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as exp:
+                logger.warning(f"Сторож браузеров: {exp!r}")
+
+    async def _js_heap(self, state: BrowserState) -> int|None:
+        try:
+            pages = await state.browser.pages()
+            metrics = await asyncio.wait_for(
+                asyncio.gather(*[page.metrics() for page in pages]), self.interval
+            )
+        except Exception:
+            return None
+        return sum(int(item.get("JSHeapUsedSize", 0)) for item in metrics)
+
+    async def measure(self, state: BrowserState) -> BrowserHealth:
+        process = state.browser.process
+        return BrowserHealth(
+            navigations=state.navigations,
+            busy=state.busy,
+            rss=process_rss(process.pid) if process is not None else None,
+            js_heap=await self._js_heap(state),
+            age=time.monotonic() - state.launched_at,
+        )
+
+    def _reason(self, health: BrowserHealth) -> str|None:
+        """ Почему браузер пора заменить, None - не пора """
+        if self.max_navigations and health.navigations >= self.max_navigations:
+            return f"{health.navigations} навигаций"
+        if self.max_rss and health.rss and health.rss > self.max_rss * MB:
+            return f"RSS {health.rss / MB:.0f}MB"
+        if self.max_js_heap and health.js_heap and health.js_heap > self.max_js_heap * MB:
+            return f"куча JS {health.js_heap / MB:.0f}MB"
+        return None
+
+    async def check(self) -> None:
+        """ Один обход всех браузеров пула """
+        if self.pool is None or not self.pool.started:
+            return
+
+        states = list(self.pool.states.values())
+        self.health = {
+            state.browser: await self.measure(state) for state in states
+        }
+
+        if self._recycling is not None and not self._recycling.done():
+            return
+        for state in states:
+            reason = self._reason(self.health[state.browser])
+            if reason and state.alive and not state.retiring:
+                logger.info(f"Браузер заменяется новым: {reason}")
+                self._recycling = asyncio.ensure_future(
+                    self.pool.recycle(state.browser, self.drain_timeout)
+                )
+                return
+
+    async def close(self) -> None:
+        for task in (self._task, self._recycling):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        self._recycling = None
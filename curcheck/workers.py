@@ -0,0 +1,146 @@
+"""
+    Модуль очереди воркеров. Держит в работе ровно concurrency задач:
+    как только одна задача завершилась, воркер сразу берет следующую, не
+    дожидаясь остальных.
+"""
+
+import asyncio
+import itertools
+import time
+
+from typing import Awaitable, List
+
+from loguru import logger
+
+
+class WorkerStats:
+    """ Статистика очереди: глубина, задачи в работе и скорость выполнения """
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def completed(self) -> int:
+        return self.done + self.failed
+
+    @property
+    def rate(self) -> float:
+        """ Завершенных задач в секунду """
+        elapsed = time.monotonic() - self.started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<WorkerStats queued={self.queued} in_flight={self.in_flight} "
+            f"done={self.done} failed={self.failed} rate={self.rate:.2f}/s>"
+        )
+
+
+class WorkerQueue:
+    """
+    Очередь с ограниченным числом воркеров. Задачи можно добавлять по мере
+    их появления, пока очередь открыта. Используется как асинхронный
+    контекстный менеджер: при выходе дожидается выполнения всех задач.
+    maxsize ограничивает очередь: submit ждет, пока в ней не появится место.
+    prioritized - задачи берутся не по порядку, а по приоритету из
+    submit_prioritized (меньше - раньше).
+    """
+    def __init__(
+        self, concurrency: int = 10, maxsize: int = 0, prioritized: bool = False
+    ) -> None:
+        self.concurrency = concurrency
+        self.prioritized = prioritized
+        self.stats = WorkerStats()
+        self.errors: List[BaseException] = []
+
+        self._queue: asyncio.Queue = (
+            asyncio.PriorityQueue(maxsize) if prioritized else asyncio.Queue(maxsize)
+        )
+        self._counter = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def __aenter__(self) -> "WorkerQueue":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.join()
+        else:
+            await self.cancel()
+
+    def start(self) -> None:
+        self.stats = WorkerStats()
+        self.errors = []
+        self._stopping = False
+        self._workers = [
+            asyncio.ensure_future(self._worker())
+            for _ in range(self.concurrency)
+        ]
+
+    async def submit(self, func: Awaitable, *args, **kwargs) -> None:
+        """ Поставить корутинную функцию func(*args, **kwargs) в очередь """
+        await self.submit_prioritized(0, func, *args, **kwargs)
+
+    async def submit_prioritized(
+        self, priority: float, func: Awaitable, *args, **kwargs
+    ) -> None:
+        # счетчик сохраняет порядок задач с одинаковым приоритетом
+        await self._queue.put((priority, next(self._counter), func, args, kwargs))
+        self.stats.submitted += 1
+        self.stats.queued += 1
+
+    def _cancelled(self) -> bool:
+        """ Отменяют ли сам воркер, а не задачу внутри него """
+        if self._stopping:
+            return True
+        # python 3.11+: отмена снаружи видна и без cancel() очереди
+        cancelling = getattr(asyncio.current_task(), "cancelling", None)
+        return bool(cancelling and cancelling())
+
+    def _failed(self, exp: BaseException) -> None:
+        # упавшая задача не останавливает остальные
+        self.stats.failed += 1
+        self.errors.append(exp)
+        logger.warning(f"Задача упала: {exp!r}")
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, func, args, kwargs = await self._queue.get()
+            self.stats.queued -= 1
+            self.stats.in_flight += 1
+            try:
+                await func(*args, **kwargs)
+            except asyncio.CancelledError as exp:
+                if self._cancelled():
+                    raise
+                # задачу отменили изнутри (например, ожидание, которое она
+                # ждала): воркер живет, иначе join не дождется очереди
+                self._failed(exp)
+            except Exception as exp:
+                self._failed(exp)
+            else:
+                self.stats.done += 1
+            finally:
+                self.stats.in_flight -= 1
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """ 
+        Дождаться выполнения всех задач. Ошибки задач не пробрасываются, 
+        они остаются в errors и stats.failed
+        """
+        await self._queue.join()
+        await self.cancel()
+
+    async def cancel(self) -> None:
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
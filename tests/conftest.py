@@ -0,0 +1,178 @@
+import asyncio
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from aiohttp import web
+
+from curcheck.pool import PagePool
+
+
+class FakePage:
+    """ Вкладка без браузера: хватает для проверки пула """
+    def __init__(self, browser: "FakeBrowser") -> None:
+        self.browser = browser
+        self.closed = False
+        self.set_cookies = []
+        self.fail_cookies = False
+        self.intercepting = False
+        self.listeners = {}
+
+    def isClosed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        if not self.browser.alive:
+            raise ConnectionError("browser is gone")
+        self.closed = True
+
+    def setDefaultNavigationTimeout(self, timeout: int) -> None:
+        pass
+
+    async def setCookie(self, *cookies) -> None:
+        if self.fail_cookies:
+            raise RuntimeError("setCookie failed")
+        self.set_cookies.extend(cookies)
+
+    async def goto(self, link: str, **options) -> None:
+        self.link = link
+        self.options = options
+        await self.work()
+        if self.browser.fail_goto:
+            self.browser.fail_goto -= 1
+            raise asyncio.TimeoutError()
+
+    async def reload(self, **options) -> None:
+        await self.work()
+
+    async def setRequestInterception(self, enabled: bool) -> None:
+        if not self.browser.alive:
+            raise ConnectionError("browser is gone")
+        self.intercepting = enabled
+
+    def on(self, event: str, handler) -> None:
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event: str, handler) -> None:
+        self.listeners[event].remove(handler)
+
+    async def content(self) -> str:
+        return "<html><body><h1>browser</h1></body></html>"
+
+    async def cookies(self) -> list:
+        return [{"name": "cf", "value": "1", "domain": "127.0.0.1"}] + self.set_cookies
+
+    async def evaluate(self, script: str, *args):
+        if args: # xpath ссылок на странице
+            return list(self.browser.hrefs)
+        return "FakeBrowser/1.0"
+
+    async def metrics(self) -> dict:
+        return {"JSHeapUsedSize": 1024}
+
+    async def work(self) -> None:
+        await asyncio.sleep(0.01)
+        if not self.browser.alive:
+            raise ConnectionError("browser is gone")
+
+
+class FakeBrowser:
+    launched = 0
+
+    def __init__(self) -> None:
+        FakeBrowser.launched += 1
+        self.alive = True
+        self.process = None
+        self.fail_new_pages = 0
+        self.fail_goto = 0
+        self.hrefs = []
+        self.opened = []
+        self._handlers = []
+
+    def on(self, event: str, handler) -> None:
+        assert event == "disconnected"
+        self._handlers.append(handler)
+
+    async def newPage(self) -> FakePage:
+        if self.fail_new_pages:
+            self.fail_new_pages -= 1
+            raise RuntimeError("newPage failed")
+        page = FakePage(self)
+        self.opened.append(page)
+        return page
+
+    async def pages(self) -> list:
+        return [page for page in self.opened if not page.closed]
+
+    async def close(self) -> None:
+        self.crash()
+
+    def crash(self) -> None:
+        if not self.alive:
+            return
+        self.alive = False
+        for handler in self._handlers:
+            handler()
+
+
+@pytest.fixture
+def make_pool():
+    """ PagePool, который вместо Chromium запускает FakeBrowser """
+    def make(**kwargs) -> PagePool:
+        pool = PagePool(**kwargs)
+
+        async def launch():
+            return FakeBrowser()
+
+        pool._launch = launch
+        return pool
+
+    return make
+
+
+@pytest.fixture
+def http_server():
+    """ Локальный сервер aiohttp: async with http_server(app) as url """
+    @asynccontextmanager
+    async def serve(app: web.Application):
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            await runner.cleanup()
+
+    return serve
+
+
+class EtagSite:
+    """ Страница с ETag: отвечает 304 на совпавший If-None-Match """
+    def __init__(self, body: str = "<html><body><h1>v1</h1></body></html>") -> None:
+        self.body = body
+        self.requests = 0
+        self.conditional = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        etag = '"%d"' % hash(self.body)
+        if request.headers.get("If-None-Match"):
+            self.conditional += 1
+            if request.headers["If-None-Match"] == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=self.body, content_type="text/html", headers={"ETag": etag}
+        )
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/page", self.handle)
+        return app
+
+
+@pytest.fixture
+def etag_site():
+    return EtagSite()
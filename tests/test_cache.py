@@ -0,0 +1,123 @@
+import asyncio
+
+from aiohttp import ClientSession
+
+from curcheck.cache import CacheEntry, HTTPCache
+from curcheck.events import EventPage
+
+
+def make_page(domain: str, cache: HTTPCache, **kwargs) -> EventPage:
+    page = EventPage(domain=domain, url="/page", **kwargs)
+    page.cache = cache
+    return page
+
+
+def test_cache_is_filled_and_requests_are_conditional(http_server, etag_site):
+    async def main():
+        cache = HTTPCache()
+        async with http_server(etag_site.app()) as url, ClientSession() as session:
+            page = make_page(url, cache)
+            for _ in range(3):
+                await page._fetch_text(session)
+
+        assert len(cache) == 1
+        assert etag_site.requests == 3
+        assert etag_site.conditional == 2
+
+    asyncio.run(main())
+
+
+def test_skip_unchanged_calls_callback_once(http_server, etag_site):
+    async def main():
+        calls = []
+        async with http_server(etag_site.app()) as url, ClientSession() as session:
+            page = make_page(url, HTTPCache(), skip_unchanged=True)
+
+            @page
+            async def handle(tree):
+                calls.append(tree.xpath("//h1/text()")[0])
+
+            for _ in range(3):
+                await handle(session)
+
+            etag_site.body = "<html><body><h1>v2</h1></body></html>"
+            await handle(session)
+
+        assert calls == ["v1", "v2"]
+
+    asyncio.run(main())
+
+
+def test_changed_is_tracked_per_event(http_server, etag_site):
+    async def main():
+        cache = HTTPCache()
+        async with http_server(etag_site.app()) as url, ClientSession() as session:
+            first = make_page(url, cache)
+            _, changed = await first._fetch_text(session)
+            assert changed
+
+            # второе событие на той же ссылке получает 304, но страницу
+            # видит впервые
+            second = make_page(url, cache)
+            _, changed = await second._fetch_text(session)
+            assert changed and etag_site.conditional == 1
+
+            _, changed = await first._fetch_text(session)
+            assert not changed
+
+    asyncio.run(main())
+
+
+def test_tree_is_kept_only_when_it_can_be_reused(http_server, etag_site):
+    async def main():
+        async with http_server(etag_site.app()) as url, ClientSession() as session:
+            page = make_page(url, HTTPCache())
+            tree = await page._fetch_tree(session)
+            assert await page._fetch_tree(session) is tree
+
+            skipping = make_page(url, HTTPCache(), skip_unchanged=True)
+            await skipping._fetch_tree(session)
+            assert skipping._last_tree is None
+
+            once = make_page(url, HTTPCache())
+            once.keep_tree = False
+            await once._fetch_tree(session)
+            assert once._last_tree is None
+
+    asyncio.run(main())
+
+
+def test_disk_cache_survives_restart(tmp_path, http_server, etag_site):
+    async def main():
+        async with http_server(etag_site.app()) as url, ClientSession() as session:
+            await make_page(url, HTTPCache(directory=str(tmp_path)))._fetch_text(session)
+
+            # после перезапуска запрос условный, а первая проверка - изменение
+            restarted = make_page(url, HTTPCache(directory=str(tmp_path)))
+            text, changed = await restarted._fetch_text(session)
+            assert changed and "v1" in text
+            assert etag_site.conditional == 1
+
+    asyncio.run(main())
+
+
+def test_disk_size_limit(tmp_path):
+    async def main():
+        cache = HTTPCache(max_size=10, directory=str(tmp_path), max_disk_size=250)
+        for i in range(5):
+            await cache.put(f"http://a.ru/{i}", CacheEntry(b"x" * 100))
+
+        assert cache.disk_size <= 250
+        assert len(list(tmp_path.glob("*.html"))) == 2
+        assert await cache.get("http://a.ru/0") is None
+        assert await cache.get("http://a.ru/4") is not None
+
+        # при перезапуске лишнее на диске тоже удаляется
+        smaller = HTTPCache(directory=str(tmp_path), max_disk_size=150)
+        assert smaller.disk_size == 100
+
+    asyncio.run(main())
+
+
+def test_empty_cache_is_truthy():
+    assert HTTPCache() and len(HTTPCache()) == 0
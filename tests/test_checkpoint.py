@@ -0,0 +1,88 @@
+import asyncio
+
+from curcheck.checkpoint import IN_FLIGHT, CrawlStore
+from curcheck.events import EventPaginator
+
+
+def test_claim_done_and_resume(tmp_path):
+    async def main():
+        path = str(tmp_path / "crawl.db")
+        store = CrawlStore(path)
+        await store.open()
+        await store.discover("k", ["/1", "/2", "/3"])
+        first = await store.claim("k", 2)
+        assert len(first) == 2
+        store.done("k", first[0])
+        await store.close()
+
+        # после перезапуска готовая ссылка пропускается, а брошенная
+        # умершим процессом возвращается в очередь
+        store = CrawlStore(path)
+        await store.open()
+        await store._run(
+            store._connection.execute,
+            "UPDATE urls SET owner = ? WHERE state = ?", (2 ** 22 + 1, IN_FLIGHT)
+        )
+        await store.recover()
+        await store.discover("k", ["/1", "/2", "/3"])
+        rest = await store.claim("k", 10)
+        assert sorted(rest) == sorted({"/1", "/2", "/3"} - {first[0]})
+        assert await store.is_done("k", first[0])
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_claim_skips_urls_of_live_process(tmp_path):
+    async def main():
+        store = CrawlStore(str(tmp_path / "crawl.db"))
+        await store.open()
+        await store.discover("k", ["/1"])
+        assert await store.claim("k", 10) == ["/1"]
+        await store.recover()
+        # процесс жив - ссылка остается за ним
+        assert await store.claim("k", 10) == []
+        assert (await store.stats("k"))["in_flight"] == 1
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_reset_only_given_keys(tmp_path):
+    async def main():
+        store = CrawlStore(str(tmp_path / "crawl.db"))
+        await store.open()
+        await store.discover("mine", ["/1"])
+        await store.discover("other", ["/1"])
+        await store.reset(["mine"])
+        assert (await store.stats("mine"))["discovered"] == 0
+        assert (await store.stats("other"))["discovered"] == 1
+        await store.reset()
+        assert (await store.stats("other"))["discovered"] == 0
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_store_keys_differ():
+    def make(**kwargs):
+        paginator = EventPaginator(domain="http://a.ru", **kwargs)
+
+        def catalog(tree):
+            pass
+
+        paginator(catalog)
+        return paginator
+
+    first = make(paginate_urls=["/1", "/2"])
+    second = make(paginate_urls=["/3"])
+    assert first.store_key != second.store_key
+    assert first.store_key == make(paginate_urls=["/1", "/2"]).store_key
+
+    def other(tree):
+        pass
+
+    third = make(url="/catalog", pages_links_xpath="//a/@href")
+    fourth = EventPaginator(domain="http://a.ru", url="/catalog", pages_links_xpath="//a/@href")
+    fourth(other)
+    assert third.store_key != fourth.store_key
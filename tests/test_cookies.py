@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+
+from curcheck.cookies import CookieStore
+
+
+def make_login(logins: list, expires: float):
+    async def login():
+        logins.append(1)
+        await asyncio.sleep(0.01)
+        return [{"name": "s", "value": str(len(logins)), "expires": expires}]
+    return login
+
+
+def test_concurrent_gets_share_one_login(tmp_path):
+    logins = []
+
+    async def main():
+        store = CookieStore(str(tmp_path))
+        login = make_login(logins, time.time() + 3600)
+        return await asyncio.gather(*[store.get("http://a.ru", login) for _ in range(5)])
+
+    results = asyncio.run(main())
+    assert logins == [1]
+    assert all(cookies is results[0] for cookies in results)
+    assert os.path.exists(tmp_path / "a.ru.json")
+
+
+def test_expiring_cookies_are_refreshed(tmp_path):
+    logins = []
+
+    async def main():
+        store = CookieStore(str(tmp_path), refresh_margin=60)
+        # до конца срока меньше refresh_margin - куки уже устарели
+        await store.get("http://a.ru", make_login(logins, time.time() + 30))
+        await store.get("http://a.ru", make_login(logins, time.time() + 3600))
+        await store.get("http://a.ru", make_login(logins, time.time() + 3600))
+
+    asyncio.run(main())
+    assert logins == [1, 1]
+
+
+def test_max_age_and_session_cookies(tmp_path):
+    async def main():
+        store = CookieStore(str(tmp_path), max_age=10)
+        session = [{"name": "s", "value": "1"}]
+        assert store.is_fresh(session, time.time())
+        assert not store.is_fresh(session, time.time() - 11)
+
+    asyncio.run(main())
+
+
+def test_file_is_shared_between_stores(tmp_path):
+    logins = []
+
+    async def main():
+        login = make_login(logins, time.time() + 3600)
+        await CookieStore(str(tmp_path)).get("http://a.ru", login, account="bot")
+        cookies = await CookieStore(str(tmp_path)).get("http://a.ru", login, account="bot")
+        assert cookies[0]["value"] == "1"
+
+        store = CookieStore(str(tmp_path))
+        store.invalidate("http://a.ru", account="bot")
+        await store.get("http://a.ru", login, account="bot")
+
+    asyncio.run(main())
+    assert logins == [1, 1]
+    assert os.path.exists(tmp_path / "a.ru.bot.json")
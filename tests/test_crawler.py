@@ -0,0 +1,116 @@
+import asyncio
+
+from aiohttp import web
+
+from curcheck.events import EventCrawler
+from curcheck.seen import HashSeenSet
+from curcheck.session import create_session
+
+
+# страница n ссылается на n+1, на повтор и на чужой домен
+def make_site(requested: list) -> web.Application:
+    async def page(request):
+        requested.append(str(request.rel_url))
+        await asyncio.sleep(0.005)
+        n = int(request.match_info["n"])
+        body = (
+            f'<a href="/p/{n + 1}">next</a>'
+            f'<a href="/p/{n + 1}#top">next again</a>'
+            f'<a href="/p/0">home</a>'
+            f'<a href="http://other.example/p/{n}">other</a>'
+            f'<a href="/private/{n}">private</a>'
+        )
+        return web.Response(text=body, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/p/{n}", page)
+    app.router.add_get("/private/{n}", page)
+    return app
+
+
+def crawl(url: str, **kwargs) -> EventCrawler:
+    return EventCrawler(domain=url, url="/p/0", links_xpath="//a/@href", **kwargs)
+
+
+def run_crawler(http_server, requested: list, **kwargs) -> list:
+    async def main():
+        async with http_server(make_site(requested)) as url:
+            crawler = crawl(url, **kwargs)
+            seen = []
+
+            async def visit(tree):
+                seen.append(tree)
+
+            async with create_session() as session:
+                await crawler(visit)(session)
+        return seen
+
+    return asyncio.run(main())
+
+
+def test_depth_limit_and_dedupe(http_server):
+    requested = []
+    visited = run_crawler(http_server, requested, max_depth=2, deny_paths=["^/private"])
+
+    # 0 -> 1 -> 2, глубже не идет, повторы и фрагменты не качаются
+    assert requested == ["/p/0", "/p/1", "/p/2"]
+    assert len(visited) == 3
+
+
+def test_only_allowed_domains_and_paths(http_server):
+    requested = []
+    run_crawler(http_server, requested, max_depth=1)
+
+    # чужой домен отброшен, путь не ограничен
+    assert sorted(requested) == ["/p/0", "/p/1", "/private/0"]
+
+
+def test_max_pages(http_server):
+    requested = []
+    run_crawler(http_server, requested, max_depth=10, max_pages=4, deny_paths=["^/private"])
+    assert len(requested) == 4
+
+
+def test_links_of_other_events_are_skipped(http_server):
+    requested = []
+
+    async def main():
+        async with http_server(make_site(requested)) as url:
+            crawler = crawl(url, max_depth=2, deny_paths=["^/private"])
+            crawler.seen = HashSeenSet() # общее множество диспетчера
+            crawler.seen.add(f"{url}/p/1")
+
+            async def visit(tree):
+                pass
+
+            async with create_session() as session:
+                await crawler(visit)(session)
+
+    asyncio.run(main())
+    assert requested == ["/p/0"]
+
+
+def test_concurrent_crawls_keep_their_state(http_server):
+    requested = []
+
+    async def main():
+        async with http_server(make_site(requested)) as url:
+            crawler = crawl(url, max_depth=3, deny_paths=["^/private"])
+            calls = []
+
+            async def visit(tree, name):
+                calls.append(name)
+
+            async def run(session, name):
+                await task(session, name)
+                # обход заканчивается только после своих страниц
+                assert calls.count(name) == 4
+
+            task = crawler(visit)
+            async with create_session() as session:
+                await asyncio.gather(run(session, "a"), run(session, "b"))
+
+        assert crawler.stats.done == 4
+
+    asyncio.run(main())
+    assert len(requested) == 8
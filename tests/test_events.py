@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from curcheck.events import EventPage
+from curcheck.resilience import Resilience
+
+
+def make_page_event(func) -> EventPage:
+    event = EventPage(domain="http://a.ru", url="/", is_browser=True)
+    event.resilience = Resilience(retries=2, base_delay=0)
+    event(func)
+    return event
+
+
+def test_spa_navigation_retried_callback_called_once(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        await pool.start()
+        pool.browsers[0].fail_goto = 1
+        calls = []
+
+        async def func(page):
+            calls.append(page)
+
+        await make_page_event(func).task(pool)
+        assert len(calls) == 1
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_spa_callback_error_is_not_retried(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        calls = []
+
+        async def func(page):
+            calls.append(page)
+            raise asyncio.TimeoutError()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await make_page_event(func).task(pool)
+        assert len(calls) == 1
+        # вкладка вернулась в пул
+        assert pool.idle == 1
+        await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import pytest
+
+from curcheck.errors import ConfigurationError, FrontierClosedError
+from curcheck.frontier import Frontier, Priority, TokenBucket
+
+
+def test_priority_order():
+    async def main():
+        frontier = Frontier(concurrency=1)
+        await frontier.start()
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def request(name):
+            async def func():
+                order.append(name)
+            return func
+
+        first = asyncio.ensure_future(frontier.submit("http://a.ru/0", blocker))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.ensure_future(frontier.submit("http://a.ru/1", request("pagination"), Priority.PAGINATION)),
+            asyncio.ensure_future(frontier.submit("http://b.ru/1", request("page"), Priority.PAGE)),
+            asyncio.ensure_future(frontier.submit("http://a.ru/2", request("longpoll"), Priority.LONGPOLL)),
+        ]
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        await frontier.close()
+        assert order == ["longpoll", "page", "pagination"]
+
+    asyncio.run(main())
+
+
+def test_domain_rate():
+    async def main():
+        frontier = Frontier(domain_rate=20, domain_rates={"fast.ru": 1000})
+        await frontier.start()
+        times = {"slow.ru": [], "fast.ru": []}
+
+        def request(domain):
+            async def func():
+                times[domain].append(time.monotonic())
+            return func
+
+        started = time.monotonic()
+        await asyncio.gather(*[
+            frontier.submit(f"http://{domain}/{i}", request(domain))
+            for i in range(5) for domain in times
+        ])
+        await frontier.close()
+
+        # 5 запросов при 20 в секунду и burst=1 - не быстрее 0.2 секунды,
+        # а быстрый домен не ждет медленный
+        assert times["slow.ru"][-1] - started >= 0.19
+        assert times["fast.ru"][-1] - started < 0.1
+
+    asyncio.run(main())
+
+
+def test_concurrency_limit():
+    async def main():
+        frontier = Frontier(concurrency=2)
+        await frontier.start()
+        running = peak = 0
+
+        async def func():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        results = await asyncio.gather(*[
+            frontier.submit(f"http://a.ru/{i}", func) for i in range(6)
+        ])
+        await frontier.close()
+        assert peak == 2 and results == ["ok"] * 6
+
+    asyncio.run(main())
+
+
+def test_errors_reach_caller():
+    async def main():
+        frontier = Frontier()
+        await frontier.start()
+
+        async def func():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await frontier.submit("http://a.ru/", func)
+        await frontier.close()
+
+    asyncio.run(main())
+
+
+def test_submit_before_start_and_after_close():
+    async def main():
+        async def func():
+            pass
+
+        frontier = Frontier()
+        with pytest.raises(FrontierClosedError, match="не запущена"):
+            await frontier.submit("http://a.ru/", func)
+
+        await frontier.start()
+        await frontier.close()
+        with pytest.raises(FrontierClosedError, match="закрыта"):
+            await asyncio.wait_for(frontier.submit("http://a.ru/", func), 1)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"domain_rate": 0},
+    {"domain_rates": {"a.ru": -1}},
+    {"concurrency": 0},
+    {"domain_burst": 0},
+])
+def test_invalid_limits(kwargs):
+    with pytest.raises(ConfigurationError):
+        Frontier(**kwargs)
+
+
+def test_bucket_wait_time():
+    bucket = TokenBucket(rate=10, burst=1)
+    assert bucket.wait_time() == 0
+    bucket.consume()
+    assert 0 < bucket.wait_time() <= 0.1
+    assert TokenBucket().wait_time() == 0
@@ -0,0 +1,83 @@
+import asyncio
+
+from aiohttp import web
+
+from curcheck.events import EventPage
+from curcheck.handoff import Handoff
+from curcheck.resilience import Resilience
+from curcheck.session import create_session
+
+
+CHALLENGE = "<html><title>Just a moment...</title></html>"
+
+
+def make_event(url: str, pool, resilience: Resilience|None) -> EventPage:
+    event = EventPage(domain=url, url="/page")
+    event.resilience = resilience
+    event.handoff = Handoff()
+    event.handoff.pool = pool
+    return event
+
+
+def test_503_challenge_goes_to_browser(http_server, make_pool):
+    requests = []
+
+    async def challenge(request):
+        requests.append(request)
+        return web.Response(status=503, text=CHALLENGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", challenge)
+
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        async with http_server(app) as url:
+            event = make_event(url, pool, Resilience(retries=2, base_delay=0))
+            async with create_session() as session:
+                text = await event._schedule(
+                    lambda: event._fetch_text(session)
+                )
+
+        # страница проверки не повторяется через http и не ломает домен
+        assert "browser" in text[0]
+        assert len(requests) == 1
+        assert event.handoff.fallbacks == 1
+        assert not event.resilience.breaker(url).failures
+        assert event.handoff.cookies and event.handoff.user_agent
+        # у вкладки пула нет таймаута, его передает событие
+        assert pool.browsers[0].opened[0].options == {"timeout": 60000}
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_browser_text_has_default_timeout(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        handoff = Handoff(navigation_timeout=5)
+        handoff.pool = pool
+        await handoff.browser_text("http://a.ru/")
+        assert pool.browsers[0].opened[0].options == {"timeout": 5000}
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_status_is_checked_without_challenge(http_server):
+    async def error(request):
+        return web.Response(status=503, text="<p>down</p>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", error)
+
+    async def main():
+        async with http_server(app) as url:
+            event = EventPage(domain=url, url="/page")
+            event.resilience = Resilience(retries=0)
+            async with create_session() as session:
+                try:
+                    await event._fetch_text(session)
+                except Exception as exp:
+                    return exp
+
+    assert type(asyncio.run(main())).__name__ == "HTTPStatusError"
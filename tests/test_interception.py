@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from curcheck.errors import BrowserCrashError
+from curcheck.events import EventPage
+from curcheck.interception import InterceptionPolicy
+
+
+def make_event(policy: InterceptionPolicy) -> EventPage:
+    event = EventPage(domain="http://a.ru", url="/", is_browser=True)
+    event.interception = policy
+    return event
+
+
+def test_attach_and_detach(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        policy = InterceptionPolicy()
+        async with make_event(policy)._borrow_page(pool) as page:
+            assert page.intercepting and page.listeners["request"]
+        assert not page.intercepting and not page.listeners["request"]
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_crash_is_not_hidden_by_detach(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        event = make_event(InterceptionPolicy())
+
+        with pytest.raises(BrowserCrashError):
+            async with event._borrow_page(pool) as page:
+                page.browser.crash()
+                await page.work()
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failed_detach_replaces_page(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        policy = InterceptionPolicy()
+        async with make_event(policy)._borrow_page(pool) as page:
+            async def broken(enabled):
+                raise RuntimeError("CDP error")
+            page.setRequestInterception = broken
+
+        # вкладка с неснятым перехватом в пул не возвращается
+        assert page.closed
+        async with pool.page() as fresh:
+            assert fresh is not page and not fresh.intercepting
+        await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+import asyncio
+import socket
+
+import pytest
+
+from aiohttp import ClientSession, web
+
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.events import EventPage
+from curcheck.metrics import Histogram, MetricsMiddleware, PrometheusExporter
+from curcheck.middleware import CALLBACK, FETCH, PARSE, Middleware, run_stage
+
+
+class Recorder(Middleware):
+    def __init__(self, name: str, log: list) -> None:
+        self.name = name
+        self.log = log
+
+    async def before(self, stage):
+        self.log.append((self.name, "before", stage.name))
+
+    async def after(self, stage):
+        self.log.append((self.name, "after", stage.name, type(stage.error).__name__))
+
+
+class Event:
+    domain = "http://a.ru"
+    name = "func"
+
+
+def test_after_runs_in_reverse_even_on_error():
+    log = []
+    middlewares = [Recorder("outer", log), Recorder("inner", log)]
+
+    async def main():
+        with pytest.raises(ValueError):
+            async with run_stage(middlewares, Event(), PARSE):
+                raise ValueError("broken page")
+
+    asyncio.run(main())
+    assert log == [
+        ("outer", "before", PARSE),
+        ("inner", "before", PARSE),
+        ("inner", "after", PARSE, "ValueError"),
+        ("outer", "after", PARSE, "ValueError"),
+    ]
+
+
+def site() -> web.Application:
+    async def handle(request):
+        return web.Response(text="<h1>ok</h1>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", handle)
+    return app
+
+
+def test_dispatcher_middlewares_wrap_router_ones(http_server):
+    log = []
+
+    async def main():
+        async with http_server(site()) as url:
+            dispatcher = Dispatcher()
+            router = ExecuteRouter(url, debug=False)
+            router.include_middleware(Recorder("router", log))
+            dispatcher.include_middleware(Recorder("dispatcher", log))
+
+            @router.page("/page")
+            async def page(tree):
+                pass
+
+            dispatcher.include_router(router)
+            await dispatcher.start()
+
+    asyncio.run(main())
+    befores = [(name, stage) for name, kind, stage, *_ in log if kind == "before"]
+    assert befores == [
+        ("dispatcher", FETCH), ("router", FETCH),
+        ("dispatcher", PARSE), ("router", PARSE),
+        ("dispatcher", CALLBACK), ("router", CALLBACK),
+    ]
+
+
+def test_metrics_count_pages_bytes_and_errors(http_server):
+    metrics = MetricsMiddleware()
+
+    async def main():
+        async with http_server(site()) as url, ClientSession() as session:
+            event = EventPage(domain=url, url="/page")
+            event.middlewares = (metrics,)
+
+            @event
+            async def page(tree):
+                pass
+
+            broken_event = EventPage(domain=url, url="/page")
+            broken_event.middlewares = (metrics,)
+
+            async def fail(tree):
+                raise ValueError()
+
+            await page(session)
+            with pytest.raises(ValueError):
+                await broken_event(fail)(session)
+            return url
+
+    url = asyncio.run(main())
+    assert metrics.pages[url] == 2
+    assert metrics.bytes[url] == 2 * len("<h1>ok</h1>")
+    assert metrics.errors[(url, "fail", CALLBACK)] == 1
+    assert sum(metrics.in_flight.values()) == 0
+
+    stats = metrics.snapshot()["routers"][url]
+    assert stats["pages"] == 2 and stats["errors"] == 1
+
+    text = metrics.render()
+    assert f'curcheck_pages_total{{router="{url}"}} 2' in text
+    assert (
+        f'curcheck_stage_errors_total{{router="{url}",event="fail",stage="callback"}} 1'
+        in text
+    )
+    assert f'curcheck_stage_seconds_count{{router="{url}",event="page",stage="fetch"}} 1' in text
+
+
+def test_histogram_buckets_and_quantile():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.05, 0.5, 5):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    assert histogram.quantile(1) == float("inf")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_prometheus_exporter_serves_metrics():
+    async def main():
+        port = free_port()
+        metrics = MetricsMiddleware(exporter=PrometheusExporter(port=port))
+        await metrics.start(dispatcher=None)
+        try:
+            async with ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    return response.status, await response.text()
+        finally:
+            await metrics.close()
+
+    status, text = asyncio.run(main())
+    assert status == 200
+    assert "# TYPE curcheck_pages_total counter" in text
+    assert "curcheck_tabs 0" in text
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from curcheck.errors import ConfigurationError
+from curcheck.parser import Parser
+from curcheck.schema import Field, Schema
+
+
+PAGE = "<html><body><h1>Заголовок</h1><p>1</p><p>2</p></body></html>"
+
+
+# для режима process обработчик ищется по имени в модуле
+def titles(tree, suffix=""):
+    return {
+        "title": tree.xpath("//h1/text()")[0] + suffix,
+        "pid": os.getpid(),
+        "thread": threading.get_ident(),
+    }
+
+
+def paragraphs(tree):
+    for p in tree.xpath("//p/text()"):
+        yield p
+
+
+def run(parser: Parser, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            parser.close()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("mode", Parser.MODES)
+def test_extract_in_every_mode(mode):
+    parser = Parser(mode=mode, workers=1)
+    result = run(parser, parser.extract(titles, PAGE, suffix="!"))
+
+    assert result["title"] == "Заголовок!"
+    assert (result["pid"] == os.getpid()) == (mode != "process")
+    if mode != "process":
+        assert (result["thread"] == threading.get_ident()) == (mode == "inline")
+
+
+@pytest.mark.parametrize("mode", Parser.MODES)
+def test_generator_results_are_collected(mode):
+    parser = Parser(mode=mode, workers=1)
+    assert run(parser, parser.extract(paragraphs, PAGE)) == ["1", "2"]
+
+
+@pytest.mark.parametrize("mode", Parser.MODES)
+def test_parse_and_schema(mode):
+    parser = Parser(mode=mode, workers=1)
+    schema = Schema(items="//p", n=Field("text()", type=int))
+
+    async def both():
+        tree = await parser.parse(PAGE)
+        return tree.xpath("//h1/text()"), await parser.extract_schema(schema, PAGE)
+
+    title, records = run(parser, both())
+    assert title == ["Заголовок"]
+    assert records == [{"n": 1}, {"n": 2}]
+
+
+def test_unknown_mode():
+    with pytest.raises(ConfigurationError):
+        Parser(mode="gpu")
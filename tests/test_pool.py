@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from curcheck.errors import BrowserCrashError
+
+
+def test_page_is_reused_and_worn_out(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1, max_page_uses=2)
+        first = await pool.checkout()
+        await pool.checkin(first)
+        again = await pool.checkout()
+        assert again is first
+        await pool.checkin(again)
+
+        # после max_page_uses вкладка заменяется новой
+        fresh = await pool.checkout()
+        assert fresh is not first and first.closed
+        await pool.checkin(fresh)
+        assert pool.idle == 1
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_lazy_start(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=2, pages_per_browser=3)
+        assert not pool.started and pool.size == 0
+        async with pool.page():
+            assert pool.started and pool.size == 6
+        assert pool.idle == 6
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_cookies_primed_once_per_browser(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=2)
+        cookies = [{"name": "a", "value": "1"}]
+        async with pool.page("site", cookies) as first:
+            pass
+        async with pool.page("site", cookies) as second:
+            pass
+        assert first is not second
+        assert len(first.set_cookies) + len(second.set_cookies) == 1
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failed_set_cookie_keeps_slot(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        await pool.start()
+        page = pool._idle.get_nowait()
+        page.fail_cookies = True
+        pool._idle.put_nowait(page)
+
+        with pytest.raises(RuntimeError):
+            await pool.checkout("site", [{"name": "a", "value": "1"}])
+        assert pool.idle == 1
+        assert pool.states[pool.browsers[0]].busy == 0
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failed_replacement_page_is_reopened(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        page = await pool.checkout()
+        page.browser.fail_new_pages = 1
+        await pool.checkin(page, discard=True)
+
+        # место вкладки восстанавливается в фоне
+        replacement = await asyncio.wait_for(pool.checkout(), 1)
+        assert replacement is not page
+        await pool.checkin(replacement)
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_late_checkin_after_close(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        page = await pool.checkout()
+        await pool.close()
+        await pool.checkin(page)
+
+    asyncio.run(main())
+
+
+def test_crash_replays_with_new_browser(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=2)
+
+        async def job():
+            for _ in range(3):
+                try:
+                    async with pool.page() as page:
+                        await page.work()
+                        return page.browser
+                except BrowserCrashError:
+                    continue
+
+        await pool.start()
+        crashed = pool.browsers[0]
+        tasks = [asyncio.ensure_future(job()) for _ in range(4)]
+        await asyncio.sleep(0)
+        crashed.crash()
+
+        browsers = await asyncio.gather(*tasks)
+        assert crashed not in browsers
+        assert pool.relaunches == 1
+        assert pool.browsers and crashed not in pool.browsers
+        assert pool.idle == 2
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_recycle_drains_busy_pages(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        page = await pool.checkout()
+        old = page.browser
+
+        recycle = asyncio.ensure_future(pool.recycle(old, drain_timeout=1))
+        await asyncio.sleep(0.01)
+        # замена уже работает, старый браузер ждет свою вкладку
+        assert old.alive and old not in pool.browsers
+        assert pool.idle == 1
+
+        await pool.checkin(page)
+        await recycle
+        assert not old.alive and pool.recycles == 1
+        await pool.close()
+
+    asyncio.run(main())
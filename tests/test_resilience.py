@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from aiohttp import ClientError
+
+from curcheck.errors import BrowserCrashError, CircuitOpenError
+from curcheck.resilience import CircuitBreaker, Resilience
+
+
+def test_breaker_transitions():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+    # после reset_timeout пропускается ровно один пробный запрос
+    breaker.opened_at -= 0.05
+    probe = breaker.allow()
+    assert probe
+    assert not breaker.allow()
+
+    # неудачная проба закрывает домен снова, удачная - открывает
+    breaker.record_failure(probe)
+    assert breaker.is_open and not breaker.allow()
+    breaker.opened_at -= 0.05
+    probe = breaker.allow()
+    assert probe
+    breaker.record_success(probe)
+    assert not breaker.is_open and breaker.failures == 0 and breaker.allow()
+
+
+def test_other_requests_do_not_end_probe():
+    async def main():
+        resilience = make_resilience()
+        breaker = resilience.breaker("http://a.ru/")
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.05)
+            raise ValueError()
+
+        async def probe():
+            return "ok"
+
+        # обычный запрос начат до того, как домен закрылся
+        request = asyncio.ensure_future(resilience.call("http://a.ru/", slow))
+        await started.wait()
+        breaker.record_failure()
+        ticket = breaker.allow()
+        assert ticket
+
+        await asyncio.gather(request, return_exceptions=True)
+        # его конец пробу не снимает: второй пробы нет
+        assert not breaker.allow()
+        breaker.release(ticket)
+        assert await resilience.call("http://a.ru/", probe) == "ok"
+
+    asyncio.run(main())
+
+
+def test_timeout_has_total_deadline():
+    timeout = Resilience(total_timeout=5).timeout
+    assert timeout.total == 5 and timeout.sock_read == 30
+
+
+def make_resilience(**kwargs) -> Resilience:
+    return Resilience(retries=0, base_delay=0, failure_threshold=1, reset_timeout=0, **kwargs)
+
+
+def test_retries_then_success():
+    async def main():
+        resilience = Resilience(retries=2, base_delay=0)
+        calls = []
+
+        async def func():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ClientError()
+            return "ok"
+
+        assert await resilience.call("http://a.ru/", func) == "ok"
+        assert len(calls) == 3
+        assert not resilience.breaker("http://a.ru/").is_open
+
+    asyncio.run(main())
+
+
+def test_open_breaker_rejects():
+    async def main():
+        resilience = Resilience(retries=0, failure_threshold=1, reset_timeout=60)
+
+        async def fail():
+            raise ClientError()
+
+        with pytest.raises(ClientError):
+            await resilience.call("http://a.ru/", fail)
+        with pytest.raises(CircuitOpenError):
+            await resilience.call("http://a.ru/", fail)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("error", [ValueError, BrowserCrashError])
+def test_probe_without_outcome_is_released(error):
+    async def main():
+        resilience = make_resilience()
+        breaker = resilience.breaker("http://a.ru/")
+        breaker.record_failure()
+        assert breaker.is_open
+
+        async def probe():
+            raise error()
+
+        with pytest.raises(error):
+            await resilience.call("http://a.ru/", probe)
+        assert breaker.allow()
+
+    asyncio.run(main())
+
+
+def test_cancelled_probe_is_released():
+    async def main():
+        resilience = make_resilience()
+        breaker = resilience.breaker("http://a.ru/")
+        breaker.record_failure()
+
+        async def probe():
+            await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(resilience.call("http://a.ru/", probe))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert breaker.allow()
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from curcheck.cookies import CookieStore
+from curcheck.router import ExecuteRouter
+
+
+async def fail(name: str):
+    raise ValueError(name)
+
+
+async def work(done: list):
+    await asyncio.sleep(0.01)
+    done.append(1)
+
+
+def test_gather_logs_errors_in_debug():
+    async def main():
+        router = ExecuteRouter("http://a.ru", debug=True)
+        done = []
+        await router._gather(fail("a"), work(done))
+        assert done == [1]
+
+    asyncio.run(main())
+
+
+def test_gather_raises_without_debug():
+    async def main():
+        router = ExecuteRouter("http://a.ru", debug=False)
+        done = []
+        with pytest.raises(ValueError, match="a"):
+            await router._gather(fail("a"), work(done), fail("b"))
+        # остальные события успевают закончиться
+        assert done == [1]
+
+    asyncio.run(main())
+
+
+def test_expired_cookies_relogin_between_polls(tmp_path, make_pool):
+    logins = []
+
+    async def main():
+        router = ExecuteRouter("http://a.ru", is_spa=True, is_login=True, debug=False)
+        router.cookie_store = CookieStore(str(tmp_path), refresh_margin=0)
+        old = [{"name": "s", "value": "old", "expires": time.time() + 0.15}]
+        router.cookie_store._cookies[("http://a.ru", "default")] = (old, time.time())
+
+        async def login():
+            logins.append(1)
+            return [{"name": "s", "value": "new", "expires": time.time() + 3600}]
+
+        router._login = login
+
+        @router.longpoll("/feed", timeout=0.3, count=2)
+        async def feed(page):
+            pass
+
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        await router.deploy_executor(pool=pool)
+        page = pool.browsers[0].opened[0]
+        await pool.close()
+        return [cookie["value"] for cookie in page.set_cookies]
+
+    # первая проверка со старыми куки, перед второй - новый вход
+    assert asyncio.run(main()) == ["old", "new"]
+    assert logins == [1]
@@ -0,0 +1,138 @@
+import asyncio
+
+from curcheck import scheduler as scheduler_module
+from curcheck.scheduler import LongpollScheduler
+
+
+def test_jobs_fire_in_time_order():
+    log = []
+
+    async def main():
+        scheduler = LongpollScheduler(jitter=0)
+
+        def poll(name):
+            async def poll():
+                log.append(name)
+            return poll
+
+        try:
+            await asyncio.gather(
+                scheduler.run(0.07, poll("slow"), count=2, name="slow"),
+                scheduler.run(0.03, poll("fast"), count=4, name="fast"),
+            )
+        finally:
+            await scheduler.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    # оба сразу, дальше fast в 0.03/0.06/0.09, slow в 0.07
+    assert log[:2] == ["slow", "fast"]
+    assert log[2:] == ["fast", "fast", "slow", "fast"]
+
+
+def test_fixed_rate_and_overruns():
+    async def main():
+        scheduler = LongpollScheduler(jitter=0)
+        loop = asyncio.get_event_loop()
+        started = []
+        jobs = []
+
+        async def poll():
+            started.append(loop.time())
+            jobs.append(scheduler.jobs[0])
+            # первая проверка дольше интервала: запуск в 0.05 пропускается
+            await asyncio.sleep(0.07 if len(started) == 1 else 0)
+
+        try:
+            await scheduler.run(0.05, poll, count=3)
+        finally:
+            await scheduler.close()
+        return started, jobs[0]
+
+    started, job = asyncio.run(asyncio.wait_for(main(), 5))
+    # запуски по сетке 0.05 от первого, пропущенный не догоняется
+    assert len(started) == 3 and job.overruns == 1
+    assert 0.09 < started[1] - started[0] < 0.14
+    assert 0.04 < started[2] - started[1] < 0.09
+
+
+def test_jitter_spreads_runs(monkeypatch):
+    spreads = []
+
+    def uniform(low, high):
+        spreads.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(scheduler_module.random, "uniform", uniform)
+
+    async def main():
+        scheduler = LongpollScheduler(jitter=0.2)
+
+        async def poll():
+            pass
+
+        try:
+            await scheduler.run(0.05, poll, count=2)
+        finally:
+            await scheduler.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    # первый сдвиг только вперед, дальше в обе стороны на 20% интервала
+    assert spreads[0] == (0, 0.2 * 0.05)
+    assert spreads[1] == (-0.2 * 0.05, 0.2 * 0.05)
+
+
+def test_failed_poll_does_not_stop_longpoll():
+    calls = []
+
+    async def main():
+        scheduler = LongpollScheduler(jitter=0)
+
+        async def poll():
+            calls.append(1)
+            raise ValueError("page is down")
+
+        try:
+            await scheduler.run(0.01, poll, count=3)
+        finally:
+            await scheduler.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert len(calls) == 3
+
+
+def test_concurrency_limit():
+    async def main():
+        scheduler = LongpollScheduler(jitter=0, concurrency=2)
+        running = []
+        peak = []
+
+        async def poll():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+
+        try:
+            await asyncio.gather(*[scheduler.run(1, poll, count=1) for _ in range(5)])
+        finally:
+            await scheduler.close()
+        return max(peak)
+
+    assert asyncio.run(asyncio.wait_for(main(), 5)) == 2
+
+
+def test_adaptive_interval():
+    scheduler = LongpollScheduler(adaptive=True, min_factor=0.25, max_factor=4, backoff=2)
+
+    class Job:
+        base_interval = interval = 10
+
+    job = Job()
+    scheduler._adapt(job, changed=False)
+    assert job.interval == 20
+    for _ in range(5):
+        scheduler._adapt(job, changed=False)
+    assert job.interval == 40
+    for _ in range(5):
+        scheduler._adapt(job, changed=True)
+    assert job.interval == 2.5
@@ -0,0 +1,130 @@
+import pickle
+import sys
+
+import pytest
+
+from lxml import html
+
+from curcheck.errors import ConfigurationError
+from curcheck.schema import Field, Schema, _number
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("$1,299.90", 1299.9),
+    ("1\u00a0299,90 ₽", 1299.9),
+    ("1\u202f299 ₽", 1299),
+    ("1.299,90", 1299.9),
+    ("1,299,000", 1299000),
+    ("1'299", 1299),
+    ("12,5", 12.5),
+    ("-3.25", -3.25),
+    ("−7", -7),
+    ("4.5 из 5", 4.5),
+    ("7 шт", 7),
+    ("0.125", 0.125),
+    ("0,250 кг", 0.25),
+    ("-0,5", -0.5),
+    ("2.000", 2),
+    ("1,000 л", 1),
+])
+def test_number(value, expected):
+    assert _number(value, float) == expected
+
+
+@pytest.mark.parametrize("value", ["100 200", "1,299", "1.299", "1,2,3", "нет"])
+def test_ambiguous_number_raises(value):
+    with pytest.raises(ValueError):
+        _number(value, float)
+
+
+def test_number_with_explicit_separators():
+    assert _number("1,299", int, thousands=",") == 1299
+    assert _number("2.000", int, thousands=".") == 2000
+    assert _number("1.299", float, decimal=".") == 1.299
+    assert _number("1 299,90", float, decimal=",", thousands=" ") == 1299.9
+
+
+def test_ambiguous_field_falls_back_to_default():
+    field = Field(".//i", type=float, default=0.0)
+    assert field.coerce("1,299") == 0.0
+    assert Field(".//i", type=float, thousands=",").coerce("1,299") == 1299
+
+
+CATALOG = html.fromstring("""
+<div>
+    <h1>Каталог</h1>
+    <div class="product" data-id="1">
+        <h2>Чайник</h2><span class="price">$1,299.90</span>
+        <a class="tag">кухня</a><a class="tag">дом</a>
+    </div>
+    <div class="product" data-id="2">
+        <h2>Кружка</h2><span class="price">нет в наличии</span>
+    </div>
+</div>
+""")
+
+
+def test_xpath_and_css_records():
+    schema = Schema(
+        items_css="div.product",
+        id=Field(xpath="./@data-id", type=int),
+        title=Field(".//h2"),
+        price=Field(css=".price", type=float, default=-1.0),
+        tags=Field(css="a.tag", many=True),
+    )
+    assert schema.extract(CATALOG) == [
+        {"id": 1, "title": "Чайник", "price": 1299.9, "tags": ["кухня", "дом"]},
+        {"id": 2, "title": "Кружка", "price": -1.0, "tags": []},
+    ]
+
+
+def test_nested_schema_and_record_class():
+    class Page:
+        def __init__(self, title, products):
+            self.title = title
+            self.products = products
+
+    schema = Schema(
+        record=Page,
+        title=Field("//h1"),
+        products=Field(
+            "//div[@class='product']",
+            many=True,
+            schema=Schema(name=Field(css="h2")),
+        ),
+    )
+    page = schema.extract(CATALOG)
+    assert page.title == "Каталог"
+    assert page.products == [{"name": "Чайник"}, {"name": "Кружка"}]
+
+
+def test_schema_survives_pickling():
+    schema = Schema(items="//div[@class='product']", title=Field(css="h2"))
+    schema.extract(CATALOG)
+    copy = pickle.loads(pickle.dumps(schema))
+    assert copy.extract(CATALOG) == [{"title": "Чайник"}, {"title": "Кружка"}]
+
+
+def test_browser_spec_matches_fields():
+    schema = Schema(items_css="div.product", price=Field(css=".price", attr="title"))
+    assert schema.spec == {
+        "items": ["css", "div.product"],
+        "fields": [["price", "css", ".price", "title", None]],
+    }
+
+
+def test_css_without_cssselect_fails_on_build(monkeypatch):
+    monkeypatch.setitem(sys.modules, "cssselect", None)
+    with pytest.raises(ConfigurationError):
+        Schema(price=Field(css=".price"))
+    with pytest.raises(ConfigurationError):
+        Schema(items_css="div.product")
+    # xpath работает и без cssselect
+    Schema(price=Field("//span"))
+
+
+def test_field_needs_one_selector():
+    with pytest.raises(ConfigurationError):
+        Field()
+    with pytest.raises(ConfigurationError):
+        Field("//a", css="a")
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from curcheck.events import EventPage
+from curcheck.serving import SingleFlight, TTLCache, WarmTabs, call_key
+
+
+def make_warm(count: int = 1, refresh=None) -> WarmTabs:
+    event = EventPage(domain="http://a.ru", url="/", is_browser=True)
+    return WarmTabs(event, count=count, refresh=refresh)
+
+
+def fail_once(pool):
+    """ Следующий open_page пула упадет """
+    open_page = pool.open_page
+
+    async def broken(*args, **kwargs):
+        pool.open_page = open_page
+        raise RuntimeError("newPage failed")
+
+    pool.open_page = broken
+
+
+def test_warm_tabs_stay_outside_pool(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        warm = make_warm(count=2)
+        await warm.start(pool)
+        # пул не уменьшился, даже если прогретых вкладок больше его самого
+        assert pool.idle == 1
+        async with pool.page():
+            pass
+        async with warm.page() as page:
+            assert pool.healthy(page)
+        await warm.close()
+        assert all(page.closed for page in pool.browsers[0].opened[1:])
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failed_start_closes_opened_tabs(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        warm = make_warm(count=2)
+        await pool.start()
+        open_page = pool.open_page
+
+        async def first_succeeds(*args, **kwargs):
+            page = await open_page(*args, **kwargs)
+            fail_once(pool)
+            return page
+
+        pool.open_page = first_succeeds
+        with pytest.raises(RuntimeError):
+            await warm.start(pool)
+        assert not warm.started and warm._pages == []
+        assert not pool._dedicated
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failed_replace_keeps_stale_tab(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        warm = make_warm(count=1)
+        await warm.start(pool)
+        stale = warm._pages[0]
+        stale.browser.crash()
+        await asyncio.sleep(0.01)
+
+        fail_once(pool)
+        with pytest.raises(RuntimeError):
+            async with warm.page():
+                pass
+        assert warm._pages == [stale]
+
+        # следующий вызов заменяет вкладку, место не потерялось
+        async with warm.page() as page:
+            assert page is not stale and pool.healthy(page)
+        assert warm._pages == [page]
+        await warm.close()
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_refresher_survives_failed_replace(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        warm = make_warm(count=1, refresh=0.01)
+        await warm.start(pool)
+        warm._pages[0].browser.crash()
+        fail_once(pool)
+        await asyncio.sleep(0.05)
+        assert not warm._refresher.done()
+        assert pool.healthy(warm._pages[0])
+        await warm.close()
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_recycle_does_not_wait_for_warm_tabs(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        warm = make_warm(count=1)
+        await warm.start(pool)
+        old = pool.browsers[0]
+
+        await asyncio.wait_for(pool.recycle(old, drain_timeout=None), 1)
+        assert not old.alive
+        async with warm.page() as page:
+            assert page.browser is not old
+        await warm.close()
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_call_key_includes_event():
+    def func(x):
+        pass
+
+    first = EventPage(domain="http://a.ru", url="/a")
+    second = EventPage(domain="http://a.ru", url="/b")
+    assert call_key(first, func, (1,), {}) != call_key(second, func, (1,), {})
+    assert call_key(first, func, (1,), {}) == call_key(first, func, (1,), {})
+    assert call_key(first, func, ([1],), {}) is None
+
+
+def test_ttl_cache_and_single_flight():
+    async def main():
+        cache = TTLCache(ttl=60, max_size=1)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == (False, None)
+        assert cache.get("b") == (True, 2)
+
+        flights = SingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*[flights.do("k", func) for _ in range(3)])
+        assert results == ["ok"] * 3 and len(calls) == 1
+
+    asyncio.run(main())
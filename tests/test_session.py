@@ -0,0 +1,58 @@
+import asyncio
+
+from aiohttp import web
+
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.session import create_session
+
+
+def test_mpa_routers_share_one_session(http_server):
+    peers = set()
+
+    async def handle(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.Response(text="<h1>ok</h1>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handle)
+    sessions = []
+
+    async def main():
+        async with http_server(app) as url:
+            dispatcher = Dispatcher(connections_limit=1)
+            for name in ("a", "b", "c"):
+                router = ExecuteRouter(url, debug=False)
+
+                @router.page(f"/{name}")
+                async def page(tree, router=router):
+                    sessions.append(router.session)
+
+                dispatcher.include_router(router)
+
+            await dispatcher.start()
+            return dispatcher
+
+    dispatcher = asyncio.run(main())
+    # одна сессия на все роутеры, а с лимитом в одно соединение
+    # все запросы идут через одно keep-alive соединение
+    assert len(sessions) == 3 and len(set(map(id, sessions))) == 1
+    assert len(peers) == 1
+    # диспетчер закрывает сессию после исполнения
+    assert sessions[0].closed and dispatcher.session is None
+
+
+def test_create_session_options():
+    async def main():
+        session = create_session(limit=5, limit_per_host=2, compress=False)
+        try:
+            assert session.connector.limit == 5
+            assert session.connector.limit_per_host == 2
+            assert session.headers["Accept-Encoding"] == "identity"
+        finally:
+            await session.close()
+
+        session = create_session()
+        assert "gzip" in session.headers["Accept-Encoding"]
+        await session.close()
+
+    asyncio.run(main())
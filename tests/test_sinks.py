@@ -0,0 +1,119 @@
+import asyncio
+import json
+import sqlite3
+
+from curcheck.sinks import CallbackSink, JSONLSink, ResultPipeline, SQLiteSink
+
+
+def make_callback(batches: list, fail: bool = False) -> CallbackSink:
+    async def write(items):
+        if fail:
+            raise RuntimeError("sink is down")
+        batches.append(list(items))
+    return CallbackSink(write)
+
+
+def test_results_are_written_in_batches():
+    batches = []
+
+    async def main():
+        pipeline = ResultPipeline([make_callback(batches)], batch_size=3, flush_interval=0.05)
+        await pipeline.open()
+        for i in range(7):
+            await pipeline.put({"i": i})
+        await pipeline.close()
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [item["i"] for batch in batches for item in batch] == list(range(7))
+    assert pipeline.written == 7 and pipeline.failed == 0
+
+
+def test_partial_batch_is_flushed_by_interval():
+    batches = []
+
+    async def main():
+        pipeline = ResultPipeline([make_callback(batches)], batch_size=100, flush_interval=0.02)
+        await pipeline.open()
+        await pipeline.put({"i": 1})
+        await asyncio.sleep(0.1)
+        # пачка ушла до закрытия конвейера
+        assert batches == [[{"i": 1}]]
+        await pipeline.close()
+
+    asyncio.run(main())
+
+
+def test_failed_sink_does_not_stop_others():
+    batches = []
+
+    async def main():
+        pipeline = ResultPipeline(
+            [make_callback([], fail=True), make_callback(batches)], 
+            batch_size=2, flush_interval=0.05,
+        )
+        await pipeline.open()
+        for i in range(4):
+            await pipeline.put(i)
+        await pipeline.close()
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert batches == [[0, 1], [2, 3]]
+    assert pipeline.written == 4 and pipeline.failed == 4
+
+
+def test_failed_writes_are_not_counted_as_written():
+    async def main():
+        pipeline = ResultPipeline([make_callback([], fail=True)], flush_interval=0.05)
+        await pipeline.open()
+        await pipeline.put(1)
+        await pipeline.close()
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert pipeline.written == 0 and pipeline.failed == 1
+
+
+def test_full_queue_makes_put_wait():
+    async def main():
+        opened = asyncio.Event()
+
+        async def write(items):
+            await opened.wait()
+
+        pipeline = ResultPipeline(
+            [CallbackSink(write)], batch_size=1, flush_interval=0.05, maxsize=1
+        )
+        await pipeline.open()
+        await pipeline.put(1) # уходит в приемник и ждет его
+        await pipeline.put(2) # занимает очередь
+        blocked = asyncio.ensure_future(pipeline.put(3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        opened.set()
+        await blocked
+        await pipeline.close()
+        assert pipeline.written == 3
+
+    asyncio.run(main())
+
+
+def test_file_sinks(tmp_path):
+    async def main():
+        pipeline = ResultPipeline([
+            JSONLSink(str(tmp_path / "out.jsonl")),
+            SQLiteSink(str(tmp_path / "out.db")),
+        ], flush_interval=0.05)
+        await pipeline.open()
+        for i in range(3):
+            await pipeline.put({"i": i, "name": f"товар {i}"})
+        await pipeline.close()
+
+    asyncio.run(main())
+    lines = (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["товар 0", "товар 1", "товар 2"]
+    with sqlite3.connect(tmp_path / "out.db") as connection:
+        assert connection.execute("SELECT count(*) FROM results").fetchone() == (3,)
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.errors import ConfigurationError
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_SCRIPT = """
+import sys
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.pool import PagePool
+print("pyppeteer" in sys.modules)
+"""
+
+
+def test_import_does_not_load_pyppeteer():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.strip() == "False"
+
+
+def test_spa_router_without_pyppeteer(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyppeteer", None)
+    with pytest.raises(ConfigurationError):
+        Dispatcher().include_router(ExecuteRouter("http://a.ru", is_spa=True))
+    # mpa-роутеру pyppeteer не нужен
+    Dispatcher().include_router(ExecuteRouter("http://a.ru"))
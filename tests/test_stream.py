@@ -0,0 +1,59 @@
+import asyncio
+
+from aiohttp import web
+
+from curcheck.session import create_session
+from curcheck.stream import stream_tree
+
+
+HEAD = "<html><body><h1>Каталог</h1><div id='items'>"
+ITEMS = "".join(f"<p>{i}</p>" for i in range(2000))
+
+
+def make_app(finished: list) -> web.Application:
+    async def slow(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        await response.write(HEAD.encode())
+        # остаток страницы идет долго: с stop_xpath его не ждут
+        await asyncio.sleep(0.5)
+        await response.write((ITEMS + "</div></body></html>").encode())
+        finished.append(1)
+        return response
+
+    async def full(request):
+        return web.Response(
+            text=HEAD + ITEMS + "</div></body></html>", content_type="text/html"
+        )
+
+    app = web.Application()
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/full", full)
+    return app
+
+
+def test_stream_stops_at_xpath(http_server):
+    finished = []
+
+    async def main():
+        async with http_server(make_app(finished)) as url, create_session() as session:
+            loop = asyncio.get_event_loop()
+            started = loop.time()
+            async with session.get(url + "/slow") as response:
+                tree = await stream_tree(response, stop_xpath="//h1")
+            return tree, loop.time() - started
+
+    tree, elapsed = asyncio.run(main())
+    assert tree.xpath("//h1/text()") == ["Каталог"]
+    assert elapsed < 0.4 and not finished
+
+
+def test_stream_without_stop_reads_whole_page(http_server):
+    async def main():
+        async with http_server(make_app([])) as url, create_session() as session:
+            async with session.get(url + "/full") as response:
+                return await stream_tree(response, chunk_size=1024)
+
+    tree = asyncio.run(main())
+    assert len(tree.xpath("//div[@id='items']/p")) == 2000
+    assert tree.xpath("//h1/text()") == ["Каталог"]
@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+from aiohttp import web
+
+from curcheck import Dispatcher, ExecuteRouter
+from curcheck.sinks import CallbackSink
+
+
+def test_worker_results_reach_parent_sinks(http_server):
+    async def handle(request):
+        return web.Response(text="<h1>ok</h1>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handle)
+    written = []
+
+    async def collect(items):
+        written.extend(items)
+
+    async def main():
+        async with http_server(app) as url:
+            dispatcher = Dispatcher()
+            for name in ("a", "b"):
+                router = ExecuteRouter(
+                    url, debug=False, sinks=[CallbackSink(collect)], flush_interval=0.05
+                )
+
+                @router.page(f"/{name}")
+                async def page(tree, name=name):
+                    return {"name": name, "pid": os.getpid()}
+
+                dispatcher.include_router(router)
+
+            await asyncio.wait_for(dispatcher.start(workers=2), 30)
+            return dispatcher.supervisor
+
+    supervisor = asyncio.run(main())
+    # результаты пришли из двух воркеров и записаны родителем
+    assert sorted(item["name"] for item in written) == ["a", "b"]
+    assert os.getpid() not in {item["pid"] for item in written}
+    assert supervisor.done == {0, 1}
+
+
+def test_unpicklable_routers_fall_back_to_one_process(http_server):
+    async def handle(request):
+        return web.Response(text="<h1>ok</h1>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/a", handle)
+    pids = []
+
+    async def main():
+        async with http_server(app) as url:
+            dispatcher = Dispatcher()
+            router = ExecuteRouter(url, debug=False)
+
+            # замыкание не сериализуется pickle, spawn его не передаст
+            @router.page("/a")
+            async def page(tree):
+                pids.append(os.getpid())
+
+            dispatcher.include_router(router)
+            await asyncio.wait_for(
+                dispatcher.start(workers=2, start_method="spawn"), 30
+            )
+            return dispatcher.supervisor
+
+    assert asyncio.run(main()) is None
+    assert pids == [os.getpid()]
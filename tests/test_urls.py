@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from aiohttp import web
+
+from curcheck.events import EventPaginator
+from curcheck.seen import HashSeenSet
+from curcheck.session import create_session
+from curcheck.urls import build_link, canonicalize
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://A.ru:80", "http://a.ru/"),
+    ("https://a.ru:443/p#top", "https://a.ru/p"),
+    ("http://a.ru:8080/p", "http://a.ru:8080/p"),
+    ("http://[::1]:8080/p", "http://[::1]:8080/p"),
+    ("http://[2001:DB8::1]/", "http://[2001:db8::1]/"),
+    ("http://a.ru/p?flag", "http://a.ru/p?flag"),
+    ("http://a.ru/p?b=1&a=2", "http://a.ru/p?a=2&b=1"),
+    # значения не перекодируются, повторы сохраняют порядок
+    ("http://a.ru/p?q=a%2Fb&s=%20", "http://a.ru/p?q=a%2Fb&s=%20"),
+    ("http://a.ru/p?a=2&b=0&a=1", "http://a.ru/p?a=2&a=1&b=0"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_canonicalize_keeps_distinct_pages_apart():
+    assert canonicalize("http://a.ru/?flag") != canonicalize("http://a.ru/?flag=")
+    assert canonicalize("http://a.ru/?a=1&a=2") != canonicalize("http://a.ru/?a=2&a=1")
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("/p", "http://a.ru/p"),
+    ("p", "http://a.ru/p"),
+    ("?page=2", "http://a.ru?page=2"),
+    ("//b.ru/p", "http://b.ru/p"),
+    ("https://b.ru/p", "https://b.ru/p"),
+])
+def test_build_link(url, expected):
+    assert build_link("http://a.ru", url) == expected
+
+
+def test_paginator_links_and_reruns(http_server):
+    requested = []
+
+    async def listing(request):
+        body = '<a href="item?id=1#x">1</a><a href="/top?b=1&a=2">2</a><a href="item?id=1">1</a>'
+        return web.Response(text=body, content_type="text/html")
+
+    async def item(request):
+        requested.append(str(request.rel_url))
+        return web.Response(text="<p>ok</p>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/dir/list", listing)
+    app.router.add_get("/dir/item", item)
+    app.router.add_get("/top", item)
+
+    async def main():
+        async with http_server(app) as url:
+            paginator = EventPaginator(
+                domain=url, url="/dir/list", pages_links_xpath="//a/@href"
+            )
+            paginator.seen = HashSeenSet() # общее множество диспетчера
+
+            async def page(tree):
+                pass
+
+            task = paginator(page)
+            async with create_session() as session:
+                await task(session)
+                # повторный запуск снова обходит свои страницы
+                await task(session)
+
+    asyncio.run(main())
+    # ссылка со страницы - относительно нее, а качается исходный вид
+    assert sorted(requested) == sorted(["/dir/item?id=1", "/top?b=1&a=2"] * 2)
+
+
+def test_shared_seen_skips_other_events_links():
+    shared = HashSeenSet()
+    first = EventPaginator(domain="http://a.ru", paginate_urls=["/1"])
+    second = EventPaginator(domain="http://a.ru", paginate_urls=["/1"])
+    first.seen = second.seen = shared
+
+    assert first._first_visit(HashSeenSet(), "http://a.ru/1")
+    assert not second._first_visit(HashSeenSet(), "http://a.ru/1")
+    assert first._first_visit(HashSeenSet(), "http://a.ru/1")
+
+
+def test_spa_paginator_opens_built_link(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=2)
+        paginator = EventPaginator(
+            domain="http://a.ru", url="dir/list", 
+            pages_links_xpath="//a/@href", is_browser=True,
+        )
+        await pool.start()
+        browser = pool.browsers[0]
+        browser.hrefs = ["item?id=1"]
+        links = await paginator._spa_links(pool)
+        await pool.close()
+        return browser.opened[0].link, links
+
+    link, links = asyncio.run(main())
+    assert link == "http://a.ru/dir/list"
+    assert links == ["http://a.ru/dir/item?id=1"]
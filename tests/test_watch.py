@@ -0,0 +1,91 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from lxml import html
+
+from curcheck.watch import WATCH_DIFF_JS, Watch
+
+
+def page(*items) -> html.HtmlElement:
+    rows = "".join(
+        f'<li><b>{key}</b><i>{price}</i></li>' for key, price in items
+    )
+    return html.fromstring(f"<ul>{rows}</ul>")
+
+
+def make_watch(**kwargs) -> Watch:
+    return Watch("//li", "b", fields={"price": "i"}, **kwargs)
+
+
+def test_diff_between_polls():
+    watch = make_watch()
+    first = watch.diff(page(("a", 1), ("constructor", 2)))
+    assert [item["key"] for item in first.added] == ["a", "constructor"]
+
+    second = watch.diff(page(("constructor", 3), ("b", 1)))
+    assert [item["key"] for item in second.added] == ["b"]
+    assert second.modified == [{"key": "constructor", "price": "3"}]
+    assert second.removed == ["a"]
+    assert not watch.diff(page(("constructor", 3), ("b", 1)))
+
+
+def test_baseline_without_initial():
+    watch = make_watch(initial=False)
+    assert not watch.diff(page(("a", 1)))
+    assert watch.diff(page(("a", 2))).modified
+
+
+def test_unchanged_before_first_parse_keeps_baseline_pending():
+    watch = make_watch(initial=False)
+    # неизменная страница до первого разбора не заменяет запоминание
+    assert not watch.unchanged()
+    assert not watch.polled
+    assert not watch.diff(page(("a", 1)))
+    assert watch.polled and watch.fingerprints
+
+
+SHIM = """
+const XPathResult = {STRING_TYPE: 2, ORDERED_NODE_SNAPSHOT_TYPE: 7};
+const items = %s;
+const document = {
+    evaluate(xpath, node, resolver, type) {
+        if (type === XPathResult.ORDERED_NODE_SNAPSHOT_TYPE) {
+            return {snapshotLength: items.length, snapshotItem: (i) => items[i]};
+        }
+        return {stringValue: String(node[xpath])};
+    },
+};
+const diff = %s;
+// аргументы приходят через CDP как json
+console.log(JSON.stringify(diff("//li", "b", {price: "i"}, JSON.parse(%s))));
+"""
+
+
+def run_js(items: list, previous: dict) -> dict:
+    script = SHIM % (json.dumps(items), WATCH_DIFF_JS, json.dumps(json.dumps(previous)))
+    result = subprocess.run(
+        ["node", "-e", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="нужен node")
+def test_page_diff_js_special_keys():
+    items = [
+        {"b": "constructor", "i": "1", "textContent": ""},
+        {"b": "__proto__", "i": "2", "textContent": ""},
+        {"b": "a", "i": "3", "textContent": ""},
+    ]
+    first = run_js(items, {})
+    assert [item["key"] for item, _ in first["added"]] == ["constructor", "__proto__", "a"]
+
+    previous = {item["key"]: fingerprint for item, fingerprint in first["added"]}
+    previous["toString"] = "0"
+    items[2]["i"] = "4"
+    second = run_js(items, previous)
+    assert second["added"] == []
+    assert [item["key"] for item, _ in second["modified"]] == ["a"]
+    assert second["removed"] == ["toString"]
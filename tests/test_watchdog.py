@@ -0,0 +1,88 @@
+import asyncio
+import os
+
+from curcheck.watchdog import MB, BrowserWatchdog, process_rss
+
+
+async def navigate(pool, times: int) -> None:
+    for _ in range(times):
+        async with pool.page():
+            pass
+
+
+def test_navigations_trigger_recycle(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        watchdog = BrowserWatchdog(interval=60, max_navigations=3, drain_timeout=1)
+        await pool.start()
+        await watchdog.start(pool)
+        old = pool.browsers[0]
+
+        await navigate(pool, 2)
+        await watchdog.check()
+        assert watchdog._recycling is None
+
+        await navigate(pool, 1)
+        await watchdog.check()
+        health = watchdog.health[old]
+        assert health.navigations == 3 and health.js_heap == 1024
+        await watchdog._recycling
+
+        # старый браузер закрыт, его место занял новый
+        assert not old.alive and pool.recycles == 1
+        assert pool.browsers and pool.browsers[0] is not old
+        await watchdog.close()
+        await pool.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_js_heap_limit_and_one_recycle_at_a_time(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=2, pages_per_browser=1)
+        # у FakePage куча 1024 байта на вкладку
+        watchdog = BrowserWatchdog(interval=60, max_js_heap=1000 / MB, drain_timeout=1)
+        await pool.start()
+        await watchdog.start(pool)
+        busy = [await pool.checkout() for _ in range(2)]
+
+        await watchdog.check()
+        first = watchdog._recycling
+        assert first is not None and not first.done()
+        await watchdog.check()
+        # пока первая замена ждет вкладку, вторая не начинается
+        assert watchdog._recycling is first
+        assert pool.recycles == 1
+
+        for page in busy:
+            await pool.checkin(page)
+        await first
+        assert pool.recycles == 1
+        await watchdog.close()
+        await pool.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_healthy_browser_is_kept(make_pool):
+    async def main():
+        pool = make_pool(browsers_count=1, pages_per_browser=1)
+        watchdog = BrowserWatchdog(interval=60, max_navigations=100, max_rss=1024)
+        await pool.start()
+        await watchdog.start(pool)
+        await navigate(pool, 3)
+        await watchdog.check()
+        assert watchdog._recycling is None and pool.recycles == 0
+        await watchdog.close()
+        await pool.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_process_rss_of_current_process():
+    rss = process_rss(os.getpid())
+    if os.path.exists("/proc/self/statm"):
+        assert rss and rss > MB
+    else:
+        assert rss is None
+    assert process_rss(-1) is None
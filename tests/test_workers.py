@@ -0,0 +1,170 @@
+import asyncio
+
+from aiohttp import web
+
+from curcheck.events import EventPaginator
+from curcheck.session import create_session
+from curcheck.workers import WorkerQueue
+
+
+def test_concurrent_paginator_runs_keep_their_pages(http_server):
+    async def listing(request):
+        await asyncio.sleep(0.01)
+        body = "".join(f'<a href="/item?id={i}">{i}</a>' for i in range(6))
+        return web.Response(text=body, content_type="text/html")
+
+    async def item(request):
+        await asyncio.sleep(0.01)
+        return web.Response(text="<p>ok</p>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/list", listing)
+    app.router.add_get("/item", item)
+
+    async def main():
+        async with http_server(app) as url:
+            paginator = EventPaginator(
+                domain=url, url="/list", pages_links_xpath="//a/@href",
+                count_in_approach=2,
+            )
+            calls = []
+
+            async def page(tree, run):
+                calls.append(run)
+
+            async def run(session, name):
+                await task(session, name)
+                # запуск заканчивается только после своих страниц
+                assert calls.count(name) == 6
+
+            task = paginator(page)
+            async with create_session() as session:
+                await asyncio.gather(run(session, "a"), run(session, "b"))
+
+        assert paginator.stats.done == 6
+
+    asyncio.run(main())
+
+
+def test_cancelled_task_keeps_worker_alive():
+    async def main():
+        done = []
+
+        async def cancelled():
+            waiter = asyncio.get_event_loop().create_future()
+            waiter.cancel()
+            await waiter
+
+        async def work():
+            done.append(1)
+
+        queue = WorkerQueue(concurrency=1)
+        async with queue:
+            await queue.submit(cancelled)
+            await queue.submit(work)
+
+        assert done == [1]
+        assert queue.stats.failed == 1 and queue.stats.done == 1
+        assert isinstance(queue.errors[0], asyncio.CancelledError)
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_cancel_stops_busy_workers():
+    async def main():
+        queue = WorkerQueue(concurrency=2)
+        queue.start()
+        for _ in range(4):
+            await queue.submit(asyncio.sleep, 10)
+        await asyncio.sleep(0.01)
+        workers = list(queue._workers)
+        await queue.cancel()
+        # отмена самого воркера не считается упавшей задачей
+        assert all(worker.cancelled() for worker in workers)
+        assert queue.stats.failed == 0
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_queue_keeps_concurrency_and_joins_all_tasks():
+    async def main():
+        running = []
+        peak = []
+
+        async def task(i):
+            running.append(i)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(i)
+
+        async with WorkerQueue(concurrency=3) as queue:
+            for i in range(10):
+                await queue.submit(task, i)
+
+        # join дождался всех задач, и в работе было не больше трех
+        assert queue.stats.done == 10 and queue.stats.in_flight == 0
+        assert max(peak) == 3
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_bounded_queue_makes_submit_wait():
+    async def main():
+        release = asyncio.Event()
+
+        async def task():
+            await release.wait()
+
+        queue = WorkerQueue(concurrency=1, maxsize=1)
+        queue.start()
+        await queue.submit(task) # взял воркер
+        await asyncio.sleep(0)
+        await queue.submit(task) # занял очередь
+        blocked = asyncio.ensure_future(queue.submit(task))
+        await asyncio.sleep(0.01)
+        assert not blocked.done() and queue.stats.queued == 1
+
+        release.set()
+        await blocked
+        await queue.join()
+        assert queue.stats.done == 3
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_failed_task_is_recorded_and_others_run():
+    async def main():
+        done = []
+
+        async def fail():
+            raise ValueError("bad page")
+
+        async def work():
+            done.append(1)
+
+        async with WorkerQueue(concurrency=1) as queue:
+            await queue.submit(fail)
+            await queue.submit(work)
+
+        assert done == [1] and queue.stats.failed == 1
+        assert isinstance(queue.errors[0], ValueError)
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_prioritized_queue_order():
+    async def main():
+        order = []
+
+        async def task(name):
+            order.append(name)
+
+        queue = WorkerQueue(concurrency=1, prioritized=True)
+        # задачи ставятся до запуска воркеров, чтобы порядок решал приоритет
+        for priority, name in [(2, "c"), (0, "a"), (1, "b1"), (1, "b2")]:
+            await queue.submit_prioritized(priority, task, name)
+        queue.start()
+        await queue.join()
+        return order
+
+    assert asyncio.run(main()) == ["a", "b1", "b2", "c"]